@@ -6,9 +6,7 @@
 import os
 import re
 import json
-import shutil
 import subprocess
-import tempfile
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Optional, Dict, Any, Union, List
@@ -23,6 +21,7 @@ from langchain_core.runnables import RunnableConfig
 from app.config import settings
 from app.core.config import TAVILY_API_KEY
 from app.core.llm import llm
+from app.core.search_cache import get_search_cache
 from app.core.supabase import save_slide_to_supabase
 from app.core.storage import upload_to_storage
 from app.core.utils import (
@@ -126,10 +125,10 @@ class State(TypedDict, total=False):
   # ══════════════════════════════════════════════════════════
   slides_json: List[Dict[str, Any]]             # スライドデータ（HTML生成用）
   narration_scripts: List[str]                  # ナレーション台本
-  audio_files: List[str]                        # 音声ファイルパス
+  audio_files: List[str]                        # 音声ファイルURL（Supabase Storage）
+  audio_durations: List[Optional[float]]        # 各音声の長さ（秒、MP3ヘッダーから取得）
   video_url: str                                # Supabase動画URL（同期版で使用）
   video_job_id: str                             # Cloud Run Job ID（非同期版で使用）
-  _temp_narration_dir: str                      # 一時ディレクトリ（内部用）
 
   # ══════════════════════════════════════════════════════════
   # システム
@@ -282,7 +281,9 @@ def collect_info(state: State) -> State:
           for p in patterns:
             queries.append({"q": f"{p} {m}", "include_domains": domains, "time_range": "month"})
 
-      sources = tavily_collect_context(queries, max_per_query=6, default_time_range="month")
+      sources = tavily_collect_context(
+        queries, max_per_query=6, default_time_range="month", cache=get_search_cache()
+      )
       context_md = context_to_bullets(sources)
       return {
         "sources": sources,
@@ -916,10 +917,15 @@ def generate_narration(state: State) -> Dict:
 
     並列処理:
     - LLMナレーション生成: llm.batch() で最大5並列
-    - TTS音声生成: ThreadPoolExecutor で最大5並列
+    - TTS音声生成: AsyncOpenAI で最大 TTS_CONCURRENCY 並列
+      （プロセス共有のレートリミッター経由、同じテキスト・設定の音声はキャッシュを再利用）
+
+    音声は一時ファイルを作らずにSupabase Storageへ並列アップロードし、audio_files にはURLを返す。
+    TTSに失敗したスライドは動画から除外し、全スライド失敗時のみエラーにする。
     """
-    from openai import OpenAI
-    from concurrent.futures import ThreadPoolExecutor
+    import asyncio
+    import uuid
+    from app.core.tts import TTS_CONCURRENCY, get_tts_cache, synthesize_narrations
     from app.prompts.narration_prompts import get_narration_prompt
 
     if state.get("error"):
@@ -953,16 +959,14 @@ def generate_narration(state: State) -> Dict:
             "log": _log(state, "[narration] ERROR: no valid slides")
         }
 
-    # OpenAI TTSクライアント初期化
-    client = OpenAI()  # OPENAI_API_KEYから自動認証
-
     # 設定値取得
     tts_model = getattr(settings, 'TTS_MODEL', 'tts-1-hd')
     tts_voice = getattr(settings, 'TTS_VOICE', 'shimmer')
     tts_speed = float(getattr(settings, 'TTS_SPEED', '1.0'))
 
-    # 一時ディレクトリ作成
-    temp_dir = Path(tempfile.mkdtemp())
+    # 音声のアップロード先（非同期の動画ジョブはローカルファイルにアクセスできないため）
+    user_id = state.get("user_id", "anonymous")
+    storage_prefix = f"{user_id}/narration/{state.get('slide_id') or uuid.uuid4().hex}"
 
     try:
         # ========== Step 1: LLMナレーション生成（並列処理） ==========
@@ -986,55 +990,42 @@ def generate_narration(state: State) -> Dict:
                 print(f"[narration] LLM parse error for slide {i}: {str(e)[:100]}")
 
         # ========== Step 2: TTS音声生成（並列処理） ==========
-        def generate_audio(args):
-            """単一スライドの音声生成（スレッドプール用）"""
-            idx, narration_text = args
-            response = client.audio.speech.create(
-                model=tts_model,
-                voice=tts_voice,
-                input=narration_text,
-                speed=tts_speed
-            )
-            audio_path = temp_dir / f"narration_{idx:03d}.mp3"
-            with open(audio_path, 'wb') as f:
-                f.write(response.content)
-            return idx, str(audio_path)
-
-        # 並列TTS実行（最大5並列）
-        audio_results = []
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            futures = [
-                executor.submit(generate_audio, (i, narration))
-                for i, narration in enumerate(narrations)
-            ]
-            for future in futures:
-                try:
-                    result = future.result()
-                    audio_results.append(result)
-                except Exception as e:
-                    # TTS失敗時は即座にエラー返却
-                    shutil.rmtree(temp_dir, ignore_errors=True)
-                    return {
-                        "error": f"OpenAI TTS error: {str(e)}",
-                        "log": _log(state, f"[narration] TTS API failed: {str(e)[:100]}")
-                    }
-
-        # 順序を維持してソート（インデックス順）
-        audio_results.sort(key=lambda x: x[0])
-        audio_files = [path for _, path in audio_results]
+        # ノードは同期関数のため、このスレッド専用のイベントループで実行する
+        audio_results = asyncio.run(synthesize_narrations(
+            narrations,
+            storage_prefix,
+            model=tts_model,
+            voice=tts_voice,
+            speed=tts_speed,
+            cache=get_tts_cache()
+        ))
+
+        # 失敗したスライドを除外（スライド・ナレーション・音声の対応を保つ）
+        failed = [i for i, path in enumerate(audio_results) if path is None]
+        if len(failed) == len(audio_results):
+            return {
+                "error": "OpenAI TTS error: all narrations failed",
+                "log": _log(state, "[narration] TTS API failed for all slides")
+            }
+        kept = [i for i, path in enumerate(audio_results) if path is not None]
+        audio_files = [audio_results[i][0] for i in kept]
+        audio_durations = [audio_results[i][1] for i in kept]
+        narrations = [narrations[i] for i in kept]
+        slides_json = [slides_json[i] for i in kept]
+
+        log_message = f"[narration] generated {len(audio_files)} audio files, {len(slides_json)} slides_json (model={tts_model}, voice={tts_voice}, parallel={TTS_CONCURRENCY})"
+        if failed:
+            log_message += f", skipped slides {failed} (TTS failed)"
 
         return {
             "narration_scripts": narrations,
             "audio_files": audio_files,
+            "audio_durations": audio_durations,
             "slides_json": slides_json,  # HTML生成用の構造化データ
-            "_temp_narration_dir": str(temp_dir),  # 後続ノードで使用
-            "log": _log(state, f"[narration] generated {len(audio_files)} audio files, {len(slides_json)} slides_json (model={tts_model}, voice={tts_voice}, parallel=5)")
+            "log": _log(state, log_message)
         }
 
     except Exception as e:
-        # クリーンアップ
-        shutil.rmtree(temp_dir, ignore_errors=True)
-
         return {
             "error": f"narration_error: {str(e)}",
             "log": _log(state, f"[narration] EXCEPTION {str(e)[:100]}")
@@ -1052,13 +1043,10 @@ def render_video(state: State) -> Dict:
     実際の動画生成はバックグラウンドで実行され、タイムアウトしない。
     クライアントは /api/video/status/{job_id} でステータスをポーリングする。
 
-    重要: 音声ファイルはSupabase Storageにアップロードしてから渡す。
-    ローカルの一時ファイルパスは非同期ジョブ実行時に存在しないため。
+    音声ファイルは generate_narration でSupabase Storageにアップロード済みのURLを渡す。
     """
     import httpx
     import os
-    from pathlib import Path
-    from app.core.storage import upload_to_storage
 
     print("[DEBUG] render_video: START (Cloud Run Job async)")
 
@@ -1068,7 +1056,6 @@ def render_video(state: State) -> Dict:
 
     audio_files = state.get("audio_files", [])
     slides_json = state.get("slides_json", [])
-    temp_narration_dir = state.get("_temp_narration_dir")
     title = state.get("title", "AIスライド")
     user_id = state.get("user_id", "anonymous")
     slide_id = state.get("slide_id", "")
@@ -1096,39 +1083,6 @@ def render_video(state: State) -> Dict:
             "log": _log(state, "[video] ERROR: slide_id is required for async rendering")
         }
 
-    # 音声ファイルをSupabase Storageにアップロード
-    # 非同期ジョブはローカルの一時ファイルにアクセスできないため
-    print("[DEBUG] render_video: uploading audio files to Supabase Storage")
-    audio_urls = []
-    try:
-        for i, audio_path in enumerate(audio_files):
-            audio_file = Path(audio_path)
-            if not audio_file.exists():
-                print(f"[DEBUG] render_video: audio file not found: {audio_path}")
-                return {
-                    "error": f"Audio file not found: {audio_path}",
-                    "log": _log(state, f"[video] ERROR: audio file not found: {audio_path}")
-                }
-
-            # Supabase Storageにアップロード
-            storage_path = f"{user_id}/narration/{slide_id}/narration_{i:03d}.mp3"
-            audio_url = upload_to_storage(
-                bucket="slide-files",
-                file_path=storage_path,
-                file_data=audio_file.read_bytes(),
-                content_type="audio/mpeg"
-            )
-            audio_urls.append(audio_url)
-            print(f"[DEBUG] render_video: uploaded audio {i} -> {audio_url}")
-
-        print(f"[DEBUG] render_video: uploaded {len(audio_urls)} audio files")
-    except Exception as e:
-        print(f"[DEBUG] render_video: audio upload failed: {e}")
-        return {
-            "error": f"Audio upload failed: {str(e)}",
-            "log": _log(state, f"[video] ERROR: audio upload failed: {str(e)[:100]}")
-        }
-
     # FastAPI経由で非同期動画生成ジョブをトリガー
     fastapi_url = os.getenv("FASTAPI_URL", "http://localhost:8001")
     print(f"[DEBUG] render_video: calling FastAPI at {fastapi_url}/api/render/video/async")
@@ -1143,7 +1097,8 @@ def render_video(state: State) -> Dict:
                 f"{fastapi_url}/api/render/video/async",
                 json={
                     "slides_json": slides_json,
-                    "audio_files": audio_urls,  # ローカルパスではなくSupabase URLを渡す
+                    "audio_files": audio_files,  # Supabase Storage URL
+                    "audio_durations": state.get("audio_durations"),
                     "title": title,
                     "user_id": user_id,
                     "slide_id": slide_id
@@ -1156,10 +1111,6 @@ def render_video(state: State) -> Dict:
         job_id = result.get("job_id", "")
         print(f"[DEBUG] render_video: async job created, job_id={job_id}")
 
-        # ナレーション用一時ディレクトリのクリーンアップ
-        if temp_narration_dir:
-            shutil.rmtree(temp_narration_dir, ignore_errors=True)
-
         return {
             "video_job_id": job_id,
             "log": _log(state, f"[video] async job created: {job_id}")
@@ -0,0 +1,127 @@
+"""音声ファイルの長さをデコードせずに取得
+
+MP3はフレームヘッダー（4バイト）だけを読んでフレーム数とサンプリングレートから長さを求める。
+ffmpeg/ffprobeのプロセスを起動しないため、ナレーション生成時にメモリ上の音声からも計算できる。
+"""
+
+import struct
+from pathlib import Path
+from typing import Optional, Union
+
+# ビットレート表（kbps）: (MPEGバージョン, レイヤー) → インデックス1〜14
+_BITRATES = {
+    (1, 1): (32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_SAMPLE_RATES = {1: (44100, 48000, 32000), 2: (22050, 24000, 16000), 2.5: (11025, 12000, 8000)}
+_VERSIONS = {0: 2.5, 2: 2, 3: 1}
+_LAYERS = {1: 3, 2: 2, 3: 1}
+
+
+def _parse_header(data: bytes, pos: int) -> Optional[dict]:
+    """posのMPEGオーディオフレームヘッダーを解析（不正ならNone）"""
+    if pos + 4 > len(data):
+        return None
+    b0, b1, b2, b3 = data[pos:pos + 4]
+    if b0 != 0xFF or (b1 & 0xE0) != 0xE0:
+        return None
+
+    version = _VERSIONS.get((b1 >> 3) & 0x03)
+    layer = _LAYERS.get((b1 >> 1) & 0x03)
+    bitrate_index = b2 >> 4
+    sample_rate_index = (b2 >> 2) & 0x03
+    if version is None or layer is None or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    bitrate = _BITRATES[(1 if version == 1 else 2, layer)][bitrate_index - 1] * 1000
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    padding = (b2 >> 1) & 0x01
+
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if layer == 2 or version == 1 else 576
+        length = samples // 8 * bitrate // sample_rate + padding
+
+    return {
+        "version": version,
+        "samples": samples,
+        "sample_rate": sample_rate,
+        "length": length,
+        "mono": (b3 >> 6) == 3,
+    }
+
+
+def _skip_id3v2(data: bytes) -> int:
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _xing_frames(data: bytes, pos: int, header: dict) -> Optional[int]:
+    """先頭フレームのXing/Infoヘッダーに記録されたフレーム数（なければNone）"""
+    if header["version"] == 1:
+        side_info = 17 if header["mono"] else 32
+    else:
+        side_info = 9 if header["mono"] else 17
+    offset = pos + 4 + side_info
+    if data[offset:offset + 4] not in (b"Xing", b"Info"):
+        return None
+    flags, = struct.unpack(">I", data[offset + 4:offset + 8])
+    if not flags & 0x01:
+        return None
+    frames, = struct.unpack(">I", data[offset + 8:offset + 12])
+    return frames
+
+
+def mp3_duration(data: bytes) -> Optional[float]:
+    """MP3の長さ（秒）をフレームヘッダーから計算（MP3として解析できなければNone）
+
+    Xing/Infoヘッダーがあればそのフレーム数を使い、なければ全フレームのヘッダーをたどる。
+    """
+    pos = _skip_id3v2(data)
+    # ID3タグ直後がフレームでない場合に備えて、最初の同期ワードを探す
+    # （偶然 0xFF が並んだだけのデータと区別するため、次のフレームも有効か確認する）
+    first = None
+    limit = min(len(data), pos + 64 * 1024)
+    while pos < limit:
+        header = _parse_header(data, pos)
+        if header:
+            next_pos = pos + header["length"]
+            if next_pos == len(data) or _parse_header(data, next_pos):
+                first = header
+                break
+        pos += 1
+    if first is None:
+        return None
+
+    frames = _xing_frames(data, pos, first)
+    if frames is not None:
+        return frames * first["samples"] / first["sample_rate"]
+
+    duration = 0.0
+    while True:
+        header = _parse_header(data, pos)
+        if header is None or header["length"] <= 0:
+            break
+        duration += header["samples"] / header["sample_rate"]
+        pos += header["length"]
+    return duration
+
+
+def audio_duration(path: Union[str, Path]) -> Optional[float]:
+    """音声ファイルの長さ（秒）をMP3ヘッダーから取得
+
+    MP3以外・読み込めない場合はNone（動画パイプラインではエンコード後のセグメントの長さで代用する）。
+    """
+    try:
+        return mp3_duration(Path(path).read_bytes())
+    except OSError:
+        return None
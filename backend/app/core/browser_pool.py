@@ -0,0 +1,453 @@
+"""
+BrowserPool - 常駐Chromiumブラウザプール
+
+SlideRendererが呼び出しごとにChromiumを起動するコスト（数秒）を削減するため、
+プロセス内でブラウザを常駐させ、レンダリング要求ごとに分離されたcontext/pageを払い出す。
+
+Playwright Sync APIのオブジェクトは生成したスレッドからしか操作できないため、
+ワーカースレッドごとに1つのブラウザを所有し、処理はキュー経由でワーカーに渡す。
+- N回のレンダリング要求ごとにブラウザを再起動（メモリリーク対策）
+- ブラウザがクラッシュした場合は自動で再起動して1回だけリトライ
+
+AsyncBrowserPool は playwright.async_api 版。イベントループ上で1つのブラウザを共有し、
+同時に開くcontext数をセマフォで制限する（スレッドを消費しない）。
+"""
+
+import asyncio
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+# 環境変数で調整可能な設定
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "1"))
+# Asyncプールの同時context数（1つのブラウザを共有するため、並列レンダリング数 RENDER_WORKERS に合わせる）
+ASYNC_BROWSER_POOL_SIZE = int(os.getenv("ASYNC_BROWSER_POOL_SIZE", os.getenv("RENDER_WORKERS", "4")))
+BROWSER_MAX_RENDERS = int(os.getenv("BROWSER_MAX_RENDERS", "50"))
+BROWSER_TIMEOUT_MS = 60000  # 起動・ページ操作とも60秒（Cloud Run環境対応）
+DEFAULT_VIEWPORT = {"width": 1920, "height": 1080}
+
+
+class _Worker:
+    """ブラウザを1つ所有するワーカースレッドの状態"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.thread: Optional[threading.Thread] = None
+        self.playwright: Any = None
+        self.browser: Any = None
+        self.renders = 0
+
+
+class BrowserPool:
+    """ワーカースレッドごとに常駐Chromiumを持つブラウザプール"""
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        max_renders: Optional[int] = None,
+        viewport: Optional[Dict[str, int]] = None,
+    ):
+        self.size = max(1, size or BROWSER_POOL_SIZE)
+        self.max_renders = max(1, max_renders or BROWSER_MAX_RENDERS)
+        self.viewport = viewport or DEFAULT_VIEWPORT
+        self._tasks: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._workers: List[_Worker] = []
+        self._lock = threading.Lock()
+
+    @property
+    def started(self) -> bool:
+        return bool(self._workers)
+
+    def start(self, wait: bool = True) -> "BrowserPool":
+        """ワーカースレッドを起動し、各ワーカーでChromiumを事前起動する
+
+        Args:
+            wait: Trueなら全ブラウザの起動完了まで待機。
+                  Falseならバックグラウンドで起動し、他の処理と並行させる。
+        """
+        with self._lock:
+            if self._workers:
+                return self
+
+            ready: List[Future] = []
+            for i in range(self.size):
+                worker = _Worker(i)
+                warmed: Future = Future()
+                worker.thread = threading.Thread(
+                    target=self._worker_loop,
+                    args=(worker, warmed),
+                    name=f"browser-pool-{i}",
+                    daemon=True,
+                )
+                worker.thread.start()
+                self._workers.append(worker)
+                ready.append(warmed)
+
+        if wait:
+            for warmed in ready:
+                warmed.result()
+        return self
+
+    def shutdown(self) -> None:
+        """全ワーカーを停止し、ブラウザを閉じる"""
+        with self._lock:
+            workers, self._workers = self._workers, []
+
+        for _ in workers:
+            self._tasks.put(None)
+        for worker in workers:
+            if worker.thread:
+                worker.thread.join(timeout=30)
+
+    def submit(self, task: Callable[[Any], T]) -> "Future[T]":
+        """空いているワーカーで task(page) を実行する
+
+        pageはレンダリング要求ごとに新規作成されたcontext上のページで、
+        task終了後にcontextごと破棄される。
+        """
+        if not self._workers:
+            raise RuntimeError("BrowserPool is not started")
+
+        future: Future = Future()
+        self._tasks.put((task, future))
+        return future
+
+    def run(self, task: Callable[[Any], T]) -> T:
+        """submit() して結果を待つ同期版"""
+        return self.submit(task).result()
+
+    # ------------------------------------------------------------
+    # ワーカースレッド内の処理
+    # ------------------------------------------------------------
+
+    def _worker_loop(self, worker: _Worker, warmed: Future) -> None:
+        try:
+            self._ensure_browser(worker)
+        except Exception as e:
+            # 起動失敗時も最初のタスクで再試行する
+            print(f"[BrowserPool] WARNING: worker {worker.index} warmup failed: {e}")
+        warmed.set_result(True)
+
+        while True:
+            item = self._tasks.get()
+            if item is None:
+                break
+
+            task, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                result = self._execute(worker, task)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+        self._close_browser(worker, stop_driver=True)
+
+    def _execute(self, worker: _Worker, task: Callable[[Any], T]) -> T:
+        for attempt in range(2):
+            browser = self._ensure_browser(worker)
+            context = browser.new_context(viewport=self.viewport)
+            context.set_default_timeout(BROWSER_TIMEOUT_MS)
+            try:
+                page = context.new_page()
+                return task(page)
+            except Exception:
+                # ブラウザごと落ちた場合のみ再起動してリトライ（task側のエラーはそのまま送出）
+                if attempt == 0 and not browser.is_connected():
+                    print(f"[BrowserPool] browser crashed on worker {worker.index}, restarting")
+                    self._close_browser(worker, stop_driver=True)
+                    continue
+                raise
+            finally:
+                try:
+                    context.close()
+                except Exception:
+                    pass
+                self._count_render(worker)
+
+        raise RuntimeError("unreachable")
+
+    def _count_render(self, worker: _Worker) -> None:
+        worker.renders += 1
+        if worker.renders >= self.max_renders:
+            print(f"[BrowserPool] recycling browser on worker {worker.index} after {worker.renders} renders")
+            self._close_browser(worker)
+
+    def _ensure_browser(self, worker: _Worker) -> Any:
+        if worker.browser is not None and worker.browser.is_connected():
+            return worker.browser
+
+        if worker.browser is not None:
+            self._close_browser(worker, stop_driver=True)
+
+        worker.browser = self._launch_browser(worker)
+        worker.renders = 0
+        return worker.browser
+
+    def _launch_browser(self, worker: _Worker) -> Any:
+        """Chromiumを起動（Playwrightドライバはワーカー単位で使い回す）"""
+        if worker.playwright is None:
+            from playwright.sync_api import sync_playwright
+            worker.playwright = sync_playwright().start()
+        return worker.playwright.chromium.launch(timeout=BROWSER_TIMEOUT_MS)
+
+    def _close_browser(self, worker: _Worker, stop_driver: bool = False) -> None:
+        browser, worker.browser = worker.browser, None
+        if browser is not None:
+            try:
+                browser.close()
+            except Exception:
+                pass
+
+        # クラッシュ時・終了時はPlaywrightドライバも停止する
+        if stop_driver and worker.playwright is not None:
+            try:
+                worker.playwright.stop()
+            except Exception:
+                pass
+            worker.playwright = None
+
+
+# ============================================================
+# プロセス共有プール（FastAPI lifespan / Cloud Run Job から起動）
+# ============================================================
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+
+def start_browser_pool(size: Optional[int] = None, wait: bool = True) -> BrowserPool:
+    """プロセス共有のブラウザプールを起動（起動済みならそれを返す）"""
+    global _pool
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool(size=size)
+        pool = _pool
+
+    return pool.start(wait=wait)
+
+
+def get_browser_pool() -> Optional[BrowserPool]:
+    """起動済みのプロセス共有プールを返す（未起動ならNone）"""
+    pool = _pool
+    return pool if pool is not None and pool.started else None
+
+
+def shutdown_browser_pool() -> None:
+    """プロセス共有のブラウザプールを停止"""
+    global _pool
+
+    with _pool_lock:
+        pool, _pool = _pool, None
+
+    if pool is not None:
+        pool.shutdown()
+
+
+@contextmanager
+def browser_pool_scope(pool: Optional[BrowserPool] = None, size: int = 1) -> Iterator[BrowserPool]:
+    """利用可能なプールを返す。共有プール未起動なら一時プールを起動し、終了時に停止する"""
+    pool = pool or get_browser_pool()
+    if pool is not None:
+        yield pool
+        return
+
+    temp_pool = BrowserPool(size=size).start()
+    try:
+        yield temp_pool
+    finally:
+        temp_pool.shutdown()
+
+
+# ============================================================
+# Async版（playwright.async_api）
+# ============================================================
+
+class AsyncBrowserPool:
+    """イベントループ上で1つのChromiumを共有し、同時context数を制限するプール"""
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        max_renders: Optional[int] = None,
+        viewport: Optional[Dict[str, int]] = None,
+    ):
+        self.size = max(1, size or ASYNC_BROWSER_POOL_SIZE)
+        self.max_renders = max(1, max_renders or BROWSER_MAX_RENDERS)
+        self.viewport = viewport or DEFAULT_VIEWPORT
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._playwright: Any = None
+        self._browser: Any = None
+        self._renders = 0
+        self._active = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._launch_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def started(self) -> bool:
+        return self.loop is not None
+
+    async def start(self) -> "AsyncBrowserPool":
+        """現在のイベントループに紐付けてChromiumを事前起動する"""
+        if self.loop is not None:
+            return self
+
+        self.loop = asyncio.get_running_loop()
+        self._semaphore = asyncio.Semaphore(self.size)
+        self._launch_lock = asyncio.Lock()
+        try:
+            await self._ensure_browser()
+        except Exception as e:
+            # 起動失敗時も最初のタスクで再試行する
+            print(f"[AsyncBrowserPool] WARNING: warmup failed: {e}")
+        return self
+
+    async def shutdown(self) -> None:
+        """ブラウザとPlaywrightドライバを停止"""
+        await self._close_browser(stop_driver=True)
+        self.loop = None
+
+    async def run(self, task: Callable[[Any], Awaitable[T]]) -> T:
+        """空きcontextで await task(page) を実行する（ブラウザクラッシュ時は1回だけリトライ）"""
+        if self._semaphore is None:
+            raise RuntimeError("AsyncBrowserPool is not started")
+
+        async with self._semaphore:
+            for attempt in range(2):
+                browser = await self._ensure_browser()
+                self._active += 1
+                try:
+                    async with self._context(browser) as page:
+                        return await task(page)
+                except Exception:
+                    if attempt == 0 and not browser.is_connected():
+                        await self._discard_crashed(browser)
+                        continue
+                    raise
+                finally:
+                    self._active -= 1
+                    await self._count_render()
+
+        raise RuntimeError("unreachable")
+
+    @asynccontextmanager
+    async def _context(self, browser) -> AsyncIterator[Any]:
+        context = await browser.new_context(viewport=self.viewport)
+        context.set_default_timeout(BROWSER_TIMEOUT_MS)
+        try:
+            yield await context.new_page()
+        finally:
+            try:
+                await context.close()
+            except Exception:
+                pass
+
+    async def _count_render(self) -> None:
+        self._renders += 1
+        # 他のタスクが使用中のブラウザは閉じない（次の空き時に再起動）
+        if self._renders >= self.max_renders and self._active == 0:
+            print(f"[AsyncBrowserPool] recycling browser after {self._renders} renders")
+            await self._close_browser()
+
+    async def _discard_crashed(self, browser) -> None:
+        """クラッシュしたブラウザを閉じる（次の _ensure_browser で再起動）
+
+        同じブラウザを使っていた全タスクがクラッシュを検知するため、
+        他のタスクが既に再起動した新しいブラウザは閉じない。
+        """
+        async with self._launch_lock:
+            if self._browser is browser:
+                print("[AsyncBrowserPool] browser crashed, restarting")
+                await self._close_browser(stop_driver=True)
+
+    async def _ensure_browser(self) -> Any:
+        async with self._launch_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+
+            if self._browser is not None:
+                await self._close_browser(stop_driver=True)
+
+            self._browser = await self._launch_browser()
+            self._renders = 0
+            return self._browser
+
+    async def _launch_browser(self) -> Any:
+        """Chromiumを起動（Playwrightドライバは使い回す）"""
+        if self._playwright is None:
+            from playwright.async_api import async_playwright
+            self._playwright = await async_playwright().start()
+        return await self._playwright.chromium.launch(timeout=BROWSER_TIMEOUT_MS)
+
+    async def _close_browser(self, stop_driver: bool = False) -> None:
+        browser, self._browser = self._browser, None
+        if browser is not None:
+            try:
+                await browser.close()
+            except Exception:
+                pass
+
+        if stop_driver and self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+            self._playwright = None
+
+
+_async_pool: Optional[AsyncBrowserPool] = None
+
+
+async def start_async_browser_pool(size: Optional[int] = None) -> AsyncBrowserPool:
+    """現在のイベントループ用の共有Asyncプールを起動（FastAPI lifespanから呼ぶ）"""
+    global _async_pool
+
+    if _async_pool is None:
+        _async_pool = AsyncBrowserPool(size=size)
+    return await _async_pool.start()
+
+
+def get_async_browser_pool() -> Optional[AsyncBrowserPool]:
+    """現在のイベントループで起動済みの共有Asyncプールを返す（別ループ・未起動ならNone）"""
+    pool = _async_pool
+    if pool is None or pool.loop is None:
+        return None
+    try:
+        return pool if pool.loop is asyncio.get_running_loop() else None
+    except RuntimeError:
+        return None
+
+
+async def shutdown_async_browser_pool() -> None:
+    """共有Asyncプールを停止"""
+    global _async_pool
+
+    pool, _async_pool = _async_pool, None
+    if pool is not None:
+        await pool.shutdown()
+
+
+@asynccontextmanager
+async def async_browser_pool_scope(
+    pool: Optional[AsyncBrowserPool] = None, size: int = 1
+) -> AsyncIterator[AsyncBrowserPool]:
+    """利用可能なAsyncプールを返す。共有プールがなければ一時プールを起動し、終了時に停止する"""
+    pool = pool or get_async_browser_pool()
+    if pool is not None:
+        yield pool
+        return
+
+    temp_pool = await AsyncBrowserPool(size=size).start()
+    try:
+        yield temp_pool
+    finally:
+        await temp_pool.shutdown()
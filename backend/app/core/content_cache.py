@@ -0,0 +1,216 @@
+"""コンテンツアドレス型ディスクキャッシュ
+
+レンダリング済みPNGなど、入力が同じなら出力も同じになる生成物を
+入力のハッシュをキーにローカルディスクへ保存する。
+- 合計サイズが上限を超えたら最終アクセスが古いものから削除（LRU）
+- bucket指定時はSupabase Storageにも保存し、インスタンス間・ジョブ間で共有
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+def content_key(*parts: Any) -> str:
+    """JSON化可能な値からキャッシュキー（SHA-256）を生成
+
+    dictはキー順をソートしてからハッシュするため、順序違いでも同じキーになる。
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ContentCache:
+    """スレッドセーフなLRUサイズ制限付きディスクキャッシュ"""
+
+    def __init__(
+        self,
+        root: Path,
+        max_bytes: int = 512 * 1024 * 1024,
+        bucket: Optional[str] = None,
+        prefix: str = "cache",
+    ):
+        """
+        Args:
+            root: ローカル保存先ディレクトリ
+            max_bytes: ローカル保存の合計サイズ上限
+            bucket: Supabase Storageのバケット名（未指定ならローカルのみ）
+            prefix: Storage上の保存先プレフィックス
+        """
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+
+    def get(self, key: str) -> Optional[bytes]:
+        """キャッシュを取得（ローカル → Storage の順に参照）"""
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # LRU用に最終アクセス時刻を更新
+            return data
+        except FileNotFoundError:
+            pass
+
+        data = self._remote_get(key)
+        if data is not None:
+            self._write_local(key, data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """キャッシュを保存（Storageへの保存失敗は無視）"""
+        self._write_local(key, data)
+        self._remote_put(key, data)
+
+    def get_file(self, key: str, dest: Path) -> bool:
+        """キャッシュをファイルとしてdestにコピー（動画セグメントなど大きな生成物向け）
+
+        Returns:
+            キャッシュがあればTrue
+        """
+        path = self._path(key)
+        try:
+            shutil.copyfile(path, dest)
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            pass
+
+        data = self._remote_get(key)
+        if data is None:
+            return False
+        self._write_local(key, data)
+        Path(dest).write_bytes(data)
+        return True
+
+    def put_file(self, key: str, src: Path) -> None:
+        """ファイルをキャッシュに保存（ローカルはファイルコピー、Storageへの保存失敗は無視）"""
+        self._write_local(key, src=Path(src))
+        if self.bucket:
+            self._remote_put(key, Path(src).read_bytes())
+
+    def clear(self) -> None:
+        """ローカルキャッシュを全削除"""
+        with self._lock:
+            for path in self._entries():
+                path.unlink(missing_ok=True)
+            self._size = 0
+
+    # ------------------------------------------------------------
+    # ローカル
+    # ------------------------------------------------------------
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def _entries(self):
+        if not self.root.exists():
+            return []
+        return [p for p in self.root.glob("*/*") if p.is_file() and not p.name.endswith(".tmp")]
+
+    def _write_local(self, key: str, data: Optional[bytes] = None, src: Optional[Path] = None) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 並行書き込みでも壊れたファイルを読まないよう一時ファイル経由で置き換える
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            if src is not None:
+                with open(src, "rb") as source:
+                    shutil.copyfileobj(source, f)
+            else:
+                f.write(data)
+        size = os.path.getsize(tmp)
+
+        with self._lock:
+            previous = path.stat().st_size if path.exists() else 0
+            os.replace(tmp, path)
+            self._size = self._current_size() - previous + size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _current_size(self) -> int:
+        if self._size is None:
+            self._size = sum(p.stat().st_size for p in self._entries())
+        return self._size
+
+    def _evict(self) -> None:
+        """最終アクセスが古い順に削除し、上限の8割まで減らす"""
+        entries = []
+        for p in self._entries():
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        entries.sort()
+
+        size = sum(e[1] for e in entries)
+        target = int(self.max_bytes * 0.8)
+        for _, entry_size, p in entries:
+            if size <= target:
+                break
+            p.unlink(missing_ok=True)
+            size -= entry_size
+        self._size = size
+
+    # ------------------------------------------------------------
+    # Supabase Storage
+    # ------------------------------------------------------------
+
+    def _remote_path(self, key: str) -> str:
+        return f"{self.prefix}/{key[:2]}/{key}" if self.prefix else f"{key[:2]}/{key}"
+
+    def _remote_get(self, key: str) -> Optional[bytes]:
+        if not self.bucket:
+            return None
+
+        from app.core.storage import download_from_storage
+        return download_from_storage(self.bucket, self._remote_path(key))
+
+    def _remote_put(self, key: str, data: bytes) -> None:
+        if not self.bucket:
+            return
+
+        from app.core.storage import upload_to_storage
+        try:
+            upload_to_storage(
+                bucket=self.bucket,
+                file_path=self._remote_path(key),
+                file_data=data,
+            )
+        except Exception as e:
+            print(f"[cache] Remote put failed: {e}")
+
+
+_shared_caches: Dict[Path, ContentCache] = {}
+_shared_caches_lock = threading.Lock()
+
+
+def cached_content_cache(
+    enabled: bool,
+    root: Path,
+    max_mb: int,
+    bucket: Optional[str] = None,
+    prefix: str = "cache",
+) -> Optional[ContentCache]:
+    """保存先ディレクトリごとにプロセスで共有するキャッシュを返す（無効化時はNone）
+
+    Cloud Runの/tmpはメモリ上にあるため、max_mbはコンテナのメモリに収まる値にする。
+    """
+    if not enabled:
+        return None
+    root = Path(root)
+    with _shared_caches_lock:
+        cache = _shared_caches.get(root)
+        if cache is None:
+            cache = ContentCache(root, max_bytes=max_mb * 1024 * 1024, bucket=bucket or None, prefix=prefix)
+            _shared_caches[root] = cache
+        return cache
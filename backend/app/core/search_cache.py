@@ -0,0 +1,100 @@
+"""TTL付きSQLiteキャッシュ（Web検索結果用）
+
+「AI最新情報」のレポートは、ユーザーが違っても同じベンダー×月のクエリを繰り返し検索する。
+Tavilyの検索結果をローカルのSQLiteファイルに保存し、
+同じインスタンス上のワーカープロセス・再起動後の実行からも再利用する。
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+TAVILY_CACHE_ENABLED = os.getenv("TAVILY_CACHE_ENABLED", "true").lower() == "true"
+TAVILY_CACHE_PATH = Path(os.getenv(
+    "TAVILY_CACHE_PATH", str(Path(tempfile.gettempdir()) / "slidepilot-cache" / "tavily.sqlite3")
+))
+
+# time_range（検索対象期間）ごとのTTL（秒）。期間が短いほど結果が早く古くなる
+SEARCH_CACHE_TTL = {
+    "day": 30 * 60,
+    "week": 3 * 60 * 60,
+    "month": 12 * 60 * 60,
+    "year": 24 * 60 * 60,
+}
+SEARCH_CACHE_DEFAULT_TTL = 60 * 60
+
+
+def search_cache_ttl(time_range: Optional[str]) -> int:
+    """time_rangeに応じたTTL（秒）"""
+    return SEARCH_CACHE_TTL.get(time_range or "", SEARCH_CACHE_DEFAULT_TTL)
+
+
+class SqliteTTLCache:
+    """スレッドセーフなTTL付きSQLiteキャッシュ（値はJSON化可能なもの）
+
+    有効期限は壁時計（time.time）で保存するため、プロセスをまたいでも有効。
+    WALモードで開くため、複数プロセスが同じファイルを同時に読み書きできる。
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=5, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM entries WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl_seconds: int) -> None:
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, payload, now + ttl_seconds),
+            )
+
+    def invalidate(self) -> None:
+        """キャッシュを全クリア"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_search_cache: Optional[SqliteTTLCache] = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> Optional[SqliteTTLCache]:
+    """プロセス共有の検索キャッシュを返す（無効化時・開けない場合はNone）"""
+    global _search_cache
+
+    if not TAVILY_CACHE_ENABLED:
+        return None
+    with _search_cache_lock:
+        if _search_cache is None:
+            try:
+                _search_cache = SqliteTTLCache(TAVILY_CACHE_PATH)
+            except (sqlite3.Error, OSError) as e:
+                print(f"[search_cache] WARNING: Cache disabled ({TAVILY_CACHE_PATH}): {e}")
+                return None
+        return _search_cache
@@ -2,12 +2,122 @@
 SlideRenderer - HTML/CSS + Playwright ベースのスライド画像レンダラー
 
 Slidevの不安定なPNG出力を置き換え、安定した画像生成を実現する。
-Cloud Run環境でのLangGraphノードから同期呼び出し可能。
+- SlideRenderer: Sync API版（LangGraphノード・Cloud Run Jobから同期呼び出し）
+- AsyncSlideRenderer: Async API版（FastAPIハンドラ等からawait）
+- LoopSlideRenderer: AsyncSlideRendererを別スレッド（VideoPipeline）から同期的に呼ぶラッパー
 """
 
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
+import asyncio
 import html
+import json
+import os
+import queue
+import re
+import tempfile
+
+from app.core.browser_pool import (
+    AsyncBrowserPool,
+    BrowserPool,
+    async_browser_pool_scope,
+    browser_pool_scope,
+)
+from app.core.content_cache import ContentCache, cached_content_cache, content_key
+
+# 並列レンダリングのワーカー数（ブラウザプールのサイズが上限）
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "4"))
+
+# レンダリング結果キャッシュ（同一スライドの再レンダリングを省略）
+RENDER_CACHE_ENABLED = os.getenv("RENDER_CACHE_ENABLED", "true").lower() == "true"
+RENDER_CACHE_DIR = Path(os.getenv("RENDER_CACHE_DIR", str(Path(tempfile.gettempdir()) / "slidepilot-cache" / "slides")))
+RENDER_CACHE_MAX_MB = int(os.getenv("RENDER_CACHE_MAX_MB", "64"))
+RENDER_CACHE_BUCKET = os.getenv("RENDER_CACHE_BUCKET")  # 例: slide-files（未設定ならローカルのみ）
+
+MERMAID_JS_PATH = Path(__file__).parent.parent / 'static' / 'mermaid.min.js'
+MERMAID_CONFIG = {
+    'startOnLoad': False,
+    'theme': 'default',
+    'securityLevel': 'loose',
+    'flowchart': {'curve': 'basis'},
+}
+
+def get_render_cache() -> Optional[ContentCache]:
+    """プロセス共有のレンダリングキャッシュを返す（無効化時はNone）"""
+    return cached_content_cache(
+        RENDER_CACHE_ENABLED, RENDER_CACHE_DIR, RENDER_CACHE_MAX_MB, RENDER_CACHE_BUCKET, "cache/slides"
+    )
+
+
+# mermaid.jsを読み込み済みのページで mermaid.render() を呼び、SVG文字列を返す
+# 構文エラー時はnullを返す（mermaidが残すエラー要素は除去）
+_MERMAID_SVG_JS = """
+async ({ code, id }) => {
+    try {
+        const { svg } = await mermaid.render(id, code);
+        return svg;
+    } catch (e) {
+        document.querySelectorAll('[id^="d' + id + '"]').forEach(el => el.remove());
+        return null;
+    }
+}
+"""
+
+
+# シェル読み込み済みのページでbodyだけを差し替える（フォント読み込み完了まで待つ）
+_SWAP_BODY_JS = """
+async ({ type, body }) => {
+    document.body.dataset.type = type;
+    document.body.innerHTML = body;
+    await document.fonts.ready;
+}
+"""
+
+_CSS_RULE_RE = re.compile(r'([^{}]+)\{')
+
+
+def _scope_css(css: str, scope: str) -> str:
+    """CSSの各セレクタの先頭にscopeを付ける（種類別CSSを1つのスタイルシートにまとめるため）"""
+    def prefix(match: "re.Match") -> str:
+        text = match.group(1)
+        indent = text[:len(text) - len(text.lstrip())]
+        selectors = ', '.join(f'{scope} {sel.strip()}' for sel in text.split(','))
+        return f'{indent}{selectors} {{'
+    return _CSS_RULE_RE.sub(prefix, css)
+
+
+@lru_cache(maxsize=1)
+def _load_mermaid_js() -> str:
+    """mermaid.min.js（約3.3MB）をプロセス内で1回だけディスクから読み込む"""
+    if not MERMAID_JS_PATH.exists():
+        return ''
+    return MERMAID_JS_PATH.read_text(encoding='utf-8')
+
+
+def _complete_frames(frames: List[Optional[bytes]]) -> List[bytes]:
+    """全スライドが揃っていることを確認して返す（欠けたままだとナレーションとずれるため）"""
+    missing = [i + 1 for i, frame in enumerate(frames) if frame is None]
+    if missing:
+        raise RuntimeError(f"Slides were not rendered: {missing}")
+    return frames
+
+
+def write_frames(frames: List[bytes], output_dir: Path) -> List[Path]:
+    """PNGバイト列を {i}.png として書き出す（ファイル入力が必要な処理向け）"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i, data in enumerate(frames):
+        path = output_dir / f"{i+1}.png"
+        path.write_bytes(data)
+        paths.append(path)
+    return paths
+
+
+@lru_cache(maxsize=1)
+def _mermaid_fingerprint() -> str:
+    """mermaid.jsのバージョン識別用ハッシュ（SVGキャッシュのキーに含める）"""
+    return content_key(_load_mermaid_js())[:16]
 
 
 class SlideRenderer:
@@ -15,7 +125,27 @@ class SlideRenderer:
 
     VIEWPORT = {'width': 1920, 'height': 1080}
 
-    def __init__(self):
+    # テンプレート・CSS・mermaid設定を変更したら更新する（レンダリングキャッシュのキーに含まれる）
+    TEMPLATE_VERSION = '3'
+
+    def __init__(
+        self,
+        pool: Optional[BrowserPool] = None,
+        workers: Optional[int] = None,
+        cache: Optional[ContentCache] = None,
+        use_cache: bool = True,
+    ):
+        """
+        Args:
+            pool: 使用するブラウザプール。未指定時はプロセス共有プール
+                  （未起動なら呼び出しごとの一時プール）を使用する。
+            workers: 並列にレンダリングするページ数（デフォルト: RENDER_WORKERS）
+            cache: レンダリング結果キャッシュ（未指定時はプロセス共有キャッシュ）
+            use_cache: Falseならキャッシュを使わず常にレンダリング
+        """
+        self.pool = pool
+        self.workers = max(1, workers or RENDER_WORKERS)
+        self.cache = (cache or get_render_cache()) if use_cache else None
         self.templates = {
             'title': self._title_template,
             'content': self._content_template,
@@ -23,6 +153,14 @@ class SlideRenderer:
             'summary': self._summary_template,
             'mermaid': self._mermaid_template,
         }
+        self.styles = {
+            'title': self._title_style,
+            'content': self._content_style,
+            'conversation': self._conversation_style,
+            'summary': self._summary_style,
+            'mermaid': self._mermaid_style,
+        }
+        self._compiled_stylesheet: Optional[str] = None
 
     def render_all(self, slides: List[Dict], output_dir: Path) -> List[Path]:
         """
@@ -35,73 +173,253 @@ class SlideRenderer:
         Returns:
             生成されたPNGファイルパスのリスト
         """
-        from playwright.sync_api import sync_playwright
-
         output_dir.mkdir(parents=True, exist_ok=True)
-        png_paths = []
-
-        with sync_playwright() as p:
-            browser = p.chromium.launch(timeout=60000)  # 60秒（Cloud Run環境対応）
-            context = browser.new_context(viewport=self.VIEWPORT)
-            context.set_default_timeout(60000)  # ページ操作も60秒
-            page = context.new_page()
-
-            for i, slide in enumerate(slides):
-                html_content = self._generate_html(slide)
-                page.set_content(html_content)
-                page.wait_for_load_state('domcontentloaded')
-
-                # mermaidスライドの場合、SVGレンダリング完了を待機
-                if slide.get('type') == 'mermaid':
-                    try:
-                        page.wait_for_function(
-                            "() => document.querySelector('.mermaid svg') !== null",
-                            timeout=10000
-                        )
-                        # 少し待ってレンダリングを安定させる
-                        page.wait_for_timeout(500)
-                    except Exception as e:
-                        print(f"[SlideRenderer] WARNING: mermaid rendering timeout: {e}")
-
-                png_path = output_dir / f"{i+1}.png"
-                page.screenshot(path=str(png_path))
-                png_paths.append(png_path)
-                print(f"[SlideRenderer] Generated: {png_path.name}")
-
-            browser.close()
-
-        return png_paths
+        return write_frames(self.render_frames(slides), output_dir)
+
+    def render_frames(
+        self,
+        slides: List[Dict],
+        on_frame: Optional[Callable[[int, bytes], None]] = None,
+    ) -> List[bytes]:
+        """
+        全スライドをPNGバイト列としてメモリ上にレンダリング（一時ファイルを経由しない）
+
+        キャッシュ済みのスライドはブラウザを使わずにキャッシュから返す。
+        残りはブラウザプールの複数ワーカー（各ワーカーで1ページ）に分散し、
+        空いたページが次の未処理スライドを取得する。戻り値は元の順序を維持する。
+
+        Args:
+            slides: スライドデータのリスト
+            on_frame: 各スライドの完成時に (index, PNGバイト列) で呼ばれるコールバック
+                      （完成順。後続処理を全スライドの完了を待たずに始めるために使う）
+
+        Returns:
+            PNGバイト列のリスト（動画エンコーダーにそのまま渡せる）
+        """
+        if not slides:
+            return []
+
+        frames: List[Optional[bytes]] = [None] * len(slides)
+        keys = [self.cache_key(slide) for slide in slides]
+
+        # 未処理スライドのインデックスを共有キューに積む（ワーカー間の負荷分散）
+        pending: "queue.SimpleQueue[int]" = queue.SimpleQueue()
+        missed = 0
+        for i in range(len(slides)):
+            cached = self.cache.get(keys[i]) if self.cache else None
+            if cached is not None:
+                frames[i] = cached
+                if on_frame:
+                    on_frame(i, cached)
+            else:
+                pending.put(i)
+                missed += 1
+
+        if self.cache:
+            print(f"[SlideRenderer] Cache: {len(slides) - missed} hit, {missed} miss")
+
+        if missed:
+            with browser_pool_scope(self.pool, size=min(self.workers, missed)) as pool:
+                # mermaid図はユニークなコードごとに1回だけSVG化し、スライドには静的SVGを埋め込む
+                svgs = self._prerender_mermaid(pool, slides)
+                render_slides = [self._with_mermaid_svg(slide, svgs) for slide in slides]
+
+                workers = min(self.workers, pool.size, missed)
+                futures = [
+                    pool.submit(lambda page: self._render_pages(page, render_slides, keys, pending, frames, on_frame))
+                    for _ in range(workers)
+                ]
+                for future in futures:
+                    future.result()
+
+        return _complete_frames(frames)
+
+    def cache_key(self, slide: Dict) -> str:
+        """スライド内容・テンプレートバージョン・ビューポートから決まるキャッシュキー"""
+        return content_key(self.TEMPLATE_VERSION, self.VIEWPORT, slide)
 
     def render_single(self, slide: Dict, output_path: Path) -> Path:
         """単一スライドをPNG画像としてレンダリング（デバッグ用）"""
-        from playwright.sync_api import sync_playwright
-
         output_path.parent.mkdir(parents=True, exist_ok=True)
 
-        with sync_playwright() as p:
-            browser = p.chromium.launch(timeout=60000)  # 60秒（Cloud Run環境対応）
-            context = browser.new_context(viewport=self.VIEWPORT)
-            context.set_default_timeout(60000)  # ページ操作も60秒（CDN読み込み対応）
-            page = context.new_page()
+        with browser_pool_scope(self.pool) as pool:
+            render_slide = self._with_mermaid_svg(slide, self._prerender_mermaid(pool, [slide]))
 
-            html_content = self._generate_html(slide)
-            page.set_content(html_content)
-            page.wait_for_load_state('networkidle')
-            page.screenshot(path=str(output_path))
+            def task(page) -> Path:
+                page.set_content(self._generate_html(render_slide))
+                page.wait_for_load_state('networkidle')
+                page.screenshot(path=str(output_path))
+                return output_path
 
-            browser.close()
+            return pool.run(task)
 
-        return output_path
+    def prerender_mermaid(self, slides: List[Dict]) -> Dict[str, Optional[str]]:
+        """mermaidスライドのコードをSVGに変換（ユニークなコードごとに1回、キャッシュ優先）
+
+        Returns:
+            mermaid_code -> SVG文字列（構文エラー時はNone）
+        """
+        with browser_pool_scope(self.pool) as pool:
+            return self._prerender_mermaid(pool, slides)
+
+    def _prerender_mermaid(self, pool: BrowserPool, slides: List[Dict]) -> Dict[str, Optional[str]]:
+        svgs, missing = self._lookup_mermaid_svgs(slides)
+        if missing:
+            rendered = pool.run(lambda page: self._render_svgs(page, missing))
+            self._store_mermaid_svgs(rendered)
+            svgs.update(rendered)
+        return svgs
+
+    def _render_pages(
+        self,
+        page,
+        slides: List[Dict],
+        keys: List[str],
+        pending: "queue.SimpleQueue[int]",
+        frames: List[Optional[bytes]],
+        on_frame: Optional[Callable[[int, bytes], None]] = None,
+    ) -> None:
+        """キューが空になるまでスライドを取得してスクリーンショット（ブラウザプールのワーカー内で実行）
+
+        ページにはシェルを1回だけ読み込み、スライドごとにはbodyの差し替えのみ行う。
+        """
+        prepared = False
+        while True:
+            try:
+                i = pending.get_nowait()
+            except queue.Empty:
+                return
+
+            try:
+                if not prepared:
+                    self._prepare_page(page)
+                    prepared = True
+                data = self._render_slide(page, slides[i])
+            except Exception:
+                # ブラウザクラッシュ時はプールがタスクごと再実行するため、取り出したスライドをキューに戻す
+                pending.put(i)
+                raise
+
+            if self.cache:
+                self.cache.put(keys[i], data)
+            frames[i] = data
+            print(f"[SlideRenderer] Generated: slide {i+1}")
+            if on_frame:
+                on_frame(i, data)
+
+    def _render_slide(self, page, slide: Dict) -> bytes:
+        """シェル読み込み済みのページのbodyを差し替えてスクリーンショット（PNGバイト列を返す）"""
+        slide_type, body = self._slide_body(slide)
+        page.evaluate(_SWAP_BODY_JS, {'type': slide_type, 'body': body})
+        return page.screenshot()
+
+    def _render_svgs(self, page, codes: List[str]) -> Dict[str, Optional[str]]:
+        """mermaid.jsを1回だけ読み込んだページで、各コードをSVG文字列に変換"""
+        page.set_content('<!DOCTYPE html><html><head><meta charset="UTF-8"></head><body></body></html>')
+        page.add_script_tag(content=_load_mermaid_js())
+        page.evaluate("config => mermaid.initialize(config)", MERMAID_CONFIG)
+
+        svgs = {}
+        for code in codes:
+            svgs[code] = page.evaluate(_MERMAID_SVG_JS, {'code': code, 'id': self._mermaid_id(code)})
+            if svgs[code] is None:
+                print(f"[SlideRenderer] WARNING: mermaid syntax error: {code[:60]!r}")
+        return svgs
+
+    # ------------------------------------------------------------
+    # mermaid SVG キャッシュ
+    # ------------------------------------------------------------
+
+    def _mermaid_key(self, code: str) -> str:
+        return content_key('mermaid-svg', _mermaid_fingerprint(), MERMAID_CONFIG, code)
+
+    def _mermaid_id(self, code: str) -> str:
+        # 同じコードからは同じSVG（要素ID含む）を生成する
+        return 'mermaid-' + content_key(code)[:12]
+
+    def _lookup_mermaid_svgs(self, slides: List[Dict]):
+        """ユニークなmermaidコードを抽出し、キャッシュ済みSVGと未生成コードに分ける"""
+        codes = []
+        for slide in slides:
+            code = slide.get('mermaid_code', '')
+            if slide.get('type') == 'mermaid' and code and code not in codes:
+                codes.append(code)
+
+        svgs: Dict[str, Optional[str]] = {}
+        missing = []
+        for code in codes:
+            cached = self.cache.get(self._mermaid_key(code)) if self.cache else None
+            if cached is not None:
+                svgs[code] = cached.decode('utf-8')
+            else:
+                missing.append(code)
+        return svgs, missing
+
+    def _store_mermaid_svgs(self, svgs: Dict[str, Optional[str]]) -> None:
+        if not self.cache:
+            return
+        for code, svg in svgs.items():
+            if svg is not None:
+                self.cache.put(self._mermaid_key(code), svg.encode('utf-8'))
+
+    def _with_mermaid_svg(self, slide: Dict, svgs: Dict[str, Optional[str]]) -> Dict:
+        """mermaidスライドに生成済みSVGを埋め込んだコピーを返す（構文エラー時は空文字）"""
+        if slide.get('type') != 'mermaid':
+            return slide
+        return {**slide, 'mermaid_svg': svgs.get(slide.get('mermaid_code', '')) or ''}
 
     def generate_html(self, slide: Dict) -> str:
         """スライドデータからHTMLを生成（デバッグ用に公開）"""
         return self._generate_html(slide)
 
     def _generate_html(self, slide: Dict) -> str:
-        """スライドデータからHTMLを生成"""
+        """スライドデータから単体HTMLを生成（ページシェル + body）"""
+        slide_type, body = self._slide_body(slide)
+        scripts = ''
+        if slide_type == 'mermaid' and 'mermaid_svg' not in slide:
+            # 事前レンダリングしていない場合（generate_htmlでのデバッグ用）はmermaid.jsをインラインで読み込む
+            scripts = (
+                f'<script>{_load_mermaid_js()}</script>\n'
+                f'<script>mermaid.initialize({json.dumps({**MERMAID_CONFIG, "startOnLoad": True})});</script>'
+            )
+        return self._page_shell(slide_type, body + scripts)
+
+    def _slide_body(self, slide: Dict):
+        """スライドの種類とbody部分のHTMLを返す"""
         slide_type = slide.get('type', 'content')
-        template_fn = self.templates.get(slide_type, self._content_template)
-        return template_fn(slide)
+        if slide_type not in self.templates:
+            slide_type = 'content'
+        return slide_type, self.templates[slide_type](slide)
+
+    # ------------------------------------------------------------
+    # ページシェル（共通スタイルシート）
+    # ------------------------------------------------------------
+
+    def _page_shell(self, slide_type: str = '', body: str = '') -> str:
+        """全スライド共通のスタイルシートを含むHTML
+
+        スライドの種類は body[data-type] で切り替えるため、
+        ワーカーのページはこのシェルを1回だけ読み込み、以降はbodyの差し替えのみで描画できる。
+        """
+        return (
+            f'<!DOCTYPE html>\n<html><head><meta charset="UTF-8">'
+            f'<style>{self._stylesheet()}</style></head>\n'
+            f'<body data-type="{slide_type}">{body}</body></html>'
+        )
+
+    def _stylesheet(self) -> str:
+        """共通CSSと種類別CSSをまとめたスタイルシート（インスタンスごとに1回だけ生成）"""
+        if self._compiled_stylesheet is None:
+            self._compiled_stylesheet = self._base_style() + ''.join(
+                _scope_css(style_fn(), f'body[data-type="{slide_type}"]')
+                for slide_type, style_fn in self.styles.items()
+            )
+        return self._compiled_stylesheet
+
+    def _prepare_page(self, page) -> None:
+        """ワーカーのページにシェルを読み込む（CSSの解析・フォント解決はここで1回だけ行う）"""
+        page.set_content(self._page_shell())
+        page.wait_for_load_state('domcontentloaded')
 
     def _base_style(self) -> str:
         """共通CSSスタイル（CDN依存なし - ローカルフォント使用）"""
@@ -128,21 +446,34 @@ class SlideRenderer:
         strong, b { font-weight: 700; }
         '''
 
+    # ------------------------------------------------------------
+    # スライド種類別テンプレート（style: 種類別CSS / template: body部分）
+    # ------------------------------------------------------------
+
+    def _title_style(self) -> str:
+        return '''
+.slide { justify-content: center; align-items: center; text-align: center; }
+h1 { font-size: 80px; margin-bottom: 30px; text-shadow: 2px 2px 4px rgba(0,0,0,0.3); }
+.subtitle { font-size: 36px; opacity: 0.9; }
+'''
+
     def _title_template(self, slide: Dict) -> str:
         """タイトルスライドテンプレート"""
         title = html.escape(slide.get('title', ''))
         subtitle = html.escape(slide.get('subtitle', ''))
 
-        return f'''<!DOCTYPE html>
-<html><head><meta charset="UTF-8"><style>{self._base_style()}
-.slide {{ justify-content: center; align-items: center; text-align: center; }}
-h1 {{ font-size: 80px; margin-bottom: 30px; text-shadow: 2px 2px 4px rgba(0,0,0,0.3); }}
-.subtitle {{ font-size: 36px; opacity: 0.9; }}
-</style></head>
-<body><div class="slide">
+        return f'''<div class="slide">
     <h1>{title}</h1>
     <div class="subtitle">{subtitle}</div>
-</div></body></html>'''
+</div>'''
+
+    def _content_style(self) -> str:
+        return '''
+.header { margin-bottom: 40px; }
+h2 { border-bottom: 3px solid rgba(255,255,255,0.3); padding-bottom: 20px; }
+ul { flex: 1; display: flex; flex-direction: column; justify-content: flex-start; padding-top: 20px; }
+li { font-size: 38px; margin-bottom: 25px; }
+'''
 
     def _content_template(self, slide: Dict) -> str:
         """コンテンツスライドテンプレート（見出し + 箇条書き）"""
@@ -150,19 +481,23 @@ h1 {{ font-size: 80px; margin-bottom: 30px; text-shadow: 2px 2px 4px rgba(0,0,0,
         bullets = slide.get('bullets', [])
         bullets_html = ''.join(f'<li>{html.escape(str(b))}</li>' for b in bullets)
 
-        return f'''<!DOCTYPE html>
-<html><head><meta charset="UTF-8"><style>{self._base_style()}
-.header {{ margin-bottom: 40px; }}
-h2 {{ border-bottom: 3px solid rgba(255,255,255,0.3); padding-bottom: 20px; }}
-ul {{ flex: 1; display: flex; flex-direction: column; justify-content: flex-start; padding-top: 20px; }}
-li {{ font-size: 38px; margin-bottom: 25px; }}
-</style></head>
-<body><div class="slide">
+        return f'''<div class="slide">
     <div class="header">
         <h2>{heading}</h2>
     </div>
     <ul>{bullets_html}</ul>
-</div></body></html>'''
+</div>'''
+
+    def _conversation_style(self) -> str:
+        return '''
+h2 { margin-bottom: 30px; }
+.conversation { display: flex; flex-direction: column; gap: 30px; flex: 1; justify-content: center; }
+.message { padding: 30px 40px; border-radius: 20px; max-width: 85%; }
+.teacher { background: rgba(255,255,255,0.2); align-self: flex-start; }
+.student { background: rgba(0,0,0,0.2); align-self: flex-end; }
+.role { font-weight: bold; margin-bottom: 15px; font-size: 28px; display: flex; align-items: center; gap: 10px; }
+.text { font-size: 34px; line-height: 1.6; }
+'''
 
     def _conversation_template(self, slide: Dict) -> str:
         """会話形式スライドテンプレート（先生/生徒）"""
@@ -170,17 +505,7 @@ li {{ font-size: 38px; margin-bottom: 25px; }}
         teacher = html.escape(slide.get('teacher', ''))
         student = html.escape(slide.get('student', ''))
 
-        return f'''<!DOCTYPE html>
-<html><head><meta charset="UTF-8"><style>{self._base_style()}
-h2 {{ margin-bottom: 30px; }}
-.conversation {{ display: flex; flex-direction: column; gap: 30px; flex: 1; justify-content: center; }}
-.message {{ padding: 30px 40px; border-radius: 20px; max-width: 85%; }}
-.teacher {{ background: rgba(255,255,255,0.2); align-self: flex-start; }}
-.student {{ background: rgba(0,0,0,0.2); align-self: flex-end; }}
-.role {{ font-weight: bold; margin-bottom: 15px; font-size: 28px; display: flex; align-items: center; gap: 10px; }}
-.text {{ font-size: 34px; line-height: 1.6; }}
-</style></head>
-<body><div class="slide">
+        return f'''<div class="slide">
     <h2>{heading}</h2>
     <div class="conversation">
         <div class="message teacher">
@@ -192,7 +517,23 @@ h2 {{ margin-bottom: 30px; }}
             <div class="text">{student}</div>
         </div>
     </div>
-</div></body></html>'''
+</div>'''
+
+    def _summary_style(self) -> str:
+        return '''
+h2 { text-align: center; margin-bottom: 50px; }
+ul { display: flex; flex-direction: column; gap: 25px; max-width: 1400px; margin: 0 auto; }
+li { display: flex; align-items: flex-start; gap: 20px; font-size: 36px; }
+li::before { content: none; }
+.num {
+    background: rgba(255,255,255,0.3);
+    width: 50px; height: 50px;
+    border-radius: 50%;
+    display: flex; align-items: center; justify-content: center;
+    font-weight: bold; font-size: 28px;
+    flex-shrink: 0;
+}
+'''
 
     def _summary_template(self, slide: Dict) -> str:
         """まとめスライドテンプレート"""
@@ -203,52 +544,25 @@ h2 {{ margin-bottom: 30px; }}
             for i, p in enumerate(points)
         )
 
-        return f'''<!DOCTYPE html>
-<html><head><meta charset="UTF-8"><style>{self._base_style()}
-h2 {{ text-align: center; margin-bottom: 50px; }}
-ul {{ display: flex; flex-direction: column; gap: 25px; max-width: 1400px; margin: 0 auto; }}
-li {{ display: flex; align-items: flex-start; gap: 20px; font-size: 36px; }}
-li::before {{ content: none; }}
-.num {{
-    background: rgba(255,255,255,0.3);
-    width: 50px; height: 50px;
-    border-radius: 50%;
-    display: flex; align-items: center; justify-content: center;
-    font-weight: bold; font-size: 28px;
-    flex-shrink: 0;
-}}
-</style></head>
-<body><div class="slide">
+        return f'''<div class="slide">
     <h2>{heading}</h2>
     <ul>{points_html}</ul>
-</div></body></html>'''
+</div>'''
 
-    def _mermaid_template(self, slide: Dict) -> str:
-        """Mermaid図スライドテンプレート（インラインJS埋め込み - set_content対応）"""
-        heading = html.escape(slide.get('heading', '図解'))
-        mermaid_code = slide.get('mermaid_code', '')
-
-        # ローカルのmermaid.jsファイルを読み込んでインライン埋め込み
-        # Playwrightのset_content()ではfile://プロトコルが使えないため
-        static_dir = Path(__file__).parent.parent / 'static'
-        mermaid_js_path = static_dir / 'mermaid.min.js'
-        mermaid_js_content = mermaid_js_path.read_text(encoding='utf-8') if mermaid_js_path.exists() else ''
-
-        return f'''<!DOCTYPE html>
-<html><head><meta charset="UTF-8">
-<script>{mermaid_js_content}</script>
-<style>{self._base_style()}
-.slide {{ justify-content: flex-start; padding: 60px; }}
-h2 {{ text-align: center; margin-bottom: 20px; font-size: 52px; }}
-.mermaid-container {{
+    def _mermaid_style(self) -> str:
+        """Mermaid図スライド用CSS"""
+        return '''
+.slide { justify-content: flex-start; padding: 60px; }
+h2 { text-align: center; margin-bottom: 20px; font-size: 52px; }
+.mermaid-container {
     flex: 1;
     display: flex;
     justify-content: center;
     align-items: center;
     width: 100%;
     height: 100%;
-}}
-.mermaid {{
+}
+.mermaid {
     background: rgba(255,255,255,0.95);
     border-radius: 24px;
     padding: 50px 60px;
@@ -258,30 +572,196 @@ h2 {{ text-align: center; margin-bottom: 20px; font-size: 52px; }}
     display: flex;
     justify-content: center;
     align-items: center;
-}}
-.mermaid svg {{
+    color: #333;
+    white-space: pre-wrap;
+    font-size: 24px;
+}
+.mermaid svg {
     width: 100% !important;
     height: auto !important;
     min-width: 1200px;
     max-height: 850px;
-}}
-</style>
-</head>
-<body>
-<div class="slide">
+}
+'''
+
+    def _mermaid_template(self, slide: Dict) -> str:
+        """Mermaid図スライドテンプレート
+
+        事前レンダリング済みのSVG（mermaid_svg）があれば静的に埋め込む（JS実行・待機なし）。
+        SVGが空（構文エラー）またはmermaid_svgがない場合はコードをテキストとして置く。
+        """
+        heading = html.escape(slide.get('heading', '図解'))
+        diagram_html = slide.get('mermaid_svg') or html.escape(slide.get('mermaid_code', ''))
+
+        return f'''<div class="slide">
     <h2>{heading}</h2>
     <div class="mermaid-container">
-        <pre class="mermaid">
-{mermaid_code}
-        </pre>
+        <div class="mermaid">{diagram_html}</div>
     </div>
-</div>
-<script>
-    mermaid.initialize({{
-        startOnLoad: true,
-        theme: 'default',
-        securityLevel: 'loose',
-        flowchart: {{ curve: 'basis' }}
-    }});
-</script>
-</body></html>'''
+</div>'''
+
+
+class AsyncSlideRenderer(SlideRenderer):
+    """playwright.async_api ベースのスライドレンダラー
+
+    FastAPIハンドラ等のイベントループ上から直接awaitでき、
+    複数ジョブのレンダリングをスレッドを消費せずに1つのループ上でインターリーブする。
+    テンプレート・キャッシュキーはSlideRendererと共通。
+    """
+
+    def __init__(
+        self,
+        pool: Optional[AsyncBrowserPool] = None,
+        workers: Optional[int] = None,
+        cache: Optional[ContentCache] = None,
+        use_cache: bool = True,
+    ):
+        super().__init__(workers=workers, cache=cache, use_cache=use_cache)
+        self.async_pool = pool
+
+    async def render_all(self, slides: List[Dict], output_dir: Path) -> List[Path]:
+        """全スライドをPNG画像としてレンダリング（SlideRenderer.render_allのasync版）"""
+        output_dir.mkdir(parents=True, exist_ok=True)
+        frames = await self.render_frames(slides)
+        return await asyncio.to_thread(write_frames, frames, output_dir)
+
+    async def render_frames(
+        self,
+        slides: List[Dict],
+        on_frame: Optional[Callable[[int, bytes], None]] = None,
+    ) -> List[bytes]:
+        """全スライドをPNGバイト列としてレンダリング（SlideRenderer.render_framesのasync版）"""
+        if not slides:
+            return []
+
+        frames: List[Optional[bytes]] = [None] * len(slides)
+        keys = [self.cache_key(slide) for slide in slides]
+
+        pending: List[int] = []
+        for i in range(len(slides)):
+            # キャッシュはディスク/Storage I/Oのためスレッドで参照
+            cached = await asyncio.to_thread(self.cache.get, keys[i]) if self.cache else None
+            if cached is not None:
+                frames[i] = cached
+                if on_frame:
+                    on_frame(i, cached)
+            else:
+                pending.append(i)
+
+        if self.cache:
+            print(f"[AsyncSlideRenderer] Cache: {len(slides) - len(pending)} hit, {len(pending)} miss")
+
+        if pending:
+            # 単一スレッド上なので、popで取り出すだけでワーカー間の負荷分散になる
+            pending.reverse()
+            async with async_browser_pool_scope(self.async_pool, size=min(self.workers, len(pending))) as pool:
+                svgs = await self._prerender_mermaid(pool, slides)
+                render_slides = [self._with_mermaid_svg(slide, svgs) for slide in slides]
+
+                workers = min(self.workers, pool.size, len(pending))
+                await asyncio.gather(*[
+                    pool.run(lambda page: self._render_pages(page, render_slides, keys, pending, frames, on_frame))
+                    for _ in range(workers)
+                ])
+
+        return _complete_frames(frames)
+
+    async def render_single(self, slide: Dict, output_path: Path) -> Path:
+        """単一スライドをPNG画像としてレンダリング（デバッグ用）"""
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+        async with async_browser_pool_scope(self.async_pool) as pool:
+            render_slide = self._with_mermaid_svg(slide, await self._prerender_mermaid(pool, [slide]))
+
+            async def task(page) -> Path:
+                await page.set_content(self._generate_html(render_slide))
+                await page.wait_for_load_state('networkidle')
+                await page.screenshot(path=str(output_path))
+                return output_path
+
+            return await pool.run(task)
+
+    async def prerender_mermaid(self, slides: List[Dict]) -> Dict[str, Optional[str]]:
+        """mermaidコードをSVGに変換（SlideRenderer.prerender_mermaidのasync版）"""
+        async with async_browser_pool_scope(self.async_pool) as pool:
+            return await self._prerender_mermaid(pool, slides)
+
+    async def _prerender_mermaid(self, pool: AsyncBrowserPool, slides: List[Dict]) -> Dict[str, Optional[str]]:
+        svgs, missing = await asyncio.to_thread(self._lookup_mermaid_svgs, slides)
+        if missing:
+            rendered = await pool.run(lambda page: self._render_svgs(page, missing))
+            await asyncio.to_thread(self._store_mermaid_svgs, rendered)
+            svgs.update(rendered)
+        return svgs
+
+    async def _render_pages(
+        self,
+        page,
+        slides: List[Dict],
+        keys: List[str],
+        pending: List[int],
+        frames: List[Optional[bytes]],
+        on_frame: Optional[Callable[[int, bytes], None]] = None,
+    ) -> None:
+        prepared = False
+        while pending:
+            i = pending.pop()
+            try:
+                if not prepared:
+                    await self._prepare_page(page)
+                    prepared = True
+                data = await self._render_slide(page, slides[i])
+            except Exception:
+                # ブラウザクラッシュ時の再実行で描画されるよう、取り出したスライドを戻す
+                pending.append(i)
+                raise
+
+            if self.cache:
+                await asyncio.to_thread(self.cache.put, keys[i], data)
+            frames[i] = data
+            print(f"[AsyncSlideRenderer] Generated: slide {i+1}")
+            if on_frame:
+                on_frame(i, data)
+
+    async def _prepare_page(self, page) -> None:
+        await page.set_content(self._page_shell())
+        await page.wait_for_load_state('domcontentloaded')
+
+    async def _render_slide(self, page, slide: Dict) -> bytes:
+        slide_type, body = self._slide_body(slide)
+        await page.evaluate(_SWAP_BODY_JS, {'type': slide_type, 'body': body})
+        return await page.screenshot()
+
+    async def _render_svgs(self, page, codes: List[str]) -> Dict[str, Optional[str]]:
+        await page.set_content('<!DOCTYPE html><html><head><meta charset="UTF-8"></head><body></body></html>')
+        await page.add_script_tag(content=_load_mermaid_js())
+        await page.evaluate("config => mermaid.initialize(config)", MERMAID_CONFIG)
+
+        svgs = {}
+        for code in codes:
+            svgs[code] = await page.evaluate(_MERMAID_SVG_JS, {'code': code, 'id': self._mermaid_id(code)})
+            if svgs[code] is None:
+                print(f"[AsyncSlideRenderer] WARNING: mermaid syntax error: {code[:60]!r}")
+        return svgs
+
+
+class LoopSlideRenderer:
+    """AsyncSlideRendererをイベントループ上で実行し、別スレッドから同期的に呼べるようにする
+
+    asyncio.to_thread() で実行中の VideoPipeline に renderer として渡すと、
+    レンダリングはハンドラのイベントループ（共有Asyncプール）上で行われ、
+    パイプライン側では音声取得・エンコードと重ねて実行できる。
+    on_frame はイベントループのスレッドから呼ばれる。
+    """
+
+    def __init__(self, renderer: AsyncSlideRenderer, loop: asyncio.AbstractEventLoop):
+        self.renderer = renderer
+        self.loop = loop
+
+    def render_frames(
+        self,
+        slides: List[Dict],
+        on_frame: Optional[Callable[[int, bytes], None]] = None,
+    ) -> List[bytes]:
+        future = asyncio.run_coroutine_threadsafe(self.renderer.render_frames(slides, on_frame), self.loop)
+        return future.result()
@@ -3,15 +3,30 @@
 Issue #29: PDFストレージのSupabase移行
 """
 
-from typing import Optional
+import base64
+import os
+import time
+from pathlib import Path
+from typing import BinaryIO, List, Optional, Union
+from urllib.parse import urljoin
+
 from app.core.supabase import get_supabase_client
 
+# Supabase Storageのresumable upload（TUS）はチャンクサイズ6MB固定
+RESUMABLE_CHUNK_SIZE = 6 * 1024 * 1024
+# このサイズを超えるファイルはresumable uploadを使う
+RESUMABLE_UPLOAD_THRESHOLD = int(os.getenv("RESUMABLE_UPLOAD_THRESHOLD_MB", "6")) * 1024 * 1024
+# チャンク送信失敗時のリトライ回数（最後に確定したオフセットから再開）
+UPLOAD_RETRIES = int(os.getenv("STORAGE_UPLOAD_RETRIES", "5"))
+TUS_VERSION = "1.0.0"
+
 
 def upload_to_storage(
     bucket: str,
     file_path: str,
     file_data: bytes,
-    content_type: str = "application/octet-stream"
+    content_type: str = "application/octet-stream",
+    cache_control: Optional[str] = None
 ) -> Optional[str]:
     """Supabase Storageにファイルをアップロード
 
@@ -20,6 +35,7 @@ def upload_to_storage(
         file_path: ストレージパス（user_id/filename.pdf）
         file_data: ファイルバイナリ
         content_type: MIMEタイプ
+        cache_control: CDNキャッシュの秒数（上書きされ続けるファイルは "0"）
 
     Returns:
         公開URL or 署名付きURL（uploadsバケットの場合は1時間有効）
@@ -33,25 +49,179 @@ def upload_to_storage(
 
     try:
         # アップロード（既存ファイルは上書き）
+        file_options = {"content-type": content_type, "upsert": "true"}
+        if cache_control is not None:
+            file_options["cache-control"] = cache_control
         client.storage.from_(bucket).upload(
             path=file_path,
             file=file_data,
-            file_options={"content-type": content_type, "upsert": "true"}
+            file_options=file_options
         )
 
-        # slide-filesバケットは公開URL
-        if bucket == "slide-files":
-            return client.storage.from_(bucket).get_public_url(file_path)
-
-        # uploadsバケットは署名付きURL（1時間有効）
-        result = client.storage.from_(bucket).create_signed_url(file_path, 3600)
-        return result["signedURL"]
+        return _file_url(client, bucket, file_path)
 
     except Exception as e:
         print(f"[storage] Upload failed: {e}")
         raise
 
 
+def upload_file_to_storage(
+    bucket: str,
+    file_path: str,
+    source: Union[str, Path, BinaryIO],
+    content_type: str = "application/octet-stream"
+) -> Optional[str]:
+    """ファイルをメモリに全て読み込まずにSupabase Storageへアップロード
+
+    RESUMABLE_UPLOAD_THRESHOLD を超えるファイルはTUSプロトコルで6MBずつ送信し、
+    失敗時はサーバー上で確定済みのオフセットから再開する。小さいファイルは upload_to_storage を使う。
+
+    Args:
+        bucket: バケット名
+        file_path: ストレージパス
+        source: ローカルファイルのパス、またはシーク可能なバイナリファイルオブジェクト
+        content_type: MIMEタイプ
+
+    Returns:
+        公開URL or 署名付きURL（upload_to_storageと同じ）
+
+    Raises:
+        Exception: アップロード失敗時
+    """
+    if isinstance(source, (str, Path)):
+        with open(source, "rb") as f:
+            return upload_file_to_storage(bucket, file_path, f, content_type)
+
+    size = source.seek(0, os.SEEK_END)
+    source.seek(0)
+    if size <= RESUMABLE_UPLOAD_THRESHOLD:
+        return upload_to_storage(bucket, file_path, source.read(), content_type)
+
+    client = get_supabase_client()
+    if not client:
+        raise Exception("Supabase client not configured")
+
+    try:
+        _tus_upload(bucket, file_path, source, size, content_type)
+        return _file_url(client, bucket, file_path)
+    except Exception as e:
+        print(f"[storage] Resumable upload failed: {e}")
+        raise
+
+
+def _file_url(client, bucket: str, file_path: str) -> str:
+    # slide-filesバケットは公開URL
+    if bucket == "slide-files":
+        return client.storage.from_(bucket).get_public_url(file_path)
+
+    # uploadsバケットは署名付きURL（1時間有効）
+    result = client.storage.from_(bucket).create_signed_url(file_path, 3600)
+    return result["signedURL"]
+
+
+def _tus_upload(
+    bucket: str,
+    file_path: str,
+    source: BinaryIO,
+    size: int,
+    content_type: str,
+    session=None,
+) -> None:
+    """TUS（resumable upload）でファイルをチャンク送信
+
+    1. POST でアップロードを作成し、Locationを取得（失敗時は指数バックオフで再試行）
+    2. PATCH で Upload-Offset から6MBずつ送信
+    3. 送信失敗時は HEAD で確定済みオフセットを取得し、そこから再開（指数バックオフ）
+    """
+    if session is None:
+        import requests
+        with requests.Session() as owned_session:
+            return _tus_upload(bucket, file_path, source, size, content_type, session=owned_session)
+
+    base_url = os.getenv("SUPABASE_URL", "").rstrip("/")
+    key = os.getenv("SUPABASE_SERVICE_KEY", "")
+    endpoint = f"{base_url}/storage/v1/upload/resumable"
+    headers = {
+        "Authorization": f"Bearer {key}",
+        "apikey": key,
+        "Tus-Resumable": TUS_VERSION,
+    }
+
+    metadata = {
+        "bucketName": bucket,
+        "objectName": file_path,
+        "contentType": content_type,
+        "cacheControl": "3600",
+    }
+    create_headers = {
+        **headers,
+        "Upload-Length": str(size),
+        "Upload-Metadata": ",".join(
+            f"{k} {base64.b64encode(v.encode('utf-8')).decode('ascii')}" for k, v in metadata.items()
+        ),
+        "x-upsert": "true",
+    }
+    location = None
+    failures = 0
+    while location is None:
+        try:
+            response = session.post(endpoint, headers=create_headers, timeout=30)
+            response.raise_for_status()
+            location = urljoin(endpoint, response.headers["Location"])
+        except Exception as e:
+            failures += 1
+            if failures > UPLOAD_RETRIES:
+                raise
+            delay = _retry_delay(failures)
+            print(f"[storage] Upload creation failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    offset = 0
+    failures = 0
+    while offset < size:
+        source.seek(offset)
+        chunk = source.read(RESUMABLE_CHUNK_SIZE)
+        try:
+            response = session.patch(
+                location,
+                headers={
+                    **headers,
+                    "Upload-Offset": str(offset),
+                    "Content-Type": "application/offset+octet-stream",
+                },
+                data=chunk,
+                timeout=120,
+            )
+            response.raise_for_status()
+            offset = int(response.headers.get("Upload-Offset", offset + len(chunk)))
+            failures = 0
+        except Exception as e:
+            failures += 1
+            if failures > UPLOAD_RETRIES:
+                raise
+            delay = _retry_delay(failures)
+            print(f"[storage] Chunk upload failed at offset {offset} ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+            offset = _tus_offset(session, location, headers, offset)
+
+    print(f"[storage] Resumable upload completed: {file_path} ({size / 1024 / 1024:.1f}MB)")
+
+
+def _retry_delay(failures: int) -> float:
+    """連続失敗回数に応じた待ち時間（0.5秒から倍々）"""
+    return 0.5 * (2 ** (failures - 1))
+
+
+def _tus_offset(session, location: str, headers: dict, fallback: int) -> int:
+    """サーバー上で確定済みのオフセットを取得（取得できなければ fallback）"""
+    try:
+        response = session.head(location, headers=headers, timeout=30)
+        response.raise_for_status()
+        return int(response.headers["Upload-Offset"])
+    except Exception:
+        return fallback
+
+
 def download_from_storage(bucket: str, file_path: str) -> Optional[bytes]:
     """Supabase Storageからファイルをダウンロード
 
@@ -93,3 +263,28 @@ def delete_from_storage(bucket: str, file_path: str) -> bool:
     except Exception as e:
         print(f"[storage] Delete failed: {e}")
         return False
+
+
+def delete_files_from_storage(bucket: str, file_paths: List[str]) -> bool:
+    """Supabase Storageから複数ファイルを1回のリクエストで削除
+
+    Args:
+        bucket: バケット名
+        file_paths: ストレージパスのリスト
+
+    Returns:
+        成功: True、失敗: False
+    """
+    if not file_paths:
+        return True
+
+    client = get_supabase_client()
+    if not client:
+        return False
+
+    try:
+        client.storage.from_(bucket).remove(list(file_paths))
+        return True
+    except Exception as e:
+        print(f"[storage] Delete failed: {e}")
+        return False
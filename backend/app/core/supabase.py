@@ -193,7 +193,9 @@ def create_video_job(
     user_id: str,
     slides_json: List[Dict],
     audio_files: List[str],
-    title: str
+    title: str,
+    output_format: Optional[str] = None,
+    audio_durations: Optional[List[Optional[float]]] = None
 ) -> Dict:
     """動画生成ジョブを作成
 
@@ -203,6 +205,8 @@ def create_video_job(
         slides_json: スライドデータ（JSON）
         audio_files: 音声ファイルURLリスト
         title: スライドタイトル
+        output_format: 出力形式（"mp4" / "hls"、未指定ならジョブ側のデフォルト）
+        audio_durations: 各音声の長さ（秒）。ジョブで音声をデコードせずに済む
 
     Returns:
         成功時: {"job_id": str}
@@ -221,7 +225,9 @@ def create_video_job(
             "input_data": json.dumps({
                 "slides_json": slides_json,
                 "audio_files": audio_files,
-                "title": title
+                "title": title,
+                "output_format": output_format,
+                "audio_durations": audio_durations
             })
         }
 
@@ -278,7 +284,7 @@ def get_video_job_status(job_id: str) -> Optional[Dict]:
     try:
         response = (
             client.table("video_jobs")
-            .select("id, status, video_url, error_message, user_id")
+            .select("id, status, video_url, error_message, user_id, slides_done, slides_total, preview_url")
             .eq("id", job_id)
             .execute()
         )
@@ -291,7 +297,13 @@ def get_video_job_status(job_id: str) -> Optional[Dict]:
         return None
 
 
-def update_video_job(job_id: str, status: str, video_url: Optional[str] = None, error_message: Optional[str] = None) -> Dict:
+def update_video_job(
+    job_id: str,
+    status: str,
+    video_url: Optional[str] = None,
+    error_message: Optional[str] = None,
+    metrics: Optional[Dict] = None
+) -> Dict:
     """動画生成ジョブのステータスを更新
 
     Args:
@@ -299,6 +311,7 @@ def update_video_job(job_id: str, status: str, video_url: Optional[str] = None,
         status: ステータス（pending, processing, completed, failed）
         video_url: 動画URL（completed時）
         error_message: エラーメッセージ（failed時）
+        metrics: ステージごとの処理時間など（VideoPipeline.metrics()）
 
     Returns:
         成功時: {"success": True}
@@ -314,6 +327,8 @@ def update_video_job(job_id: str, status: str, video_url: Optional[str] = None,
             update_data["video_url"] = video_url
         if error_message:
             update_data["error_message"] = error_message
+        if metrics:
+            update_data["metrics"] = metrics
 
         response = (
             client.table("video_jobs")
@@ -329,3 +344,50 @@ def update_video_job(job_id: str, status: str, video_url: Optional[str] = None,
 
     except Exception as e:
         return {"error": f"Supabase update failed: {str(e)}"}
+
+
+def update_video_job_progress(
+    job_id: str,
+    slides_done: int,
+    slides_total: int,
+    preview_url: Optional[str] = None,
+    clear_preview: bool = False
+) -> Dict:
+    """動画生成ジョブの進捗を更新（ステータスは変更しない）
+
+    Args:
+        job_id: ジョブID（UUID）
+        slides_done: エンコード済みスライド数
+        slides_total: 全スライド数
+        preview_url: 完成済みセグメントのHLSプレイリストURL
+        clear_preview: Trueならpreview_urlを削除（プレビューのファイルを消した後）
+
+    Returns:
+        成功時: {"success": True}
+        失敗時: {"error": str}
+    """
+    client = get_supabase_client()
+    if not client:
+        return {"error": "Supabase not configured"}
+
+    try:
+        update_data: Dict = {"slides_done": slides_done, "slides_total": slides_total}
+        if clear_preview:
+            update_data["preview_url"] = None
+        elif preview_url:
+            update_data["preview_url"] = preview_url
+
+        response = (
+            client.table("video_jobs")
+            .update(update_data)
+            .eq("id", job_id)
+            .execute()
+        )
+
+        if response.data and len(response.data) > 0:
+            return {"success": True}
+        else:
+            return {"error": "Failed to update video job progress"}
+
+    except Exception as e:
+        return {"error": f"Supabase update failed: {str(e)}"}
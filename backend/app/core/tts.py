@@ -0,0 +1,280 @@
+"""ナレーション音声合成（OpenAI TTS）
+
+同じテキスト・モデル・声・速度の音声は内容が変わらないため、
+hash(text, model, voice, speed) をキーにローカルディスク（TTS_CACHE_BUCKET指定時はSupabase Storageにも）にキャッシュし、
+サンプルデッキや再生成ではTTS APIを呼ばずに再利用する。
+
+API呼び出しは AsyncOpenAI で行い、プロセス全体で共有するトークンバケット
+（リクエスト数/分・文字数/分）で同時に動く複数のワークフローの合計をレート制限内に収める。
+429/5xx はジッター付き指数バックオフで再試行し、失敗したスライドだけを結果から外す。
+生成した音声は一時ファイルを経由せず、そのまま並列にSupabase Storageへアップロードする。
+"""
+
+import asyncio
+import contextlib
+import os
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from app.core.audio_probe import mp3_duration
+from app.core.content_cache import ContentCache, cached_content_cache, content_key
+
+TTS_CACHE_ENABLED = os.getenv("TTS_CACHE_ENABLED", "true").lower() == "true"
+TTS_CACHE_DIR = Path(os.getenv("TTS_CACHE_DIR", str(Path(tempfile.gettempdir()) / "slidepilot-cache" / "tts")))
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "64"))
+TTS_CACHE_BUCKET = os.getenv("TTS_CACHE_BUCKET")  # 例: slide-files（未設定ならローカルのみ）
+
+# OpenAIのレート制限（プロセス全体で共有、0で無制限）
+TTS_REQUESTS_PER_MINUTE = int(os.getenv("TTS_REQUESTS_PER_MINUTE", "50"))
+TTS_CHARS_PER_MINUTE = int(os.getenv("TTS_CHARS_PER_MINUTE", "0"))
+# 1回のナレーション生成で同時に送るリクエスト数
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", "5"))
+TTS_MAX_RETRIES = int(os.getenv("TTS_MAX_RETRIES", "4"))
+TTS_RETRY_BASE_SEC = 1.0
+TTS_RETRY_MAX_SEC = 30.0
+TTS_STREAM_CHUNK_SIZE = 64 * 1024
+
+# ナレーション音声のアップロード先（動画ジョブがURLから取得する）
+NARRATION_BUCKET = "slide-files"
+
+
+def get_tts_cache() -> Optional[ContentCache]:
+    """プロセス共有のTTSキャッシュを返す（無効化時はNone）"""
+    return cached_content_cache(TTS_CACHE_ENABLED, TTS_CACHE_DIR, TTS_CACHE_MAX_MB, TTS_CACHE_BUCKET, "cache/tts")
+
+
+def tts_cache_key(text: str, model: str, voice: str, speed: float) -> str:
+    """ナレーション音声のキャッシュキー（音声の内容を決める入力すべてを含める）"""
+    return content_key('tts', text, model, voice, float(speed))
+
+
+class TokenBucket:
+    """スレッドセーフなトークンバケット
+
+    1分あたり per_minute トークンを一定速度で補充し、最大 per_minute まで貯める。
+    別スレッド・別イベントループのワークフローからも同じインスタンスを共有できるよう、
+    状態はthreading.Lockで保護し、待機は呼び出し側のイベントループで asyncio.sleep する。
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """amountトークンを予約し、使用可能になるまでの待ち時間（秒）を返す
+
+        残量が足りなければ先に差し引いて（マイナス残高）待ち時間を返すため、
+        後から来たリクエストは前のリクエストの後ろに並ぶ。
+        """
+        if self.rate <= 0:
+            return 0.0
+        # 容量を超える要求は容量分として扱う（永久に待たないように）
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    async def acquire(self, amount: float = 1) -> None:
+        wait = self.reserve(amount)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class TtsRateLimiter:
+    """リクエスト数/分と文字数/分の2つのトークンバケット"""
+
+    def __init__(self, requests_per_minute: int, chars_per_minute: int):
+        self.requests = TokenBucket(requests_per_minute)
+        self.chars = TokenBucket(chars_per_minute)
+
+    async def acquire(self, chars: int) -> None:
+        wait = max(self.requests.reserve(1), self.chars.reserve(chars))
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+_tts_limiter: Optional[TtsRateLimiter] = None
+_tts_limiter_lock = threading.Lock()
+
+
+def get_tts_limiter() -> TtsRateLimiter:
+    """プロセス共有のTTSレートリミッターを返す"""
+    global _tts_limiter
+
+    with _tts_limiter_lock:
+        if _tts_limiter is None:
+            _tts_limiter = TtsRateLimiter(TTS_REQUESTS_PER_MINUTE, TTS_CHARS_PER_MINUTE)
+        return _tts_limiter
+
+
+def _is_retryable(error: Exception) -> bool:
+    # 429（レート制限）・5xx・接続エラーのみ再試行する
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+
+    import openai
+    return isinstance(error, openai.APIConnectionError)
+
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """Retry-Afterヘッダーがあればそれに従い、なければフルジッター付き指数バックオフ"""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), TTS_RETRY_MAX_SEC)
+        except ValueError:
+            pass
+    return random.uniform(0, min(TTS_RETRY_MAX_SEC, TTS_RETRY_BASE_SEC * (2 ** attempt)))
+
+
+async def synthesize_speech(
+    client,
+    text: str,
+    model: str,
+    voice: str,
+    speed: float = 1.0,
+    cache: Optional[ContentCache] = None,
+    limiter: Optional[TtsRateLimiter] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+) -> Tuple[bytes, bool]:
+    """テキストを音声（MP3）に変換
+
+    レスポンスはストリーミングで受信し、一時ファイルを作らずにメモリ上で連結する。
+
+    Args:
+        client: AsyncOpenAIクライアント
+        text: ナレーションテキスト
+        model / voice / speed: TTS設定
+        cache: TTSキャッシュ（Noneならキャッシュを使わない）
+        limiter: レートリミッター（未指定時はプロセス共有）
+        semaphore: 同時実行数の枠。API呼び出しの間だけ保持し、キャッシュの読み書き中は解放する
+
+    Returns:
+        (MP3バイト列, キャッシュから取得した場合はTrue)
+
+    Raises:
+        Exception: 再試行しても失敗した場合
+    """
+    key = tts_cache_key(text, model, voice, speed) if cache else None
+    if key:
+        data = await asyncio.to_thread(cache.get, key)
+        if data is not None:
+            return data, True
+
+    limiter = limiter or get_tts_limiter()
+    async with semaphore or contextlib.nullcontext():
+        for attempt in range(TTS_MAX_RETRIES + 1):
+            await limiter.acquire(len(text))
+            try:
+                data = await _stream_speech(client, text, model, voice, speed)
+                break
+            except Exception as e:
+                if attempt >= TTS_MAX_RETRIES or not _is_retryable(e):
+                    raise
+                delay = _retry_delay(e, attempt)
+                print(f"[tts] Retrying in {delay:.1f}s ({attempt + 1}/{TTS_MAX_RETRIES}): {str(e)[:80]}")
+                await asyncio.sleep(delay)
+
+    if key:
+        await asyncio.to_thread(cache.put, key, data)
+    return data, False
+
+
+async def _stream_speech(client, text: str, model: str, voice: str, speed: float) -> bytes:
+    buffer = bytearray()
+    async with client.audio.speech.with_streaming_response.create(
+        model=model,
+        voice=voice,
+        input=text,
+        speed=speed,
+        response_format="mp3"
+    ) as response:
+        async for chunk in response.iter_bytes(TTS_STREAM_CHUNK_SIZE):
+            buffer.extend(chunk)
+    return bytes(buffer)
+
+
+def _upload_narration(storage_path: str, data: bytes) -> str:
+    from app.core.storage import upload_to_storage
+
+    return upload_to_storage(
+        bucket=NARRATION_BUCKET,
+        file_path=storage_path,
+        file_data=data,
+        content_type="audio/mpeg"
+    )
+
+
+async def synthesize_narrations(
+    texts: Sequence[str],
+    storage_prefix: str,
+    model: str,
+    voice: str,
+    speed: float = 1.0,
+    client=None,
+    cache: Optional[ContentCache] = None,
+    limiter: Optional[TtsRateLimiter] = None,
+    concurrency: int = TTS_CONCURRENCY,
+    upload: Callable[[str, bytes], str] = _upload_narration,
+) -> List[Optional[Tuple[str, Optional[float]]]]:
+    """全スライドのナレーション音声を並列に生成し、Supabase Storageにアップロード
+
+    各スライドは音声ができた時点でアップロードを始めるため、
+    アップロードは他のスライドのTTSと並行して進む（TTSの同時実行数の枠は消費しない）。
+    失敗したスライドは警告を出してNoneを返し、他のスライドの処理は続ける。
+
+    Args:
+        texts: スライドごとのナレーションテキスト
+        storage_prefix: アップロード先（{storage_prefix}/narration_000.mp3, ...）
+        client: AsyncOpenAIクライアント（未指定時は作成し、終了時に閉じる。再試行はこの関数で行う）
+        concurrency: 同時に送るTTSリクエスト数の上限
+        upload: (Storageパス, MP3バイト列) を受け取りURLを返す関数（ブロッキング、別スレッドで実行）
+
+    Returns:
+        スライド順の (音声URL, 秒数)（失敗したスライドはNone）。
+        秒数はMP3のフレームヘッダーから求め、動画ジョブでの長さ取得を省く（解析できなければNone）
+    """
+    if client is None:
+        from openai import AsyncOpenAI
+
+        # 呼び出し元の asyncio.run() がループを閉じる前に接続を閉じる
+        async with AsyncOpenAI(max_retries=0) as owned_client:  # OPENAI_API_KEYから自動認証
+            return await synthesize_narrations(
+                texts, storage_prefix, model, voice, speed,
+                client=owned_client, cache=cache, limiter=limiter, concurrency=concurrency, upload=upload,
+            )
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    hits = 0
+
+    async def generate(i: int, text: str) -> Optional[Tuple[str, Optional[float]]]:
+        nonlocal hits
+        try:
+            data, cached = await synthesize_speech(
+                client, text, model, voice, speed, cache=cache, limiter=limiter, semaphore=semaphore
+            )
+            if cached:
+                hits += 1
+            url = await asyncio.to_thread(upload, f"{storage_prefix}/narration_{i:03d}.mp3", data)
+            return url, mp3_duration(data)
+        except Exception as e:
+            print(f"[tts] WARNING: Failed to synthesize slide {i}: {str(e)[:100]}")
+            return None
+
+    results = await asyncio.gather(*(generate(i, text) for i, text in enumerate(texts)))
+    print(f"[tts] Synthesized {sum(r is not None for r in results)}/{len(texts)} narrations ({hits} cached)")
+    return list(results)
@@ -21,7 +21,9 @@ import shutil
 import subprocess
 
 from app.core.config import TAVILY_API_KEY
+from app.core.content_cache import content_key
 from app.core.llm import llm
+from app.core.search_cache import SqliteTTLCache, search_cache_ttl
 from app.config import settings
 
 # -------------------
@@ -265,17 +267,13 @@ def _get_all_vendors_info() -> List[Dict]:
     },
   ]
 
-def _create_llm_summarized_bullets(results: List[Dict], vendor_name: str = "Microsoft AI", num_bullets: int = 3) -> List[str]:
-  """検索結果をLLMで要約して箇条書きを生成（Slidev用）
-
-  Args:
-    results: Tavily検索結果のリスト
-    vendor_name: ベンダー名
-    num_bullets: 生成する箇条書きの数
+NO_RESULTS_BULLETS = [
+  "- **検索結果が見つかりませんでした**",
+  "- 後でもう一度お試しください"
+]
 
-  Returns:
-    箇条書きのリスト
-  """
+def _summarized_bullets_prompt(results: List[Dict], vendor_name: str, num_bullets: int) -> Optional[List]:
+  """検索結果を箇条書きに要約するプロンプトを生成（検索結果がなければNone）"""
   # 検索結果をテキストに整形
   results_text = ""
   for i, result in enumerate(results[:5], 1):
@@ -288,13 +286,10 @@ def _create_llm_summarized_bullets(results: List[Dict], vendor_name: str = "Micr
     results_text += f"URL: {url}\n"
 
   if not results_text.strip():
-    return [
-      "- **検索結果が見つかりませんでした**",
-      "- 後でもう一度お試しください"
-    ]
+    return None
 
   # LLMで箇条書きに要約（Phase 2 - MVP-1: プロンプト最適化）
-  prompt = [
+  return [
     ("system", "あなたはAI技術のエキスパートです。検索結果から重要なポイントを抽出し、Slidevスライド向けに視覚的に魅力的な箇条書きを作成します。"),
     ("user",
      f"以下の{vendor_name}に関する検索結果から、重要なポイントを{num_bullets}つの箇条書きで簡潔にまとめてください。\n\n"
@@ -308,29 +303,87 @@ def _create_llm_summarized_bullets(results: List[Dict], vendor_name: str = "Micr
      f"【出力形式】\n" + "\n".join([f"- 絵文字 **キーワード** (日付): 説明文" for i in range(num_bullets)]))
   ]
 
-  try:
-    msg = llm.invoke(prompt)
-    lines = msg.content.strip().split("\n")
-    bullets = [line.strip() for line in lines if line.strip().startswith("-")][:num_bullets]
+def _parse_summarized_bullets(content: str, num_bullets: int) -> List[str]:
+  """LLMの出力から箇条書きを取り出す（指定数に満たない場合はパディング）"""
+  lines = content.strip().split("\n")
+  bullets = [line.strip() for line in lines if line.strip().startswith("-")][:num_bullets]
+
+  while len(bullets) < num_bullets:
+    bullets.append("- （情報が不足しています）")
+
+  return bullets
 
-    # 指定数に満たない場合はパディング
-    while len(bullets) < num_bullets:
-      bullets.append("- （情報が不足しています）")
+def _fallback_bullets(results: List[Dict], num_bullets: int) -> List[str]:
+  """LLM失敗時のシンプル版（記事タイトルを並べる）"""
+  fallback = []
+  for result in results[:num_bullets]:
+    title = result.get("title", "")[:80]
+    if title:
+      fallback.append(f"- **{title}**")
 
-    return bullets
+  while len(fallback) < num_bullets:
+    fallback.append("- （情報が不足しています）")
 
+  return fallback[:num_bullets]
+
+def _create_llm_summarized_bullets(results: List[Dict], vendor_name: str = "Microsoft AI", num_bullets: int = 3) -> List[str]:
+  """検索結果をLLMで要約して箇条書きを生成（Slidev用）
+
+  Args:
+    results: Tavily検索結果のリスト
+    vendor_name: ベンダー名
+    num_bullets: 生成する箇条書きの数
+
+  Returns:
+    箇条書きのリスト
+  """
+  prompt = _summarized_bullets_prompt(results, vendor_name, num_bullets)
+  if prompt is None:
+    return list(NO_RESULTS_BULLETS)
+
+  try:
+    msg = llm.invoke(prompt)
+    return _parse_summarized_bullets(msg.content, num_bullets)
   except Exception as e:
     # LLM失敗時はシンプル版にフォールバック
-    fallback = []
-    for result in results[:num_bullets]:
-      title = result.get("title", "")[:80]
-      if title:
-        fallback.append(f"- **{title}**")
+    return _fallback_bullets(results, num_bullets)
 
-    while len(fallback) < num_bullets:
-      fallback.append("- （情報が不足しています）")
+def _create_llm_summarized_bullets_batch(
+  vendor_results: List[tuple],
+  num_bullets: int = 3,
+  max_concurrency: int = 6,
+) -> List[List[str]]:
+  """複数ベンダーの箇条書きを llm.batch で並列に生成（1ベンダー分の待ち時間で完了）
 
-    return fallback[:num_bullets]
+  Args:
+    vendor_results: (ベンダー名, Tavily検索結果のリスト) のリスト
+    num_bullets: 1ベンダーあたりの箇条書きの数
+    max_concurrency: 同時に送るLLMリクエスト数の上限
+
+  Returns:
+    vendor_resultsと同じ順の箇条書きのリスト。
+    LLMが失敗したベンダーだけシンプル版にフォールバックする
+  """
+  prompts = [_summarized_bullets_prompt(results, name, num_bullets) for name, results in vendor_results]
+  pending = [i for i, prompt in enumerate(prompts) if prompt is not None]
+
+  responses = []
+  if pending:
+    responses = llm.batch(
+      [prompts[i] for i in pending],
+      config={"max_concurrency": max_concurrency},
+      return_exceptions=True,
+    )
+
+  out = [list(NO_RESULTS_BULLETS) for _ in vendor_results]
+  for i, msg in zip(pending, responses):
+    results = vendor_results[i][1]
+    if isinstance(msg, Exception):
+      print(f"[bullets] WARNING: LLM failed for {vendor_results[i][0]}: {str(msg)[:100]}")
+      out[i] = _fallback_bullets(results, num_bullets)
+    else:
+      out[i] = _parse_summarized_bullets(msg.content, num_bullets)
+  return out
 
 def _generate_multi_vendor_slides_integrated(topic: str, sources: Dict[str, List[Dict]], mvp_version: str = "AI Industry Report") -> str:
   """全ベンダーのSlidevマークダウンを生成（marp_agent統合版）
@@ -344,9 +397,9 @@ def _generate_multi_vendor_slides_integrated(topic: str, sources: Dict[str, List
     Slidevマークダウン文字列
   """
   vendors = _get_all_vendors_info()
-  vendor_bullets = []
+  vendor_results_list = []
 
-  # 各ベンダーの検索結果から箇条書きを生成
+  # 各ベンダーの検索結果を抽出
   for vendor in vendors:
     # sourcesから該当するベンダーの検索結果を抽出（Phase 2 - Bug Fix: URL-based domain matching）
     vendor_results = []
@@ -366,9 +419,15 @@ def _generate_multi_vendor_slides_integrated(topic: str, sources: Dict[str, List
             seen_urls.add(url)
             break
 
-    # LLMで箇条書きに要約
-    bullets = _create_llm_summarized_bullets(vendor_results[:5], vendor["name"], num_bullets=3)
+    vendor_results_list.append((vendor["name"], vendor_results[:5]))
 
+  # LLMで箇条書きに要約（全ベンダーを1回のバッチで並列実行）
+  all_bullets = _create_llm_summarized_bullets_batch(
+    vendor_results_list, num_bullets=3, max_concurrency=len(vendors)
+  )
+
+  vendor_bullets = []
+  for vendor, bullets in zip(vendors, all_bullets):
     vendor_bullets.append({
       "name": vendor["name"],
       "emoji": vendor["emoji"],
@@ -445,13 +504,35 @@ class: text-center
 # -------------------
 # Tavily 検索
 # -------------------
+# collect_infoのクエリを並列に投げる際の同時実行数と、1クエリあたりのタイムアウト（秒）
+TAVILY_MAX_WORKERS = int(os.getenv("TAVILY_MAX_WORKERS", "8"))
+TAVILY_TIMEOUT_SEC = float(os.getenv("TAVILY_TIMEOUT_SEC", "30"))
+TAVILY_ENDPOINT = "https://api.tavily.com/search"
+
 def tavily_search(
   query: str,
   max_results: int = 8,
   include_domains: Optional[List[str]] = None,
   time_range: str = "month", # day/week/month/year
+  session: Optional[requests.Session] = None,
+  timeout: float = 60,
+  cache: Optional[SqliteTTLCache] = None,
   ) -> Dict:
-  endpoint = "https://api.tavily.com/search"
+  """Tavily検索。cache指定時は同じ条件の結果をtime_rangeに応じたTTLの間再利用する
+
+  キャッシュの読み書きに失敗しても（DBロック等）検索は続行する。
+  """
+  key = None
+  if cache:
+    key = content_key("tavily", query, sorted(include_domains or []), time_range, max_results)
+    try:
+      data = cache.get(key)
+    except Exception as e:
+      print(f"[tavily] WARNING: Cache read failed: {str(e)[:100]}")
+      data = None
+    if data is not None:
+      return data
+
   payload = {
     "api_key": TAVILY_API_KEY,
     "query": query,
@@ -462,22 +543,47 @@ def tavily_search(
   }
   if include_domains:
     payload["include_domains"] = include_domains
-  r = requests.post(endpoint, json=payload, timeout=60)
+  r = (session or requests).post(TAVILY_ENDPOINT, json=payload, timeout=timeout)
   r.raise_for_status()
-  return r.json()
+  data = r.json()
+  if key:
+    try:
+      cache.set(key, data, search_cache_ttl(time_range))
+    except Exception as e:
+      print(f"[tavily] WARNING: Cache write failed: {str(e)[:100]}")
+  return data
+
+def _tavily_session(pool_size: int) -> requests.Session:
+  # 並列リクエストでKeep-Alive接続を使い回せるよう、同時実行数分のコネクションプールを持たせる
+  from requests.adapters import HTTPAdapter
+
+  session = requests.Session()
+  session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+  return session
 
 def tavily_collect_context(
   queries: List[Union[str, Dict[str, Any]]],
   max_per_query: int = 6,
   default_time_range: str = "month",
+  max_workers: Optional[int] = None,
+  timeout: Optional[float] = None,
+  session: Optional[requests.Session] = None,
+  cache: Optional[SqliteTTLCache] = None,
 ) -> Dict[str, List[Dict[str, str]]]:
   """
   queriesは以下の２形式をサポート:
     - "plain text"
     - {"q": "...", "include_domains": ["example.com", ...], "time_range": "week"}
+
+  各クエリは共有セッション上で最大 max_workers 件まで並列に実行する（全体でほぼ1検索分の待ち時間）。
+  失敗・タイムアウトしたクエリは警告を出して結果から外し、残りのクエリの結果を返す。
+  全クエリが失敗した場合は「該当なし」と区別できるよう RuntimeError を送出する。
+  URLの重複排除はクエリの順番で行うため、結果は逐次実行時と同じになる。
+  cache指定時、キャッシュ済みのクエリはAPIを呼ばずに即座に返る。
   """
-  seen = set()
-  out: Dict[str, List[Dict[str, str]]] = {}
+  from concurrent.futures import ThreadPoolExecutor
+
+  specs = []
   for q in queries:
     if isinstance(q, dict):
       qtext = q.get("q", "")
@@ -490,8 +596,44 @@ def tavily_collect_context(
 
     if not qtext:
       continue
+    specs.append((qtext, inc, tr))
+
+  if not specs:
+    return {}
+
+  workers = max(1, min(max_workers or TAVILY_MAX_WORKERS, len(specs)))
+  timeout = timeout or TAVILY_TIMEOUT_SEC
+  own_session = session is None
+  if own_session:
+    session = _tavily_session(workers)
 
-    data = tavily_search(qtext, max_results=max_per_query, include_domains=inc, time_range=tr)
+  def search(spec):
+    qtext, inc, tr = spec
+    try:
+      return tavily_search(qtext, max_results=max_per_query, include_domains=inc,
+                           time_range=tr, session=session, timeout=timeout, cache=cache)
+    except Exception as e:
+      print(f"[tavily] WARNING: Search failed for '{qtext[:60]}': {str(e)[:100]}")
+      return None
+
+  try:
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tavily") as pool:
+      results = list(pool.map(search, specs))
+  finally:
+    if own_session:
+      session.close()
+
+  failed = sum(data is None for data in results)
+  if failed:
+    print(f"[tavily] {failed}/{len(specs)} queries failed")
+  if failed == len(specs):
+    raise RuntimeError(f"All {failed} Tavily searches failed")
+
+  seen = set()
+  out: Dict[str, List[Dict[str, str]]] = {}
+  for (qtext, _, _), data in zip(specs, results):
+    if not data:
+      continue
     items = []
     for r in data.get("results", []):
       url = r.get("url")
@@ -501,7 +643,7 @@ def tavily_collect_context(
       items.append({
         "title": (r.get("title") or "")[:160],
         "url": url,
-        "content": r.get("content" or "").replace("\n", " ")[:600],
+        "content": (r.get("content") or "").replace("\n", " ")[:600],
       })
       out[qtext] = items
   return out
@@ -0,0 +1,479 @@
+"""ffmpeg ベースの動画エンコーダー
+
+スライド1枚（静止画）とナレーション音声1本から1セグメントを生成し、
+concat demuxer で全セグメントを再エンコードなし（ストリームコピー）で結合する。
+HLS出力時は結合せず、スライド単位のセグメントをそのままm3u8プレイリストに並べる。
+
+ナレーションはTTSの呼び出しごとに音量が揃わないため、各セグメントのエンコード時に
+loudnormフィルタで目標ラウドネスに揃える（音声のデコードはセグメントごとに1回のみ）。
+フレームをPythonで扱わないため、長いスライドでもメモリ使用量が一定で高速。
+"""
+
+import hashlib
+import math
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from app.core.content_cache import ContentCache, cached_content_cache, content_key
+
+# 静止画スライドなので低fpsで十分
+VIDEO_FPS = int(os.getenv("VIDEO_FPS", "2"))
+VIDEO_PRESET = os.getenv("VIDEO_PRESET", "ultrafast")
+VIDEO_BITRATE = os.getenv("VIDEO_BITRATE", "2000k")
+AUDIO_BITRATE = os.getenv("AUDIO_BITRATE", "128k")
+# concatでストリームコピーするため、全セグメントの音声形式を揃える
+AUDIO_SAMPLE_RATE = 44100
+# ナレーションのラウドネス正規化（目標: LUFS、トゥルーピークの上限: dBTP）
+AUDIO_NORMALIZE = os.getenv("AUDIO_NORMALIZE", "true").lower() == "true"
+AUDIO_LOUDNESS_TARGET = float(os.getenv("AUDIO_LOUDNESS_TARGET", "-16"))
+AUDIO_TRUE_PEAK = float(os.getenv("AUDIO_TRUE_PEAK", "-1.5"))
+# 並列にエンコードするセグメント数（0: コンテナのCPUクォータから自動決定）
+ENCODE_WORKERS = int(os.getenv("ENCODE_WORKERS", "0"))
+
+# セグメントキャッシュ（変更のないスライドの再エンコードを省略）
+# ジョブのコンテナは毎回空の状態で起動し、/tmpはメモリ上にあるため、
+# ローカルだけのキャッシュはヒットせずメモリを消費するだけになる。
+# そのためデフォルトではStorageのバケット指定時のみ有効にする
+SEGMENT_CACHE_BUCKET = os.getenv("SEGMENT_CACHE_BUCKET")  # 例: slide-files
+SEGMENT_CACHE_ENABLED = os.getenv("SEGMENT_CACHE_ENABLED", "true" if SEGMENT_CACHE_BUCKET else "false").lower() == "true"
+SEGMENT_CACHE_DIR = Path(os.getenv("SEGMENT_CACHE_DIR", str(Path(tempfile.gettempdir()) / "slidepilot-cache" / "segments")))
+SEGMENT_CACHE_MAX_MB = int(os.getenv("SEGMENT_CACHE_MAX_MB", "256"))
+
+# HLS出力時のプレイリストファイル名
+HLS_PLAYLIST_NAME = "index.m3u8"
+
+_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+
+
+def get_segment_cache() -> Optional[ContentCache]:
+    """プロセス共有のセグメントキャッシュを返す（無効化時はNone）"""
+    return cached_content_cache(
+        SEGMENT_CACHE_ENABLED, SEGMENT_CACHE_DIR, SEGMENT_CACHE_MAX_MB, SEGMENT_CACHE_BUCKET, "cache/segments"
+    )
+
+
+def _file_digest(path: Union[str, Path]) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_ffmpeg_path() -> str:
+    """ffmpeg実行ファイルのパスを取得
+
+    FFMPEG_BIN → PATH上のffmpeg → imageio-ffmpeg同梱バイナリ の順に探す。
+    """
+    path = os.getenv("FFMPEG_BIN") or shutil.which("ffmpeg")
+    if path:
+        return path
+
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception as e:
+        raise RuntimeError(f"ffmpeg not found: {e}")
+
+
+def available_cpus() -> int:
+    """コンテナで利用可能なCPU数を取得
+
+    cgroupのCPUクォータ（Cloud Run等）→ CPUアフィニティ → os.cpu_count() の順に参照する。
+    """
+    quota = _cgroup_cpu_quota()
+    if quota:
+        return max(1, math.ceil(quota))
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return max(1, os.cpu_count() or 1)
+
+
+def _cgroup_cpu_quota() -> Optional[float]:
+    # cgroup v2: "max 100000" または "200000 100000"
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+
+    # cgroup v1
+    try:
+        quota = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us").read_text())
+        period = int(Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us").read_text())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def probe_duration(media_path: Path) -> Optional[float]:
+    """メディアファイルの長さ（秒）をffmpegの出力から取得（取得できなければNone）"""
+    result = subprocess.run(
+        [get_ffmpeg_path(), "-hide_banner", "-i", str(media_path)],
+        capture_output=True,
+        text=True,
+    )
+    match = _DURATION_RE.search(result.stderr)
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def build_hls_playlist(
+    entries: Sequence[Tuple[str, float]],
+    ended: bool = True,
+    target_duration: Optional[int] = None,
+) -> str:
+    """(セグメントURI, 秒数) のリストからm3u8プレイリストを生成
+
+    セグメントはスライドごとに独立してエンコードしておりタイムスタンプが0から始まるため、
+    2つ目以降のセグメントの前に EXT-X-DISCONTINUITY を入れる。
+    ended=False の場合は追記中のEVENTプレイリスト（ENDLISTなし）を生成する。
+    EXT-X-TARGETDURATION は更新のたびに変えてはならないため（RFC 8216 6.2.1）、
+    追記するプレイリストでは target_duration に全セグメントの上限を渡す。
+    """
+    target = max(target_duration or 0, *(math.ceil(duration) for _, duration in entries))
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        f"#EXT-X-TARGETDURATION:{target}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+        f"#EXT-X-PLAYLIST-TYPE:{'VOD' if ended else 'EVENT'}",
+    ]
+    for i, (uri, duration) in enumerate(entries):
+        if i > 0:
+            lines.append("#EXT-X-DISCONTINUITY")
+        lines.append(f"#EXTINF:{duration:.3f},")
+        lines.append(uri)
+    if ended:
+        lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+
+class VideoEncoder:
+    """静止画+音声のセグメント生成と結合を行うffmpegラッパー"""
+
+    # セグメントのエンコード方法を変更したら更新する（セグメントキャッシュのキーに含まれる）
+    SEGMENT_VERSION = '2'
+
+    def __init__(
+        self,
+        fps: int = VIDEO_FPS,
+        preset: str = VIDEO_PRESET,
+        video_bitrate: str = VIDEO_BITRATE,
+        audio_bitrate: str = AUDIO_BITRATE,
+        workers: Optional[int] = None,
+        cache: Optional[ContentCache] = None,
+        use_cache: bool = True,
+    ):
+        """
+        Args:
+            workers: 並列にエンコードするセグメント数
+                     （デフォルト: ENCODE_WORKERS、未設定ならCPUクォータから自動決定）
+            cache: セグメントキャッシュ（未指定時はプロセス共有キャッシュ）
+            use_cache: Falseならキャッシュを使わず常にエンコード
+        """
+        self.fps = fps
+        self.preset = preset
+        self.video_bitrate = video_bitrate
+        self.audio_bitrate = audio_bitrate
+        self.workers = max(1, workers or ENCODE_WORKERS or available_cpus())
+        self.cache = (cache or get_segment_cache()) if use_cache else None
+
+    def encode(
+        self,
+        frames: Sequence[Union[bytes, Path]],
+        audio_files: Sequence[Union[str, Path]],
+        output_path: Path,
+        work_dir: Path,
+    ) -> int:
+        """スライド画像と音声から動画を生成
+
+        セグメントは最大 workers 個のffmpegプロセスで並列にエンコードし、
+        元の順序で結合する。画像・音声・エンコード設定が同じセグメントはキャッシュを再利用する。
+        失敗したセグメントは警告を出してスキップする。
+
+        Args:
+            frames: スライド画像（PNGバイト列またはファイルパス）
+            audio_files: 各スライドのナレーション音声ファイル
+            output_path: 出力MP4パス
+            work_dir: セグメントの一時保存先
+
+        Returns:
+            結合したセグメント数
+        """
+        stream = SegmentStream(self, work_dir, min(len(frames), len(audio_files)))
+        with stream:
+            for i, (image, audio_path) in enumerate(zip(frames, audio_files)):
+                stream.add_frame(i, image)
+                stream.add_audio(i, audio_path)
+            return stream.finish(output_path)
+
+    def encode_indexed(
+        self,
+        i: int,
+        image: Union[bytes, Path],
+        audio_path: Union[str, Path],
+        work_dir: Path,
+        threads: int = 0,
+        normalize: bool = False,
+    ) -> Optional[Path]:
+        """i番目のスライドのセグメントを生成（キャッシュ優先）
+
+        Returns:
+            セグメントのパス。失敗時は警告を出してNone
+        """
+        segment_path = work_dir / f"segment_{i:03d}.ts"
+        try:
+            key = self.segment_key(image, audio_path, normalize) if self.cache else None
+            if key and self.cache.get_file(key, segment_path):
+                print(f"[encoder] Reused cached segment {i+1}")
+                return segment_path
+
+            self.encode_segment(image, audio_path, segment_path, threads=threads, normalize=normalize)
+            if key:
+                self.cache.put_file(key, segment_path)
+            print(f"[encoder] Encoded segment {i+1}")
+            return segment_path
+        except Exception as e:
+            print(f"[encoder] WARNING: Failed to encode slide {i}: {str(e)[:100]}")
+            return None
+
+    def segment_key(self, image: Union[bytes, Path], audio_path: Union[str, Path], normalize: bool = False) -> str:
+        """画像・音声の内容とエンコード設定から決まるセグメントのキャッシュキー
+
+        画像はレンダリング済みPNGのハッシュを使う（スライドJSONとテンプレートの変更を両方反映する）。
+        """
+        if isinstance(image, (bytes, bytearray)):
+            image_digest = hashlib.sha256(image).hexdigest()
+        else:
+            image_digest = _file_digest(image)
+
+        return content_key(
+            'segment',
+            self.SEGMENT_VERSION,
+            {
+                'fps': self.fps,
+                'preset': self.preset,
+                'video_bitrate': self.video_bitrate,
+                'audio_bitrate': self.audio_bitrate,
+                'sample_rate': AUDIO_SAMPLE_RATE,
+                'loudnorm': self.loudnorm_filter() if normalize else None,
+            },
+            image_digest,
+            _file_digest(audio_path),
+        )
+
+    def encode_segment(
+        self,
+        image: Union[bytes, Path],
+        audio_path: Union[str, Path],
+        output_path: Path,
+        threads: int = 0,
+        normalize: bool = False,
+    ) -> Path:
+        """静止画1枚と音声1本から1セグメント（MPEG-TS）を生成
+
+        画像がバイト列の場合は標準入力から渡す（一時PNGファイルを作らない）。
+        動画の長さは音声の長さに合わせる（-shortest）。
+        threads はffmpegのスレッド数（0: ffmpegの自動設定）。
+        normalize=True の場合は loudnorm（1パス）で目標ラウドネスに揃える。
+        測定用に別のffmpegを起動しないため、音声のデコードはこの1回のみ。
+        """
+        ffmpeg = get_ffmpeg_path()
+        if isinstance(image, (bytes, bytearray)):
+            # パイプ入力は -loop が使えないため、loopフィルタで1フレームを繰り返す
+            video_input = ["-framerate", str(self.fps), "-f", "png_pipe", "-i", "pipe:0"]
+            video_filter = ["-vf", "loop=loop=-1:size=1:start=0"]
+            stdin_data = bytes(image)
+        else:
+            video_input = ["-loop", "1", "-framerate", str(self.fps), "-i", str(image)]
+            video_filter = []
+            stdin_data = None
+
+        audio_filter = ["-af", self.loudnorm_filter()] if normalize else []
+
+        cmd = [
+            ffmpeg, "-y", "-hide_banner", "-loglevel", "error",
+            *video_input,
+            "-i", str(audio_path),
+            *video_filter,
+            *audio_filter,
+            "-map", "0:v", "-map", "1:a",
+            "-c:v", "libx264", "-tune", "stillimage", "-preset", self.preset,
+            "-b:v", self.video_bitrate, "-r", str(self.fps), "-pix_fmt", "yuv420p",
+            "-c:a", "aac", "-b:a", self.audio_bitrate, "-ar", str(AUDIO_SAMPLE_RATE), "-ac", "2",
+            "-threads", str(threads), "-shortest",
+            "-f", "mpegts", str(output_path),
+        ]
+        self._run(cmd, stdin_data)
+        return output_path
+
+    def concat(self, segments: List[Path], output_path: Path, list_path: Optional[Path] = None) -> Path:
+        """concat demuxerでセグメントを再エンコードせずに結合"""
+        list_path = list_path or output_path.with_suffix(".txt")
+        list_path.write_text(
+            "".join(f"file '{self._escape_concat_path(p)}'\n" for p in segments),
+            encoding="utf-8",
+        )
+
+        cmd = [
+            get_ffmpeg_path(), "-y", "-hide_banner", "-loglevel", "error",
+            "-f", "concat", "-safe", "0", "-i", str(list_path),
+            "-c", "copy", "-bsf:a", "aac_adtstoasc", "-movflags", "+faststart",
+            str(output_path),
+        ]
+        self._run(cmd)
+        return output_path
+
+    @staticmethod
+    def loudnorm_filter() -> str:
+        """ラウドネス正規化のffmpegフィルタ（出力のサンプルレートは -ar で揃える）"""
+        return f"loudnorm=I={AUDIO_LOUDNESS_TARGET:g}:TP={AUDIO_TRUE_PEAK:g}:LRA=11"
+
+    def segment_duration(self, segment_path: Path) -> float:
+        """セグメントの長さ（秒）。取得できなければ例外"""
+        duration = probe_duration(segment_path)
+        if duration is None:
+            raise RuntimeError(f"Could not probe duration: {segment_path.name}")
+        return duration
+
+    @staticmethod
+    def _escape_concat_path(path: Path) -> str:
+        # concatリストはシングルクォートで囲むため、パス中の ' をエスケープする
+        return str(Path(path).resolve()).replace("'", "'\\''")
+
+    @staticmethod
+    def _run(cmd: List[str], stdin_data: Optional[bytes] = None) -> None:
+        result = subprocess.run(cmd, input=stdin_data, capture_output=True)
+        if result.returncode != 0:
+            stderr = result.stderr.decode("utf-8", errors="replace").strip()
+            raise RuntimeError(f"ffmpeg failed ({result.returncode}): {stderr[-500:]}")
+
+
+class SegmentStream:
+    """画像と音声が揃ったスライドから順にセグメントのエンコードを開始する
+
+    レンダリング・音声ダウンロードのコールバックから add_frame / add_audio を呼ぶと、
+    両方が揃った時点で最大 encoder.workers 並列のffmpegに投入される。
+    finish() で全セグメントの完了を待ち、元の順序で結合する（HLS出力時は finish_hls()）。
+    """
+
+    def __init__(
+        self,
+        encoder: VideoEncoder,
+        work_dir: Path,
+        count: int,
+        on_segment: Optional[Callable[[int, Optional[Path]], None]] = None,
+    ):
+        """
+        Args:
+            on_segment: セグメント完了ごとに (index, パス) で呼ばれる（失敗時のパスはNone）。
+                        エンコードスレッドから呼ばれるため、重い処理は別スレッドに渡すこと
+        """
+        self.encoder = encoder
+        self.on_segment = on_segment
+        self.work_dir = work_dir
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        workers = max(1, min(encoder.workers, count))
+        # 各ffmpegのスレッド数を絞り、並列プロセス全体でCPU数を超えないようにする
+        self.threads = max(1, available_cpus() // workers)
+        # エンコード自体は別プロセス（ffmpeg）で行うため、スレッドで起動・待機するだけでコアを使い切れる
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="encoder")
+        self._frames: Dict[int, Union[bytes, Path]] = {}
+        self._audio: Dict[int, Tuple[Union[str, Path], bool]] = {}
+        self._futures: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        self.completed: List[int] = []  # finish後、出力に含めたスライド番号（再生順）
+        print(f"[encoder] Encoding {count} segments with {workers} workers")
+
+    def add_frame(self, i: int, image: Union[bytes, Path]) -> None:
+        with self._lock:
+            self._frames[i] = image
+            self._submit_if_ready(i)
+
+    def add_audio(self, i: int, audio_path: Union[str, Path], normalize: bool = False) -> None:
+        with self._lock:
+            self._audio[i] = (audio_path, normalize)
+            self._submit_if_ready(i)
+
+    def _submit_if_ready(self, i: int) -> None:
+        if i in self._frames and i in self._audio and i not in self._futures:
+            audio_path, normalize = self._audio.pop(i)
+            self._futures[i] = self._executor.submit(
+                self.encoder.encode_indexed,
+                i,
+                self._frames.pop(i),
+                audio_path,
+                self.work_dir,
+                self.threads,
+                normalize,
+            )
+            if self.on_segment:
+                self._futures[i].add_done_callback(lambda future, i=i: self._segment_done(i, future))
+
+    def _segment_done(self, i: int, future: Future) -> None:
+        # close() でキャンセルされたセグメントは通知しない
+        if not future.cancelled():
+            self.on_segment(i, future.result())
+
+    def finish(self, output_path: Path) -> int:
+        """投入済みセグメントの完了を待って結合する
+
+        Returns:
+            結合したセグメント数
+        """
+        segments = [path for _, path in self._completed_segments()]
+        self.encoder.concat(segments, output_path, self.work_dir / "segments.txt")
+        return len(segments)
+
+    def finish_hls(self, playlist_path: Path, durations: Optional[Dict[int, float]] = None) -> List[Path]:
+        """投入済みセグメントの完了を待ち、結合せずにHLSプレイリストを書き出す
+
+        プレイリストのURIはセグメントのファイル名（相対パス）なので、
+        プレイリストと同じディレクトリにセグメントを置けばそのまま再生できる。
+        durations（スライド番号 → 音声の秒数）にないセグメントだけffmpegで長さを取得する。
+
+        Returns:
+            プレイリストに並べたセグメントのパス（再生順）
+        """
+        durations = durations or {}
+        segments = self._completed_segments()
+        entries = [
+            (path.name, durations.get(i) or self.encoder.segment_duration(path))
+            for i, path in segments
+        ]
+        playlist_path.write_text(build_hls_playlist(entries), encoding="utf-8")
+        return [path for _, path in segments]
+
+    def _completed_segments(self) -> List[Tuple[int, Path]]:
+        with self._lock:
+            futures = sorted(self._futures.items())
+        segments = [(i, path) for i, future in futures if (path := future.result()) is not None]
+
+        if not segments:
+            raise RuntimeError("All segments failed to encode")
+        self.completed = [i for i, _ in segments]
+        return segments
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "SegmentStream":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
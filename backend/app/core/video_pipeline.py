@@ -0,0 +1,586 @@
+"""動画生成パイプライン
+
+API（/render/video）、ローカルジョブ、Cloud Run Job で共通の処理を1か所にまとめる。
+
+ステージ:
+    fetch_audio ┐
+    rasterize ──┼→ encode → upload → db_update
+    （画像と音声が揃ったスライドから順にエンコードを開始し、ステージを重ねて実行する）
+
+ラウドネス正規化（AUDIO_NORMALIZE）は encode の中で各セグメントのffmpegが行うため、
+測定用の処理を挟まず、取得したナレーションはすぐにエンコードへ投入する。
+
+出力形式は MP4（1ファイル）または HLS（スライド単位のTSセグメント + m3u8）。
+HLSは最初のセグメントを取得した時点で再生でき、スライド単位でシークできる。
+
+job_id 指定時は、完成したセグメントから順にアップロードして途中までのプレイリスト（preview_url）と
+進捗（slides_done / slides_total）を video_jobs に記録し、ジョブ実行中のプレビュー再生を可能にする。
+
+各ステージの実時間（wall）とCPU時間（ffmpeg等の子プロセスを含む）を計測し、
+ログ出力と video_jobs.metrics への保存に使う。
+"""
+
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Collection, Dict, List, Optional, Sequence, Set, Union
+
+from app.core.audio_probe import audio_duration
+from app.core.slide_renderer import SlideRenderer
+from app.core.video_encoder import (
+    AUDIO_NORMALIZE,
+    HLS_PLAYLIST_NAME,
+    SegmentStream,
+    VideoEncoder,
+    build_hls_playlist,
+)
+
+VIDEO_BUCKET = "slide-files"
+# 出力形式（mp4 / hls）。リクエストで指定がない場合のデフォルト
+VIDEO_OUTPUT_FORMAT = os.getenv("VIDEO_OUTPUT_FORMAT", "mp4")
+OUTPUT_FORMATS = ("mp4", "hls")
+# HLSセグメントを並列にアップロードする数
+HLS_UPLOAD_WORKERS = int(os.getenv("HLS_UPLOAD_WORKERS", "4"))
+# ジョブ実行中に完成済みセグメントをプレビュー公開するか
+VIDEO_PREVIEW_ENABLED = os.getenv("VIDEO_PREVIEW_ENABLED", "true").lower() == "true"
+PREVIEW_PLAYLIST_NAME = "preview.m3u8"
+# プレビュー開始時に長さが分からないスライドがある場合の EXT-X-TARGETDURATION（秒）
+PREVIEW_TARGET_DURATION = int(os.getenv("PREVIEW_TARGET_DURATION", "60"))
+# 音声ダウンロードのタイムアウト（秒）・並列数・リトライ回数
+AUDIO_DOWNLOAD_TIMEOUT = int(os.getenv("AUDIO_DOWNLOAD_TIMEOUT", "120"))
+AUDIO_DOWNLOAD_WORKERS = int(os.getenv("AUDIO_DOWNLOAD_WORKERS", "8"))
+AUDIO_DOWNLOAD_RETRIES = int(os.getenv("AUDIO_DOWNLOAD_RETRIES", "3"))
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def hls_prefix(storage_path: str) -> str:
+    """MP4のStorageパスからHLSの保存先を決める（user/deck_video.mp4 → user/deck_video_hls）"""
+    stem, _, _ = storage_path.rpartition(".")
+    return f"{stem or storage_path}_hls"
+
+
+def _cpu_seconds() -> float:
+    """プロセス自身と終了済み子プロセス（ffmpeg）の合計CPU時間"""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+class VideoPipeline:
+    """スライド画像+ナレーション音声から動画を生成してアップロードする"""
+
+    STAGES = ("fetch_audio", "rasterize", "encode", "upload", "db_update")
+
+    def __init__(
+        self,
+        renderer: Optional[SlideRenderer] = None,
+        encoder: Optional[VideoEncoder] = None,
+        render_workers: Optional[int] = None,
+        encode_workers: Optional[int] = None,
+        download_workers: Optional[int] = None,
+        log_prefix: str = "[pipeline]",
+        normalize_audio: bool = AUDIO_NORMALIZE,
+    ):
+        """
+        Args:
+            renderer: スライドレンダラー（未指定時は render_workers 並列で作成）
+            encoder: 動画エンコーダー（未指定時は encode_workers 並列で作成）
+            render_workers: rasterizeステージの並列数（デフォルト: RENDER_WORKERS）
+            encode_workers: encodeステージの並列数（デフォルト: ENCODE_WORKERS / CPUクォータ）
+            download_workers: fetch_audioステージの並列数（デフォルト: AUDIO_DOWNLOAD_WORKERS）
+            log_prefix: ログの接頭辞（呼び出し元ごとに [render] / [job] など）
+            normalize_audio: スライド間のラウドネスを揃えるか（デフォルト: AUDIO_NORMALIZE）
+        """
+        self.renderer = renderer or SlideRenderer(workers=render_workers)
+        self.encoder = encoder or VideoEncoder(workers=encode_workers)
+        self.download_workers = max(1, download_workers or AUDIO_DOWNLOAD_WORKERS)
+        self.log_prefix = log_prefix
+        self.normalize = normalize_audio
+        self.durations: Dict[int, float] = {}
+        self.offsets: List[Dict[str, float]] = []
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self._run_start: Optional[float] = None
+        self.counts: Dict[str, int] = {}
+        self.log: List[str] = []
+
+    def run(
+        self,
+        slides_json: List[Dict],
+        audio_sources: Sequence[str],
+        work_dir: Path,
+        storage_path: str,
+        slide_id: Optional[str] = None,
+        job_id: Optional[str] = None,
+        frames: Optional[List[bytes]] = None,
+        output_format: Optional[str] = None,
+        audio_durations: Optional[Sequence[Optional[float]]] = None,
+    ) -> str:
+        """パイプライン全体を実行
+
+        Args:
+            slides_json: スライドデータ
+            audio_sources: 各スライドの音声（URLまたはローカルパス）
+            work_dir: 作業ディレクトリ（削除は呼び出し元が行う）
+            storage_path: アップロード先のStorageパス（user_id/xxx_video.mp4）
+            slide_id: 指定時は slides.video_url を更新
+            job_id: 指定時は video_jobs を completed（metrics付き）に更新
+            frames: レンダリング済みPNG（指定時は rasterize ステージを省略）
+            output_format: "mp4" または "hls"（デフォルト: VIDEO_OUTPUT_FORMAT）。
+                hlsの場合は storage_path の拡張子を除いた "{stem}_hls/" 以下に
+                セグメントとプレイリストをアップロードする
+            audio_durations: 各音声の長さ（秒、video_jobs.input_data に保存済みの値）。
+                ないものはダウンロードした音声のMP3ヘッダーから求める
+
+        Returns:
+            動画の公開URL（hlsの場合はm3u8プレイリストのURL）
+
+        Raises:
+            Exception: いずれかのステージの失敗時
+        """
+        self._run_start = time.perf_counter()
+        output_format = output_format or VIDEO_OUTPUT_FORMAT
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+
+        count = len(frames) if frames is not None else len(slides_json)
+        # 音声ファイル数とスライド数を合わせる
+        if count != len(audio_sources):
+            print(f"{self.log_prefix} WARNING: slide count ({count}) != audio count ({len(audio_sources)})")
+            count = min(count, len(audio_sources))
+        if count == 0:
+            raise Exception("No slides to render")
+
+        # 音声取得・レンダリング・エンコードを重ねて実行する。
+        # スライドNの画像と音声が揃った時点でセグメントNのエンコードを開始する。
+        self.durations = {i: d for i, d in enumerate((audio_durations or [])[:count]) if d}
+
+        video_path = work_dir / Path(storage_path).name
+        segment_dir = work_dir / "segments"
+        preview = None
+        if job_id and VIDEO_PREVIEW_ENABLED:
+            preview = self.create_preview(job_id, hls_prefix(storage_path), count, work_dir)
+
+        try:
+            on_segment = preview.publish if preview else None
+            with self.stage("encode"), SegmentStream(self.encoder, segment_dir, count, on_segment) as stream:
+                with ThreadPoolExecutor(max_workers=1, thread_name_prefix="fetch-audio") as fetcher:
+
+                    def on_audio(i: int, audio_path: str) -> None:
+                        if i not in self.durations:
+                            duration = audio_duration(audio_path)
+                            if duration:
+                                self.durations[i] = duration
+                        stream.add_audio(i, audio_path, self.normalize)
+
+                    audio_future = fetcher.submit(
+                        self._timed, "fetch_audio", self.fetch_audio, audio_sources[:count], work_dir / "audio", on_audio
+                    )
+                    if frames is None:
+                        with self.stage("rasterize"):
+                            frames = self.renderer.render_frames(slides_json[:count], on_frame=stream.add_frame)
+                    else:
+                        for i, frame in enumerate(frames[:count]):
+                            stream.add_frame(i, frame)
+                    audio_future.result()
+
+                self.counts["slides"] = len(frames)
+                self.counts["audio"] = count
+                self.counts["audio_sec"] = round(sum(d for d in self.durations.values() if d), 1)
+                self._log(f"rendered {len(frames)} PNG images")
+                if output_format == "hls":
+                    playlist_path = segment_dir / HLS_PLAYLIST_NAME
+                    segments = stream.finish_hls(playlist_path, self.durations)
+                    self.counts["segments"] = len(segments)
+                else:
+                    self.counts["segments"] = stream.finish(video_path)
+                self.offsets = self.slide_offsets(stream.completed)
+
+            if output_format == "hls":
+                video_size_mb = sum(p.stat().st_size for p in segments) / 1024 / 1024
+                self._log(f"encoded {self.counts['segments']} slides -> HLS ({video_size_mb:.1f}MB)")
+                with self.stage("upload"):
+                    # プレビューで公開済みのセグメントはそのまま使う
+                    published = preview.close() if preview else set()
+                    video_url = self.upload_hls(playlist_path, segments, hls_prefix(storage_path), skip=published)
+            else:
+                video_size_mb = video_path.stat().st_size / 1024 / 1024
+                self._log(f"encoded {self.counts['segments']} slides -> MP4 ({video_size_mb:.1f}MB)")
+                with self.stage("upload"):
+                    if preview:
+                        preview.close()
+                    video_url = self.upload(video_path, storage_path)
+                    if preview:
+                        # MP4の公開後はプレビュー用のセグメントは不要（Storageに残さない）
+                        preview.discard()
+            self._log(f"uploaded to {video_url}")
+        finally:
+            if preview:
+                preview.close()
+
+        with self.stage("db_update"):
+            self.update_db(video_url, slide_id, job_id)
+
+        return video_url
+
+    # ------------------------------------------------------------
+    # ステージ
+    # ------------------------------------------------------------
+
+    def fetch_audio(
+        self,
+        audio_sources: Sequence[str],
+        audio_dir: Path,
+        on_audio: Optional[Callable[[int, str], None]] = None,
+    ) -> List[str]:
+        """URLの音声を並列にダウンロードし、ローカルパスのリストを返す（ローカルパスはそのまま）
+
+        コネクションプールを共有するSessionで最大 download_workers 件を同時に取得し、
+        レスポンスはチャンク単位でディスクに書き込む（全体をメモリに載せない）。
+        on_audio は各ファイルの準備完了時に (index, ローカルパス) で呼ばれる。
+        """
+        audio_dir.mkdir(parents=True, exist_ok=True)
+        audio_files = list(audio_sources)
+        downloads = []
+        for i, source in enumerate(audio_sources):
+            if source.startswith("http"):
+                downloads.append((i, source, audio_dir / f"narration_{i:03d}.mp3"))
+            elif on_audio:
+                # ローカルパス（後方互換性）はそのまま使える
+                on_audio(i, source)
+
+        if downloads:
+            workers = min(self.download_workers, len(downloads))
+            print(f"{self.log_prefix} Downloading {len(downloads)} audio files with {workers} workers")
+            session = self._create_session(workers)
+
+            def download(item) -> None:
+                i, url, local_path = item
+                try:
+                    self._download(session, url, local_path)
+                except Exception as e:
+                    raise Exception(f"Failed to download audio file {i}: {e}")
+                audio_files[i] = str(local_path)
+                if on_audio:
+                    on_audio(i, str(local_path))
+
+            try:
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="audio-download") as executor:
+                    # list()で全件の完了を待ち、最初の失敗を送出する
+                    list(executor.map(download, downloads))
+            finally:
+                if session is not None:
+                    session.close()
+
+        print(f"{self.log_prefix} Downloaded {len(downloads)} audio files")
+        return audio_files
+
+    def slide_offsets(self, slide_indices: Sequence[int]) -> List[Dict[str, float]]:
+        """出力動画内での各スライドの開始位置（秒）。長さが不明なスライド以降は計算しない"""
+        offsets = []
+        start = 0.0
+        for i in slide_indices:
+            duration = self.durations.get(i)
+            if not duration:
+                break
+            offsets.append({"slide": i, "start_sec": round(start, 3), "duration_sec": round(duration, 3)})
+            start += duration
+        return offsets
+
+    def _create_session(self, pool_size: int):
+        """並列ダウンロード用のSession（接続再利用。リトライは _download で行う）"""
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _download(self, session, url: str, dest_path: Path) -> None:
+        """1ファイルをストリーミングでダウンロード
+
+        接続失敗・429/5xx・本文の途中での切断を、ここだけで指数バックオフして再試行する
+        （Session側ではリトライしないため、試行回数は最大 AUDIO_DOWNLOAD_RETRIES + 1 回）。
+        """
+        for attempt in range(AUDIO_DOWNLOAD_RETRIES + 1):
+            try:
+                with session.get(url, stream=True, timeout=AUDIO_DOWNLOAD_TIMEOUT) as response:
+                    response.raise_for_status()
+                    with open(dest_path, "wb") as f:
+                        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                            f.write(chunk)
+                return
+            except Exception as e:
+                if attempt >= AUDIO_DOWNLOAD_RETRIES or not self._is_retryable(e):
+                    raise
+                delay = 0.5 * (2 ** attempt)
+                print(f"{self.log_prefix} Retrying audio download in {delay:.1f}s: {str(e)[:80]}")
+                time.sleep(delay)
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        # 接続・読み取りの失敗と 429/5xx のみ再試行する（その他の4xxは再試行しても変わらない）
+        import requests
+        if isinstance(error, requests.HTTPError):
+            status = error.response.status_code if error.response is not None else None
+            return status is not None and (status == 429 or status >= 500)
+        return isinstance(error, (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError))
+
+    def upload(self, video_path: Path, storage_path: str) -> str:
+        """動画をSupabase Storageにアップロードし、公開URLを返す（大きい動画はresumable uploadで分割送信）"""
+        from app.core.storage import upload_file_to_storage
+
+        return upload_file_to_storage(
+            bucket=VIDEO_BUCKET,
+            file_path=storage_path,
+            source=video_path,
+            content_type="video/mp4"
+        )
+
+    def upload_hls(
+        self,
+        playlist_path: Path,
+        segments: List[Path],
+        prefix: str,
+        skip: Collection[str] = (),
+    ) -> str:
+        """HLSセグメントを並列にアップロードし、最後にプレイリストをアップロードしてURLを返す
+
+        プレイリストはセグメントを相対パスで参照するため、同じprefix以下に置く。
+        全セグメントのアップロード完了後にプレイリストを置き、再生途中で欠けたセグメントを参照させない。
+        skip に含まれるファイル名（プレビューで公開済み）はアップロードしない。
+        """
+        from app.core.storage import upload_file_to_storage
+
+        def upload_segment(segment: Path) -> None:
+            upload_file_to_storage(
+                bucket=VIDEO_BUCKET,
+                file_path=f"{prefix}/{segment.name}",
+                source=segment,
+                content_type="video/mp2t"
+            )
+
+        pending = [segment for segment in segments if segment.name not in skip]
+        if pending:
+            workers = max(1, min(HLS_UPLOAD_WORKERS, len(pending)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hls-upload") as executor:
+                list(executor.map(upload_segment, pending))
+
+        return upload_file_to_storage(
+            bucket=VIDEO_BUCKET,
+            file_path=f"{prefix}/{playlist_path.name}",
+            source=playlist_path,
+            content_type="application/vnd.apple.mpegurl"
+        )
+
+    def create_preview(self, job_id: str, prefix: str, total: int, work_dir: Path) -> "PreviewPublisher":
+        return PreviewPublisher(self.encoder, job_id, prefix, total, work_dir, self.log_prefix, self.durations)
+
+    def update_db(self, video_url: str, slide_id: Optional[str], job_id: Optional[str]) -> None:
+        """slides.video_url と video_jobs のステータスを更新"""
+        from app.core.supabase import update_slide_video_url, update_video_job
+
+        if slide_id:
+            result = update_slide_video_url(slide_id, video_url)
+            if "error" in result:
+                self._log(f"DB update failed: {result['error'][:50]}")
+            else:
+                self._log(f"DB updated (slide_id={slide_id})")
+
+        if job_id:
+            update_video_job(job_id, "completed", video_url=video_url, metrics=self.metrics())
+
+    # ------------------------------------------------------------
+    # 計測
+    # ------------------------------------------------------------
+
+    @contextmanager
+    def stage(self, name: str):
+        """ステージの実時間・CPU時間を計測（例外時も記録する）
+
+        fetch_audio / rasterize / encode は重ねて実行されるため、
+        CPU時間はプロセス全体の値で、同時に動いている他ステージの分も含む。
+        """
+        wall_start = time.perf_counter()
+        cpu_start = _cpu_seconds()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = _cpu_seconds() - cpu_start
+            self.timings[name] = {"wall_sec": round(wall, 3), "cpu_sec": round(cpu, 3)}
+            print(f"{self.log_prefix} stage {name}: wall {wall:.2f}s, cpu {cpu:.2f}s")
+
+    def _timed(self, name: str, fn: Callable, *args):
+        with self.stage(name):
+            return fn(*args)
+
+    def metrics(self) -> Dict[str, Union[Dict, int, float]]:
+        """video_jobs.metrics に保存する計測結果
+
+        ステージは重ねて実行されるため、total_wall_sec は各ステージの合計ではなく
+        run() の開始からの実時間とする。
+        """
+        total = time.perf_counter() - self._run_start if self._run_start is not None else 0.0
+        return {
+            "stages": dict(self.timings),
+            "total_wall_sec": round(total, 3),
+            **self.counts,
+            "slide_offsets": self.offsets,
+        }
+
+    def _log(self, message: str) -> None:
+        self.log.append(f"[video] {message}")
+        print(f"{self.log_prefix} {message}")
+
+
+class PreviewPublisher:
+    """完成したセグメントを順にアップロードし、途中までのプレイリストとジョブの進捗を更新する
+
+    publish() はエンコードスレッドから呼ばれるため、アップロードは専用の1スレッドで直列に行い
+    エンコードを待たせない。プレイリストには先頭から連続して完成したセグメントだけを載せる
+    （失敗したスライドは飛ばす）。プレビューの失敗はジョブを失敗させない。
+    """
+
+    def __init__(
+        self,
+        encoder: VideoEncoder,
+        job_id: str,
+        prefix: str,
+        total: int,
+        work_dir: Path,
+        log_prefix: str = "[pipeline]",
+        durations: Optional[Dict[int, float]] = None,
+    ):
+        """
+        Args:
+            durations: スライド番号 → 音声の秒数（パイプラインと共有。ないものはffmpegで取得）
+        """
+        self.encoder = encoder
+        self.job_id = job_id
+        self.prefix = prefix
+        self.total = total
+        self.playlist_path = work_dir / PREVIEW_PLAYLIST_NAME
+        self.log_prefix = log_prefix
+        self.preview_url: Optional[str] = None
+        self.uploaded: Set[str] = set()
+        self._results: Dict[int, Optional[Path]] = {}
+        self._durations = durations if durations is not None else {}
+        self._published = 0  # プレイリストに反映済みの先頭からの連続スライド数
+        self._target_duration: Optional[int] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preview")
+
+    def publish(self, i: int, segment: Optional[Path]) -> None:
+        self._executor.submit(self._publish, i, segment)
+
+    def close(self) -> Set[str]:
+        """キュー済みの公開処理を待って終了し、アップロード済みのセグメント名を返す"""
+        self._executor.shutdown(wait=True)
+        return self.uploaded
+
+    def discard(self) -> None:
+        """アップロード済みのプレビュー（セグメントとプレイリスト）を削除（失敗してもジョブは続行）
+
+        削除したプレイリストを指したままにならないよう、ジョブのpreview_urlも消す。
+        """
+        names = sorted(self.uploaded)
+        if self.preview_url:
+            names.append(self.playlist_path.name)
+        if not names:
+            return
+        try:
+            self.delete_objects([f"{self.prefix}/{name}" for name in names])
+            self.uploaded = set()
+            if self.preview_url:
+                self.preview_url = None
+                self.clear_preview()
+        except Exception as e:
+            print(f"{self.log_prefix} Preview cleanup failed: {e}")
+
+    def _publish(self, i: int, segment: Optional[Path]) -> None:
+        if segment is not None:
+            try:
+                if not self._durations.get(i):
+                    self._durations[i] = self.encoder.segment_duration(segment)
+                self.upload_segment(segment)
+                self.uploaded.add(segment.name)
+            except Exception as e:
+                print(f"{self.log_prefix} Preview upload failed for segment {i}: {e}")
+                segment = None
+        self._results[i] = segment
+
+        try:
+            ready = self._published
+            while ready in self._results:
+                ready += 1
+            if ready > self._published:
+                self._published = ready
+                entries = [
+                    (self._results[j].name, self._durations[j])
+                    for j in range(ready)
+                    if self._results[j] is not None
+                ]
+                if entries:
+                    playlist = build_hls_playlist(entries, ended=False, target_duration=self.target_duration())
+                    self.playlist_path.write_text(playlist, encoding="utf-8")
+                    self.preview_url = self.upload_playlist(self.playlist_path)
+            self.update_progress(len(self._results))
+        except Exception as e:
+            print(f"{self.log_prefix} Preview publish failed: {e}")
+
+    def target_duration(self) -> int:
+        """プレビューの EXT-X-TARGETDURATION（最初のプレイリスト作成時に決め、以後変えない）
+
+        全スライドの音声の長さが分かっていればその最大値、
+        分からないスライドがあれば PREVIEW_TARGET_DURATION を上限とする。
+        """
+        if self._target_duration is None:
+            known = [self._durations.get(i) for i in range(self.total)]
+            longest = max((math.ceil(d) for d in known if d), default=0)
+            if all(known):
+                self._target_duration = longest
+            else:
+                self._target_duration = max(longest, PREVIEW_TARGET_DURATION)
+        return self._target_duration
+
+    def upload_segment(self, segment: Path) -> None:
+        from app.core.storage import upload_file_to_storage
+
+        upload_file_to_storage(
+            bucket=VIDEO_BUCKET,
+            file_path=f"{self.prefix}/{segment.name}",
+            source=segment,
+            content_type="video/mp2t"
+        )
+
+    def upload_playlist(self, playlist_path: Path) -> str:
+        from app.core.storage import upload_to_storage
+
+        # 追記のたびに上書きするため、CDNにキャッシュさせない
+        return upload_to_storage(
+            bucket=VIDEO_BUCKET,
+            file_path=f"{self.prefix}/{playlist_path.name}",
+            file_data=playlist_path.read_bytes(),
+            content_type="application/vnd.apple.mpegurl",
+            cache_control="0"
+        )
+
+    def delete_objects(self, paths: List[str]) -> None:
+        from app.core.storage import delete_files_from_storage
+
+        if not delete_files_from_storage(VIDEO_BUCKET, paths):
+            raise RuntimeError(f"failed to delete {len(paths)} preview files")
+
+    def update_progress(self, slides_done: int) -> None:
+        from app.core.supabase import update_video_job_progress
+
+        update_video_job_progress(self.job_id, slides_done, self.total, self.preview_url)
+
+    def clear_preview(self) -> None:
+        from app.core.supabase import update_video_job_progress
+
+        update_video_job_progress(self.job_id, self._published, self.total, clear_preview=True)
@@ -4,6 +4,8 @@ FastAPIメインアプリケーション
 PDFアップロード、スライドダウンロード、ヘルスチェック、LangGraphプロキシのAPIを提供
 """
 
+import asyncio
+import os
 import time
 from contextlib import asynccontextmanager
 
@@ -14,6 +16,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
 from app.routers import health, uploads, slides, agent, auth, feedback, render
 from app.core.supabase import get_supabase_client
+from app.core.browser_pool import (
+    start_browser_pool,
+    shutdown_browser_pool,
+    start_async_browser_pool,
+    shutdown_async_browser_pool,
+)
 
 
 @asynccontextmanager
@@ -30,8 +38,34 @@ async def lifespan(app: FastAPI):
             print(f"⚠️ Supabase warmup query failed: {e}")
     else:
         print("⚠️ Supabase not configured, skipping warmup")
+
+    # --- Startup: Chromiumブラウザプールを常駐起動（SlideRendererの起動コスト削減） ---
+    # /render/video はイベントループ上のAsyncプールを使用
+    start = time.time()
+    try:
+        pool = await start_async_browser_pool()
+        elapsed = round((time.time() - start) * 1000)
+        print(f"✅ Async browser pool started (size={pool.size}, {elapsed}ms)")
+    except Exception as e:
+        print(f"⚠️ Async browser pool startup failed: {e}")
+
+    # ローカルジョブ（スレッド実行）はSync APIのプールを使用
+    use_local_job = os.environ.get("LOCAL_VIDEO_JOB", "").lower() == "true"
+    if use_local_job:
+        start = time.time()
+        try:
+            pool = await asyncio.to_thread(start_browser_pool)
+            elapsed = round((time.time() - start) * 1000)
+            print(f"✅ Browser pool started (size={pool.size}, {elapsed}ms)")
+        except Exception as e:
+            print(f"⚠️ Browser pool startup failed: {e}")
+
     yield
 
+    # --- Shutdown: ブラウザプールを停止 ---
+    await shutdown_async_browser_pool()
+    await asyncio.to_thread(shutdown_browser_pool)
+
 
 # FastAPIアプリケーション作成
 app = FastAPI(
@@ -9,7 +9,7 @@ LangGraphはHTTP呼び出しのみを行う。
 from fastapi import APIRouter, HTTPException, Depends, Header, Request
 from pydantic import BaseModel
 from app.auth.middleware import verify_token, optional_verify_token
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Literal, Optional
 import asyncio
 import tempfile
 import shutil
@@ -30,6 +30,7 @@ class VideoRenderRequest(BaseModel):
     title: str
     user_id: str
     slide_id: Optional[str] = ""
+    output_format: Optional[Literal["mp4", "hls"]] = None  # 未指定ならVIDEO_OUTPUT_FORMAT
 
 
 class VideoRenderResponse(BaseModel):
@@ -52,25 +53,26 @@ def _render_video_blocking(
     audio_files: List[str],
     title: str,
     user_id: str,
-    slide_id: str
+    slide_id: str,
+    renderer: Optional[Any] = None,
+    output_format: Optional[str] = None
 ) -> Dict:
     """
     ブロッキング動画生成処理
 
     この関数はasyncio.to_thread()経由で呼び出され、
     FastAPIのイベントループをブロックしない。
+
+    renderer を渡した場合（LoopSlideRenderer）はスライド画像をそのレンダラーで生成する。
     """
     print(f"[render] Starting video rendering: {len(slides_json)} slides, {len(audio_files)} audio files")
 
-    from moviepy import ImageClip, AudioFileClip, concatenate_videoclips
-    from app.core.slide_renderer import SlideRenderer
-    from app.core.storage import upload_to_storage
-    from app.core.supabase import update_slide_video_url
+    from app.core.video_pipeline import VideoPipeline
     from app.prompts.slide_prompts import get_slug_prompt
     from app.core.llm import llm
 
     temp_dir = Path(tempfile.mkdtemp())
-    log_entries = []
+    pipeline = VideoPipeline(renderer=renderer, log_prefix="[render]")
 
     try:
         # 1. ファイル名の英語表記を生成
@@ -81,101 +83,22 @@ def _render_video_blocking(
         except Exception:
             file_stem = _slugify_en(title) or "ai-slide"
 
-        # 2. SlideRenderer で PNG 画像生成（HTML/CSS + Playwright）
-        png_dir = temp_dir / "slides_png"
-        print(f"[render] Rendering slides with SlideRenderer to {png_dir}")
-
-        renderer = SlideRenderer()
-        png_files = renderer.render_all(slides_json, png_dir)
-        log_entries.append(f"[video] rendered {len(png_files)} PNG images")
-        print(f"[render] Generated {len(png_files)} PNG files")
-
-        if not png_files:
-            return {
-                "video_url": "",
-                "log": log_entries + ["[video] ERROR: SlideRenderer produced no images"]
-            }
-
-        # 3. 音声ファイル数とPNGファイル数を合わせる
-        audio_files_local = list(audio_files)
-        if len(png_files) != len(audio_files_local):
-            print(f"[render] WARNING: PNG count ({len(png_files)}) != audio count ({len(audio_files_local)})")
-            min_count = min(len(png_files), len(audio_files_local))
-            png_files = png_files[:min_count]
-            audio_files_local = audio_files_local[:min_count]
-
-        # 4. MoviePyで画像+音声を合成
-        clips = []
-        for i, (png_path, audio_path) in enumerate(zip(png_files, audio_files_local)):
-            try:
-                img_clip = ImageClip(str(png_path))
-                audio_clip = AudioFileClip(audio_path)
-                video_clip = img_clip.with_duration(audio_clip.duration).with_audio(audio_clip)
-                clips.append(video_clip)
-            except Exception as e:
-                print(f"[render] WARNING: Failed to process slide {i}: {str(e)[:100]}")
-                continue
-
-        if not clips:
-            return {
-                "video_url": "",
-                "log": log_entries + ["[video] ERROR: all clips failed"]
-            }
-
-        # 5. 全スライドを結合
-        print(f"[render] Concatenating {len(clips)} video clips")
-        final_video = concatenate_videoclips(clips, method="compose")
-        video_path = temp_dir / f"{file_stem}_video.mp4"
-
-        final_video.write_videofile(
-            str(video_path),
-            fps=2,
-            codec="libx264",
-            audio_codec="aac",
-            bitrate="2000k",
-            preset="ultrafast"
+        # 2. 音声取得 → PNG生成 → エンコード → アップロード → DB更新
+        video_url = pipeline.run(
+            slides_json,
+            audio_files,
+            work_dir=temp_dir,
+            storage_path=f"{user_id}/{file_stem}_video.mp4",
+            slide_id=slide_id,
+            output_format=output_format,
         )
-        print(f"[render] Video written to {video_path}")
-
-        # 6. Supabase Storageにアップロード
-        video_url = None
-        try:
-            storage_path = f"{user_id}/{file_stem}_video.mp4"
-            video_url = upload_to_storage(
-                bucket="slide-files",
-                file_path=storage_path,
-                file_data=video_path.read_bytes(),
-                content_type="video/mp4"
-            )
-            video_size_mb = video_path.stat().st_size / 1024 / 1024
-            log_msg = f"[video] rendered {len(clips)} slides -> MP4 ({video_size_mb:.1f}MB, {final_video.duration:.1f}sec)"
-            log_msg += f" | uploaded to {video_url}"
-            log_entries.append(log_msg)
-            print(f"[render] Uploaded to {video_url}")
-        except Exception as e:
-            log_msg = f"[video] rendered locally but upload failed: {str(e)[:100]}"
-            log_entries.append(log_msg)
-            video_url = str(video_path)
-            print(f"[render] Upload failed: {e}")
-
-        # 7. Supabase DBにvideo_urlを保存
-        if video_url and slide_id:
-            try:
-                update_result = update_slide_video_url(slide_id, video_url)
-                if "success" in update_result:
-                    log_entries.append(f"[video] DB updated (slide_id={slide_id})")
-                elif "error" in update_result:
-                    log_entries.append(f"[video] DB update failed: {update_result['error'][:50]}")
-            except Exception as e:
-                log_entries.append(f"[video] DB update exception: {str(e)[:50]}")
-
-        return {"video_url": video_url or "", "log": log_entries}
+        return {"video_url": video_url or "", "log": pipeline.log}
 
     except Exception as e:
         print(f"[render] ERROR: {e}")
         return {
             "video_url": "",
-            "log": log_entries + [f"[video] EXCEPTION {str(e)[:100]}"]
+            "log": pipeline.log + [f"[video] EXCEPTION {str(e)[:100]}"]
         }
 
     finally:
@@ -193,8 +116,9 @@ async def render_video(
 
     認証: JWT または 内部APIシークレット
 
-    asyncio.to_thread()でブロッキング処理を別スレッドで実行し、
-    FastAPIのイベントループをブロックしない。
+    ブロッキング処理（音声取得・動画合成・アップロード）は asyncio.to_thread() で別スレッドで実行する。
+    スライド画像はパイプラインから LoopSlideRenderer 経由でイベントループ上の AsyncSlideRenderer に依頼し、
+    音声取得・エンコードと重ねてレンダリングする。
     """
     print(f"[render] Received video render request: {request.title}")
 
@@ -216,6 +140,11 @@ async def render_video(
             detail="Not authenticated"
         )
 
+    # スライド画像はイベントループ上でレンダリング（スレッドを消費しない）
+    from app.core.slide_renderer import AsyncSlideRenderer, LoopSlideRenderer
+
+    renderer = LoopSlideRenderer(AsyncSlideRenderer(), asyncio.get_running_loop())
+
     try:
         result = await asyncio.to_thread(
             _render_video_blocking,
@@ -223,7 +152,9 @@ async def render_video(
             request.audio_files,
             request.title,
             request.user_id,
-            request.slide_id or ""
+            request.slide_id or "",
+            renderer=renderer,
+            output_format=request.output_format
         )
 
         if not result.get("video_url"):
@@ -255,6 +186,8 @@ class AsyncVideoRenderRequest(BaseModel):
     title: str
     user_id: str
     slide_id: str  # 必須
+    output_format: Optional[Literal["mp4", "hls"]] = None  # 未指定ならVIDEO_OUTPUT_FORMAT
+    audio_durations: Optional[List[Optional[float]]] = None  # 各音声の長さ（秒、generate_narrationで計算）
 
 
 class AsyncVideoRenderResponse(BaseModel):
@@ -269,28 +202,9 @@ class VideoJobStatusResponse(BaseModel):
     status: str
     video_url: Optional[str] = None
     error_message: Optional[str] = None
-
-
-def _download_audio_file(url: str, dest_path: Path) -> bool:
-    """URLから音声ファイルをダウンロード
-
-    Args:
-        url: 音声ファイルのURL（Supabase Storage公開URL）
-        dest_path: 保存先パス
-
-    Returns:
-        成功: True、失敗: False
-    """
-    import requests
-
-    try:
-        response = requests.get(url, timeout=60)
-        response.raise_for_status()
-        dest_path.write_bytes(response.content)
-        return True
-    except Exception as e:
-        print(f"[local-job] Failed to download audio: {e}")
-        return False
+    slides_done: Optional[int] = None
+    slides_total: Optional[int] = None
+    preview_url: Optional[str] = None  # 完成済みスライドだけのHLSプレイリスト（処理中に再生可能）
 
 
 def _run_video_job_local(job_id: str):
@@ -301,9 +215,8 @@ def _run_video_job_local(job_id: str):
     音声ファイルはSupabase Storage URLからダウンロードする。
     """
     import json
-    from app.core.supabase import get_video_job, update_video_job, update_slide_video_url
-    from app.core.storage import upload_to_storage
-    from app.core.slide_renderer import SlideRenderer
+    from app.core.supabase import get_video_job, update_video_job
+    from app.core.video_pipeline import VideoPipeline
     import tempfile
     from pathlib import Path
 
@@ -323,6 +236,7 @@ def _run_video_job_local(job_id: str):
     update_video_job(job_id, "processing")
 
     temp_dir = Path(tempfile.mkdtemp())
+    pipeline = VideoPipeline(log_prefix="[local-job]")
 
     try:
         # 3. 入力データをパース
@@ -335,99 +249,23 @@ def _run_video_job_local(job_id: str):
 
         print(f"[local-job] Processing: {len(slides_json)} slides, {len(audio_urls)} audio files")
 
-        # 4. 音声ファイルをダウンロード（URLの場合）
-        audio_dir = temp_dir / "audio"
-        audio_dir.mkdir(parents=True, exist_ok=True)
-        audio_files = []
-
-        for i, audio_url in enumerate(audio_urls):
-            if audio_url.startswith("http"):
-                # URLからダウンロード
-                local_path = audio_dir / f"narration_{i:03d}.mp3"
-                print(f"[local-job] Downloading audio {i}: {audio_url[:80]}...")
-                if not _download_audio_file(audio_url, local_path):
-                    raise Exception(f"Failed to download audio file {i}")
-                audio_files.append(str(local_path))
-            else:
-                # ローカルパス（後方互換性）
-                audio_files.append(audio_url)
-
-        print(f"[local-job] Downloaded {len(audio_files)} audio files")
-
-        # 4. PNG画像生成
-        png_dir = temp_dir / "slides_png"
-        renderer = SlideRenderer()
-        png_files = renderer.render_all(slides_json, png_dir)
-        print(f"[local-job] Generated {len(png_files)} PNG files")
-
-        if not png_files:
-            raise Exception("SlideRenderer produced no images")
-
-        # 5. 音声ファイル数とPNGファイル数を合わせる
-        if len(png_files) != len(audio_files):
-            print(f"[local-job] WARNING: PNG count ({len(png_files)}) != audio count ({len(audio_files)})")
-            min_count = min(len(png_files), len(audio_files))
-            png_files = png_files[:min_count]
-            audio_files = audio_files[:min_count]
-
-        # 6. MoviePyで動画生成
-        from moviepy import ImageClip, AudioFileClip, concatenate_videoclips
-
-        clips = []
-        for i, (png_path, audio_path) in enumerate(zip(png_files, audio_files)):
-            try:
-                img_clip = ImageClip(str(png_path))
-                audio_clip = AudioFileClip(audio_path)
-                video_clip = img_clip.with_duration(audio_clip.duration).with_audio(audio_clip)
-                clips.append(video_clip)
-                print(f"[local-job] Processed clip {i+1}/{len(png_files)}")
-            except Exception as e:
-                print(f"[local-job] WARNING: Failed to process slide {i}: {str(e)[:100]}")
-                continue
-
-        if not clips:
-            raise Exception("All clips failed to process")
-
-        # 7. 動画を結合・エンコード
-        print(f"[local-job] Concatenating {len(clips)} video clips")
-        final_video = concatenate_videoclips(clips, method="compose")
-
-        file_stem = _slugify_en(title)
-        video_path = temp_dir / f"{file_stem}_video.mp4"
-
-        final_video.write_videofile(
-            str(video_path),
-            fps=2,
-            codec="libx264",
-            audio_codec="aac",
-            bitrate="2000k",
-            preset="ultrafast"
-        )
-        print(f"[local-job] Video written to {video_path}")
-
-        # 8. Supabase Storageにアップロード
-        storage_path = f"{user_id}/{file_stem}_video.mp4"
-        video_url = upload_to_storage(
-            bucket="slide-files",
-            file_path=storage_path,
-            file_data=video_path.read_bytes(),
-            content_type="video/mp4"
+        # 4. 音声取得 → PNG生成 → エンコード → アップロード → DB更新（completed）
+        video_url = pipeline.run(
+            slides_json,
+            audio_urls,
+            work_dir=temp_dir,
+            storage_path=f"{user_id}/{_slugify_en(title)}_video.mp4",
+            slide_id=slide_id,
+            job_id=job_id,
+            output_format=input_data.get("output_format"),
+            audio_durations=input_data.get("audio_durations"),
         )
-        print(f"[local-job] Uploaded to {video_url}")
-
-        # 9. slidesテーブルのvideo_urlを更新
-        if slide_id:
-            update_slide_video_url(slide_id, video_url)
-            print(f"[local-job] Updated slide {slide_id} with video_url")
-
-        # 10. ジョブステータスを completed に更新
-        update_video_job(job_id, "completed", video_url=video_url)
         print(f"[local-job] Job completed successfully: {video_url}")
 
     except Exception as e:
         error_msg = str(e)[:500]
         print(f"[local-job] ERROR: {error_msg}")
-        update_video_job(job_id, "failed", error_message=error_msg)
+        update_video_job(job_id, "failed", error_message=error_msg, metrics=pipeline.metrics())
 
     finally:
         shutil.rmtree(temp_dir, ignore_errors=True)
@@ -479,7 +317,9 @@ async def render_video_async(
         user_id=request.user_id,
         slides_json=request.slides_json,
         audio_files=request.audio_files,
-        title=request.title
+        title=request.title,
+        output_format=request.output_format,
+        audio_durations=request.audio_durations
     )
 
     if "error" in result:
@@ -541,5 +381,8 @@ async def get_video_status(
         job_id=job_id,
         status=job["status"],
         video_url=job.get("video_url"),
-        error_message=job.get("error_message")
+        error_message=job.get("error_message"),
+        slides_done=job.get("slides_done"),
+        slides_total=job.get("slides_total"),
+        preview_url=job.get("preview_url")
     )
@@ -12,9 +12,9 @@ Usage:
 import os
 import sys
 import json
+import re
 import tempfile
 import shutil
-import requests
 from pathlib import Path
 
 # backend/app をモジュールパスに追加
@@ -23,29 +23,19 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from dotenv import load_dotenv
 load_dotenv()
 
-from app.core.supabase import get_video_job, update_video_job, update_slide_video_url
-from app.core.storage import upload_to_storage
-from app.core.slide_renderer import SlideRenderer
+from app.core.supabase import get_video_job, update_video_job
+from app.core.slide_renderer import RENDER_WORKERS
+from app.core.video_pipeline import VideoPipeline
+from app.core.browser_pool import start_browser_pool, shutdown_browser_pool
 
 
-def download_audio_file(url: str, dest_path: Path) -> bool:
-    """URLから音声ファイルをダウンロード
-
-    Args:
-        url: 音声ファイルのURL（Supabase Storage公開URL）
-        dest_path: 保存先パス
-
-    Returns:
-        成功: True、失敗: False
-    """
-    try:
-        response = requests.get(url, timeout=120)
-        response.raise_for_status()
-        dest_path.write_bytes(response.content)
-        return True
-    except Exception as e:
-        print(f"[job] Failed to download audio: {e}")
-        return False
+def slugify(text: str) -> str:
+    """タイトルをファイル名用スラッグに変換"""
+    slug = text.lower()
+    slug = re.sub(r'[^a-z0-9\s-]', '', slug)
+    slug = re.sub(r'[\s_]+', '-', slug)
+    slug = re.sub(r'-+', '-', slug).strip('-')
+    return slug or "ai-slide"
 
 
 def main():
@@ -57,6 +47,10 @@ def main():
 
     print(f"[job] Starting video render job: {job_id}")
 
+    # Chromiumをバックグラウンドで事前起動（ジョブ取得・音声ダウンロードと並行）
+    # 並列レンダリング用にワーカー数分のブラウザを用意する
+    start_browser_pool(size=RENDER_WORKERS, wait=False)
+
     # 1. ジョブデータを取得
     job = get_video_job(job_id)
     if not job:
@@ -71,6 +65,7 @@ def main():
     update_video_job(job_id, "processing")
 
     temp_dir = Path(tempfile.mkdtemp())
+    pipeline = VideoPipeline(log_prefix="[job]")
 
     try:
         # 3. 入力データをパース
@@ -83,112 +78,28 @@ def main():
 
         print(f"[job] Processing: {len(slides_json)} slides, {len(audio_urls)} audio files")
 
-        # 4. 音声ファイルをダウンロード（URLの場合）
-        audio_dir = temp_dir / "audio"
-        audio_dir.mkdir(parents=True, exist_ok=True)
-        audio_files = []
-
-        for i, audio_url in enumerate(audio_urls):
-            if audio_url.startswith("http"):
-                # URLからダウンロード
-                local_path = audio_dir / f"narration_{i:03d}.mp3"
-                print(f"[job] Downloading audio {i}: {audio_url[:80]}...")
-                if not download_audio_file(audio_url, local_path):
-                    raise Exception(f"Failed to download audio file {i}")
-                audio_files.append(str(local_path))
-            else:
-                # ローカルパス（後方互換性）
-                audio_files.append(audio_url)
-
-        print(f"[job] Downloaded {len(audio_files)} audio files")
-
-        # 5. PNG画像生成
-        png_dir = temp_dir / "slides_png"
-        renderer = SlideRenderer()
-        png_files = renderer.render_all(slides_json, png_dir)
-        print(f"[job] Generated {len(png_files)} PNG files")
-
-        if not png_files:
-            raise Exception("SlideRenderer produced no images")
-
-        # 6. 音声ファイル数とPNGファイル数を合わせる
-        if len(png_files) != len(audio_files):
-            print(f"[job] WARNING: PNG count ({len(png_files)}) != audio count ({len(audio_files)})")
-            min_count = min(len(png_files), len(audio_files))
-            png_files = png_files[:min_count]
-            audio_files = audio_files[:min_count]
-
-        # 7. MoviePyで動画生成
-        from moviepy import ImageClip, AudioFileClip, concatenate_videoclips
-
-        clips = []
-        for i, (png_path, audio_path) in enumerate(zip(png_files, audio_files)):
-            try:
-                img_clip = ImageClip(str(png_path))
-                audio_clip = AudioFileClip(audio_path)
-                video_clip = img_clip.with_duration(audio_clip.duration).with_audio(audio_clip)
-                clips.append(video_clip)
-                print(f"[job] Processed clip {i+1}/{len(png_files)}")
-            except Exception as e:
-                print(f"[job] WARNING: Failed to process slide {i}: {str(e)[:100]}")
-                continue
-
-        if not clips:
-            raise Exception("All clips failed to process")
-
-        # 8. 動画を結合・エンコード
-        print(f"[job] Concatenating {len(clips)} video clips")
-        final_video = concatenate_videoclips(clips, method="compose")
-
-        # ファイル名を生成
-        import re
-        def slugify(text: str) -> str:
-            slug = text.lower()
-            slug = re.sub(r'[^a-z0-9\s-]', '', slug)
-            slug = re.sub(r'[\s_]+', '-', slug)
-            slug = re.sub(r'-+', '-', slug).strip('-')
-            return slug or "ai-slide"
-
-        file_stem = slugify(title)
-        video_path = temp_dir / f"{file_stem}_video.mp4"
-
-        final_video.write_videofile(
-            str(video_path),
-            fps=2,
-            codec="libx264",
-            audio_codec="aac",
-            bitrate="2000k",
-            preset="ultrafast"
-        )
-        print(f"[job] Video written to {video_path}")
-
-        # 9. Supabase Storageにアップロード
-        storage_path = f"{user_id}/{file_stem}_video.mp4"
-        video_url = upload_to_storage(
-            bucket="slide-files",
-            file_path=storage_path,
-            file_data=video_path.read_bytes(),
-            content_type="video/mp4"
+        # 4. 音声取得 → PNG生成 → エンコード → アップロード → DB更新（completed）
+        video_url = pipeline.run(
+            slides_json,
+            audio_urls,
+            work_dir=temp_dir,
+            storage_path=f"{user_id}/{slugify(title)}_video.mp4",
+            slide_id=slide_id,
+            job_id=job_id,
+            output_format=input_data.get("output_format"),
+            audio_durations=input_data.get("audio_durations"),
         )
-        print(f"[job] Uploaded to {video_url}")
-
-        # 10. slidesテーブルのvideo_urlを更新
-        if slide_id:
-            update_slide_video_url(slide_id, video_url)
-            print(f"[job] Updated slide {slide_id} with video_url")
-
-        # 11. ジョブステータスを completed に更新
-        update_video_job(job_id, "completed", video_url=video_url)
         print(f"[job] Job completed successfully: {video_url}")
 
     except Exception as e:
         error_msg = str(e)[:500]
         print(f"[job] ERROR: {error_msg}")
-        update_video_job(job_id, "failed", error_message=error_msg)
+        update_video_job(job_id, "failed", error_message=error_msg, metrics=pipeline.metrics())
         sys.exit(1)
 
     finally:
         shutil.rmtree(temp_dir, ignore_errors=True)
+        shutdown_browser_pool()
 
 
 if __name__ == "__main__":
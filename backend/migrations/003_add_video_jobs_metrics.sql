@@ -0,0 +1,6 @@
+-- Migration: Add metrics column to video_jobs for pipeline stage timings
+-- Run this in Supabase SQL Editor
+--
+-- 例: {"stages": {"encode": {"wall_sec": 12.3, "cpu_sec": 40.1}, ...}, "total_wall_sec": 30.5, "slides": 12}
+
+ALTER TABLE video_jobs ADD COLUMN IF NOT EXISTS metrics JSONB;
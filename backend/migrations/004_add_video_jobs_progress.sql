@@ -0,0 +1,9 @@
+-- Migration: Add progress columns to video_jobs for progressive preview
+-- Run this in Supabase SQL Editor
+--
+-- slides_done / slides_total: エンコード済みスライド数 / 全スライド数
+-- preview_url: 完成済みセグメントだけを並べたHLSプレイリスト（ジョブ実行中に更新される）
+
+ALTER TABLE video_jobs ADD COLUMN IF NOT EXISTS slides_done INTEGER;
+ALTER TABLE video_jobs ADD COLUMN IF NOT EXISTS slides_total INTEGER;
+ALTER TABLE video_jobs ADD COLUMN IF NOT EXISTS preview_url TEXT;
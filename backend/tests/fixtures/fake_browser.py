@@ -0,0 +1,143 @@
+"""テスト用フェイクブラウザ（Playwright未インストール環境でBrowserPoolを動かす）"""
+
+from pathlib import Path
+
+from app.core.browser_pool import AsyncBrowserPool, BrowserPool
+
+
+class FakePage:
+    """set_content/evaluate/screenshot のみを模したページ"""
+
+    def __init__(self, context):
+        self.context = context
+        self.browser = context.browser
+        self.content = ""
+        self.scripts = 0
+
+    def add_script_tag(self, content=None):
+        self.scripts += 1
+
+    def evaluate(self, expression, arg=None):
+        # mermaid描画呼び出しはbodyの差し替えとして扱う
+        if isinstance(arg, dict) and "body" in arg:
+            self.content = arg["body"] + arg.get("code", "")
+            return True
+        # mermaid.render() はコードを包んだSVGを返す（"error"を含むコードは構文エラー扱い）
+        if isinstance(arg, dict) and "code" in arg:
+            self.renders = getattr(self, "renders", 0) + 1
+            return None if "error" in arg["code"] else f"<svg>{arg['code']}</svg>"
+        return None
+
+    def set_content(self, html_content):
+        self.content = html_content
+
+    def wait_for_load_state(self, state=None):
+        pass
+
+    def wait_for_function(self, expression, timeout=None):
+        pass
+
+    def wait_for_timeout(self, timeout):
+        pass
+
+    def screenshot(self, path=None):
+        data = f"PNG:{self.content}".encode("utf-8")
+        if path:
+            Path(path).write_bytes(data)
+        return data
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.pages = []
+
+    def set_default_timeout(self, timeout):
+        pass
+
+    def new_page(self):
+        page = FakePage(self)
+        self.pages.append(page)
+        return page
+
+    def close(self):
+        pass
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    def new_context(self, viewport=None):
+        return FakeContext(self)
+
+    def close(self):
+        self.connected = False
+
+
+class FakeBrowserPool(BrowserPool):
+    """_launch_browser をフェイクに差し替えたプール"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.launched = []
+
+    def _launch_browser(self, worker):
+        browser = FakeBrowser()
+        self.launched.append(browser)
+        return browser
+
+
+# ------------------------------------------------------------
+# Async版
+# ------------------------------------------------------------
+
+class FakeAsyncPage(FakePage):
+    async def set_content(self, html_content):
+        FakePage.set_content(self, html_content)
+
+    async def wait_for_load_state(self, state=None):
+        pass
+
+    async def add_script_tag(self, content=None):
+        FakePage.add_script_tag(self, content)
+
+    async def evaluate(self, expression, arg=None):
+        return FakePage.evaluate(self, expression, arg)
+
+    async def screenshot(self, path=None):
+        return FakePage.screenshot(self, path)
+
+
+class FakeAsyncContext(FakeContext):
+    async def new_page(self):
+        page = FakeAsyncPage(self)
+        self.pages.append(page)
+        return page
+
+    async def close(self):
+        pass
+
+
+class FakeAsyncBrowser(FakeBrowser):
+    async def new_context(self, viewport=None):
+        return FakeAsyncContext(self)
+
+    async def close(self):
+        self.connected = False
+
+
+class FakeAsyncBrowserPool(AsyncBrowserPool):
+    """_launch_browser をフェイクに差し替えたAsyncプール"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.launched = []
+
+    async def _launch_browser(self):
+        browser = FakeAsyncBrowser()
+        self.launched.append(browser)
+        return browser
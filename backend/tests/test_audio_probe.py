@@ -0,0 +1,50 @@
+"""audio_probe ユニットテスト（合成したMP3フレームを使用）"""
+
+import struct
+
+import pytest
+from app.core.audio_probe import audio_duration, mp3_duration
+
+# MPEG-1 Layer III, 128kbps, 44.1kHz, ステレオ → 1フレーム417バイト・1152サンプル
+HEADER = b"\xff\xfb\x90\x00"
+FRAME = HEADER + b"\x00" * 413
+FRAME_SEC = 1152 / 44100
+
+
+def _id3(size=20):
+    return b"ID3\x04\x00\x00" + bytes([0, 0, 0, size]) + b"\x00" * size
+
+
+class TestMp3Duration:
+    """フレームヘッダーからの長さ計算"""
+
+    def test_counts_frames(self):
+        assert mp3_duration(FRAME * 100) == pytest.approx(100 * FRAME_SEC)
+
+    def test_skips_id3_tag(self):
+        assert mp3_duration(_id3() + FRAME * 10) == pytest.approx(10 * FRAME_SEC)
+
+    def test_uses_xing_frame_count(self):
+        xing = HEADER + b"\x00" * 32 + b"Xing" + struct.pack(">II", 1, 500)
+        first = xing + b"\x00" * (417 - len(xing))
+        assert mp3_duration(first + FRAME * 3) == pytest.approx(500 * FRAME_SEC)
+
+    def test_mpeg2_frames(self):
+        # MPEG-2 Layer III, 64kbps, 24kHz → 1フレーム576サンプル・192バイト
+        frame = b"\xff\xf3\x84\x00" + b"\x00" * 188
+        assert mp3_duration(frame * 50) == pytest.approx(50 * 576 / 24000)
+
+    def test_non_mp3_returns_none(self):
+        assert mp3_duration(b"RIFF\x00\x00\x00\x00WAVEfmt ") is None
+        assert mp3_duration(b"") is None
+
+    def test_audio_duration_reads_file(self, tmp_path):
+        path = tmp_path / "narration.mp3"
+        path.write_bytes(FRAME * 20)
+        assert audio_duration(path) == pytest.approx(20 * FRAME_SEC)
+
+    def test_audio_duration_without_mp3_header(self, tmp_path):
+        path = tmp_path / "narration.wav"
+        path.write_bytes(b"RIFF\x00\x00\x00\x00WAVEfmt ")
+        assert audio_duration(path) is None
+        assert audio_duration(tmp_path / "missing.mp3") is None
@@ -0,0 +1,91 @@
+"""BrowserPool ユニットテスト（Playwrightの代わりにフェイクブラウザを使用）"""
+
+import asyncio
+
+import pytest
+from tests.fixtures.fake_browser import FakeAsyncBrowserPool, FakeBrowserPool
+
+
+class TestBrowserPool:
+    """BrowserPoolの基本動作テスト"""
+
+    def setup_method(self):
+        self.pool = FakeBrowserPool(size=1, max_renders=3).start()
+
+    def teardown_method(self):
+        self.pool.shutdown()
+
+    def test_warm_browser_is_reused(self):
+        browsers = [self.pool.run(lambda page: page.browser) for _ in range(2)]
+        assert browsers[0] is browsers[1]
+        assert len(self.pool.launched) == 1
+
+    def test_recycles_after_max_renders(self):
+        for _ in range(4):
+            self.pool.run(lambda page: None)
+        assert len(self.pool.launched) == 2
+
+    def test_restarts_crashed_browser_and_retries(self):
+        calls = []
+
+        def task(page):
+            calls.append(page.browser)
+            if len(calls) == 1:
+                page.browser.connected = False
+                raise RuntimeError("Target closed")
+            return "ok"
+
+        assert self.pool.run(task) == "ok"
+        assert calls[0] is not calls[1]
+
+    def test_task_error_is_propagated(self):
+        def task(page):
+            raise ValueError("bad slide")
+
+        with pytest.raises(ValueError):
+            self.pool.run(task)
+        # ブラウザは生きているので再起動しない
+        assert len(self.pool.launched) == 1
+
+    def test_submit_before_start_raises(self):
+        with pytest.raises(RuntimeError):
+            FakeBrowserPool().submit(lambda page: None)
+
+
+class TestAsyncBrowserPool:
+    """AsyncBrowserPoolのクラッシュ時の再起動"""
+
+    def test_late_crash_report_does_not_close_relaunched_browser(self):
+        async def run():
+            pool = await FakeAsyncBrowserPool(size=2).start()
+            first = pool.launched[0]
+            b_retrying = asyncio.Event()
+            a_may_fail = asyncio.Event()
+
+            async def task_a(page):
+                if page.browser is first:
+                    await a_may_fail.wait()
+                    raise RuntimeError("Target closed")
+                return "a"
+
+            async def task_b(page):
+                if page.browser is first:
+                    first.connected = False
+                    raise RuntimeError("Target closed")
+                b_retrying.set()
+                # Aが古いブラウザのクラッシュを報告するまで新しいブラウザを使い続ける
+                await asyncio.sleep(0.01)
+                a_may_fail.set()
+                await asyncio.sleep(0.01)
+                assert page.browser.is_connected()
+                return "b"
+
+            try:
+                return await asyncio.gather(pool.run(task_a), pool.run(task_b)), pool.launched
+            finally:
+                await pool.shutdown()
+
+        results, launched = asyncio.run(run())
+        assert results == ["a", "b"]
+        # 再起動は1回だけ
+        assert len(launched) == 2
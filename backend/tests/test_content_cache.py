@@ -0,0 +1,81 @@
+"""ContentCache ユニットテスト"""
+
+import os
+import time
+from app.core.content_cache import ContentCache, cached_content_cache, content_key
+
+
+class TestContentKey:
+    """キャッシュキー生成"""
+
+    def test_key_ignores_dict_order(self):
+        assert content_key({"a": 1, "b": 2}) == content_key({"b": 2, "a": 1})
+
+    def test_key_changes_with_content(self):
+        assert content_key("v1", {"a": 1}) != content_key("v2", {"a": 1})
+
+
+class TestContentCache:
+    """ディスクキャッシュの基本動作テスト"""
+
+    def test_put_and_get(self, tmp_path):
+        cache = ContentCache(tmp_path)
+        cache.put("ab" * 32, b"png-bytes")
+        assert cache.get("ab" * 32) == b"png-bytes"
+
+    def test_get_missing_key_returns_none(self, tmp_path):
+        assert ContentCache(tmp_path).get("cd" * 32) is None
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        cache = ContentCache(tmp_path, max_bytes=250)
+        keys = [content_key(i) for i in range(3)]
+
+        cache.put(keys[0], b"x" * 100)
+        cache.put(keys[1], b"y" * 100)
+        # keys[0]を参照して最近使ったことにする
+        past = time.time() - 60
+        os.utime(cache._path(keys[1]), (past, past))
+        assert cache.get(keys[0]) is not None
+
+        cache.put(keys[2], b"z" * 100)
+
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) == b"x" * 100
+        assert cache.get(keys[2]) == b"z" * 100
+
+    def test_size_is_restored_from_disk(self, tmp_path):
+        ContentCache(tmp_path).put(content_key("a"), b"a" * 100)
+        cache = ContentCache(tmp_path, max_bytes=150)
+        cache.put(content_key("b"), b"b" * 100)
+        assert cache.get(content_key("a")) is None
+
+    def test_put_file_and_get_file(self, tmp_path):
+        cache = ContentCache(tmp_path / "cache")
+        src = tmp_path / "segment.ts"
+        src.write_bytes(b"ts-bytes")
+        cache.put_file(content_key("seg"), src)
+
+        dest = tmp_path / "copy.ts"
+        assert cache.get_file(content_key("seg"), dest) is True
+        assert dest.read_bytes() == b"ts-bytes"
+        assert cache.get_file(content_key("other"), tmp_path / "none.ts") is False
+
+    def test_clear(self, tmp_path):
+        cache = ContentCache(tmp_path)
+        cache.put(content_key("a"), b"a")
+        cache.clear()
+        assert cache.get(content_key("a")) is None
+
+
+class TestCachedContentCache:
+    """cached_content_cache のプロセス共有"""
+
+    def test_same_root_returns_same_cache(self, tmp_path):
+        cache = cached_content_cache(True, tmp_path / "a", 1, prefix="cache/a")
+
+        assert cached_content_cache(True, tmp_path / "a", 1, prefix="cache/a") is cache
+        assert cached_content_cache(True, tmp_path / "b", 1) is not cache
+        assert cache.max_bytes == 1024 * 1024 and cache.bucket is None
+
+    def test_disabled_returns_none(self, tmp_path):
+        assert cached_content_cache(False, tmp_path, 1) is None
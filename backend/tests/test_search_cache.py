@@ -0,0 +1,47 @@
+"""SqliteTTLCache ユニットテスト"""
+
+import time
+
+from app.core.search_cache import SqliteTTLCache, search_cache_ttl
+
+
+class TestSqliteTTLCache:
+    """SqliteTTLCacheの基本動作テスト"""
+
+    def test_set_and_get(self, tmp_path):
+        cache = SqliteTTLCache(tmp_path / "search.sqlite3")
+        cache.set("key1", {"results": [{"url": "https://a"}]}, ttl_seconds=60)
+        assert cache.get("key1") == {"results": [{"url": "https://a"}]}
+        assert cache.get("missing") is None
+
+    def test_expired_entry_returns_none(self, tmp_path):
+        cache = SqliteTTLCache(tmp_path / "search.sqlite3")
+        cache.set("key1", "value", ttl_seconds=0)
+        time.sleep(0.01)
+        assert cache.get("key1") is None
+
+    def test_persists_across_instances(self, tmp_path):
+        # 別プロセス・再起動後も同じファイルから読める
+        SqliteTTLCache(tmp_path / "search.sqlite3").set("key1", [1, 2], ttl_seconds=60)
+        assert SqliteTTLCache(tmp_path / "search.sqlite3").get("key1") == [1, 2]
+
+    def test_invalidate(self, tmp_path):
+        cache = SqliteTTLCache(tmp_path / "search.sqlite3")
+        cache.set("key1", 1, ttl_seconds=60)
+        cache.invalidate()
+        assert cache.get("key1") is None
+
+    def test_ttl_follows_time_range(self):
+        assert search_cache_ttl("day") < search_cache_ttl("week") < search_cache_ttl("month")
+        assert search_cache_ttl(None) > 0
+
+    def test_unusable_path_disables_cache(self, tmp_path, monkeypatch):
+        from app.core import search_cache
+
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+        monkeypatch.setattr(search_cache, "_search_cache", None)
+        monkeypatch.setattr(search_cache, "TAVILY_CACHE_ENABLED", True)
+        # 親ディレクトリを作れない（OSError）場合もキャッシュなしで続行する
+        monkeypatch.setattr(search_cache, "TAVILY_CACHE_PATH", blocker / "sub" / "tavily.sqlite3")
+        assert search_cache.get_search_cache() is None
@@ -0,0 +1,257 @@
+"""SlideRenderer ユニットテスト（フェイクブラウザでレンダリング）"""
+
+import asyncio
+
+import pytest
+
+from app.core.content_cache import ContentCache
+from app.core.slide_renderer import AsyncSlideRenderer, LoopSlideRenderer, SlideRenderer, _scope_css
+from tests.fixtures.fake_browser import FakeAsyncBrowserPool, FakeBrowserPool
+
+
+def _slides(n):
+    return [{"type": "content", "heading": f"見出し{i}", "bullets": [f"項目{i}"]} for i in range(n)]
+
+
+class TestSlideRendererParallel:
+    """複数ワーカーでの並列レンダリング"""
+
+    def setup_method(self):
+        self.pool = FakeBrowserPool(size=3).start()
+
+    def teardown_method(self):
+        self.pool.shutdown()
+
+    def test_render_all_keeps_original_order(self, tmp_path):
+        renderer = SlideRenderer(pool=self.pool, workers=3, use_cache=False)
+        paths = renderer.render_all(_slides(10), tmp_path)
+
+        assert [p.name for p in paths] == [f"{i+1}.png" for i in range(10)]
+        for i, path in enumerate(paths):
+            assert f"見出し{i}" in path.read_bytes().decode("utf-8")
+
+    def test_render_all_empty(self, tmp_path):
+        assert SlideRenderer(pool=self.pool, use_cache=False).render_all([], tmp_path) == []
+
+    def test_on_frame_called_for_every_slide(self):
+        received = {}
+        frames = SlideRenderer(pool=self.pool, workers=3, use_cache=False).render_frames(
+            _slides(5), on_frame=lambda i, data: received.setdefault(i, data)
+        )
+        assert [received[i] for i in range(5)] == frames
+
+    def test_render_frames_returns_bytes_without_files(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        frames = SlideRenderer(pool=self.pool, workers=3, use_cache=False).render_frames(_slides(4))
+
+        assert [f"見出し{i}" in frame.decode("utf-8") for i, frame in enumerate(frames)] == [True] * 4
+        assert list(tmp_path.iterdir()) == []
+
+    def test_slide_is_rerendered_after_browser_crash(self):
+        renderer = SlideRenderer(pool=self.pool, workers=1, use_cache=False)
+        original = renderer._render_slide
+        crashed = []
+
+        def render_slide(page, slide):
+            if slide["heading"] == "見出し1" and not crashed:
+                crashed.append(True)
+                page.browser.connected = False
+                raise RuntimeError("Target closed")
+            return original(page, slide)
+
+        renderer._render_slide = render_slide
+        frames = renderer.render_frames(_slides(3))
+
+        assert [f"見出し{i}" in frame.decode("utf-8") for i, frame in enumerate(frames)] == [True] * 3
+
+    def test_missing_slide_raises(self):
+        renderer = SlideRenderer(pool=self.pool, workers=1, use_cache=False)
+        renderer._render_pages = lambda page, *args: None
+
+        with pytest.raises(RuntimeError, match="not rendered"):
+            renderer.render_frames(_slides(2))
+
+
+class TestSlideRendererPageShell:
+    """ページシェルは1回だけ読み込み、スライドごとにはbodyのみ差し替える"""
+
+    def setup_method(self):
+        self.pool = FakeBrowserPool(size=1).start()
+
+    def teardown_method(self):
+        self.pool.shutdown()
+
+    def test_shell_loaded_once_per_page(self):
+        renderer = SlideRenderer(pool=self.pool, workers=1, use_cache=False)
+        prepared = []
+        original = renderer._prepare_page
+        renderer._prepare_page = lambda page: prepared.append(page) or original(page)
+
+        frames = renderer.render_frames(_slides(3))
+
+        assert len(prepared) == 1
+        # 前のスライドの内容は残らない
+        assert "見出し0" not in frames[2].decode("utf-8")
+        assert "見出し2" in frames[2].decode("utf-8")
+
+    def test_type_styles_are_scoped(self):
+        css = _scope_css("\nh2 { color: red; }\n.a, .b li { margin: 0; }", 'body[data-type="x"]')
+        assert 'body[data-type="x"] h2 {' in css
+        assert 'body[data-type="x"] .a, body[data-type="x"] .b li {' in css
+
+
+class TestSlideRendererCache:
+    """レンダリング結果キャッシュ"""
+
+    def setup_method(self):
+        self.pool = FakeBrowserPool(size=1).start()
+
+    def teardown_method(self):
+        self.pool.shutdown()
+
+    def test_only_changed_slides_are_rendered(self, tmp_path):
+        cache = ContentCache(tmp_path / "cache")
+        slides = _slides(3)
+        SlideRenderer(pool=self.pool, cache=cache).render_all(slides, tmp_path / "run1")
+
+        rendered = []
+        renderer = SlideRenderer(pool=self.pool, cache=cache)
+        original = renderer._render_slide
+        renderer._render_slide = lambda page, slide: rendered.append(slide) or original(page, slide)
+
+        slides[1] = {**slides[1], "heading": "変更後"}
+        paths = renderer.render_all(slides, tmp_path / "run2")
+
+        assert rendered == [slides[1]]
+        assert len(paths) == 3
+        assert "見出し0" in paths[0].read_bytes().decode("utf-8")
+        assert "変更後" in paths[1].read_bytes().decode("utf-8")
+
+
+class TestSlideRendererMermaid:
+    """mermaidは事前にSVG化し、同じコードは1回だけ描画する"""
+
+    def setup_method(self):
+        self.pool = FakeBrowserPool(size=1).start()
+
+    def teardown_method(self):
+        self.pool.shutdown()
+
+    def _render_svgs_spy(self, renderer):
+        pages = []
+        original = renderer._render_svgs
+
+        def spy(page, codes):
+            pages.append((page, list(codes)))
+            return original(page, codes)
+
+        renderer._render_svgs = spy
+        return pages
+
+    def test_identical_diagrams_rendered_once(self, tmp_path):
+        slides = [
+            {"type": "mermaid", "heading": f"図{i}", "mermaid_code": f"graph TD; A{i % 2}-->B"}
+            for i in range(4)
+        ]
+        renderer = SlideRenderer(pool=self.pool, workers=1, use_cache=False)
+        calls = self._render_svgs_spy(renderer)
+
+        paths = renderer.render_all(slides, tmp_path)
+
+        assert len(calls) == 1
+        page, codes = calls[0]
+        assert len(codes) == 2
+        assert page.scripts == 1
+        assert "<svg>graph TD; A1-->B</svg>" in paths[3].read_bytes().decode("utf-8")
+
+    def test_svg_is_served_from_cache(self, tmp_path):
+        cache = ContentCache(tmp_path / "cache")
+        slides = [{"type": "mermaid", "heading": "図", "mermaid_code": "graph TD; A-->B"}]
+
+        SlideRenderer(pool=self.pool, workers=1, cache=cache).render_all(slides, tmp_path / "a")
+
+        # 見出しだけ変えるとスライドPNGは再描画されるが、SVGはキャッシュから再利用される
+        renderer = SlideRenderer(pool=self.pool, workers=1, cache=cache)
+        calls = self._render_svgs_spy(renderer)
+        paths = renderer.render_all([{**slides[0], "heading": "図2"}], tmp_path / "b")
+
+        assert calls == []
+        assert "<svg>graph TD; A-->B</svg>" in paths[0].read_bytes().decode("utf-8")
+
+    def test_syntax_error_falls_back_to_code(self, tmp_path):
+        slides = [{"type": "mermaid", "heading": "図", "mermaid_code": "graph error"}]
+        renderer = SlideRenderer(pool=self.pool, workers=1, use_cache=False)
+
+        content = renderer.render_all(slides, tmp_path)[0].read_bytes().decode("utf-8")
+
+        assert "<svg>" not in content
+        assert "graph error" in content
+
+
+class TestAsyncSlideRenderer:
+    """playwright.async_api版レンダラー"""
+
+    def test_render_all_matches_sync_output(self, tmp_path):
+        slides = _slides(5) + [{"type": "mermaid", "heading": "図", "mermaid_code": "graph TD; A-->B"}]
+
+        async def run():
+            pool = await FakeAsyncBrowserPool(size=2).start()
+            try:
+                renderer = AsyncSlideRenderer(pool=pool, workers=2, use_cache=False)
+                return await renderer.render_all(slides, tmp_path / "async")
+            finally:
+                await pool.shutdown()
+
+        async_paths = asyncio.run(run())
+
+        sync_pool = FakeBrowserPool(size=1).start()
+        try:
+            sync_paths = SlideRenderer(pool=sync_pool, use_cache=False).render_all(slides, tmp_path / "sync")
+        finally:
+            sync_pool.shutdown()
+
+        assert [p.name for p in async_paths] == [p.name for p in sync_paths]
+        for a, b in zip(async_paths, sync_paths):
+            assert a.read_bytes() == b.read_bytes()
+
+    def test_slide_is_rerendered_after_browser_crash(self):
+        async def run():
+            pool = await FakeAsyncBrowserPool(size=1).start()
+            try:
+                renderer = AsyncSlideRenderer(pool=pool, workers=1, use_cache=False)
+                original = renderer._render_slide
+                crashed = []
+
+                async def render_slide(page, slide):
+                    if slide["heading"] == "見出し1" and not crashed:
+                        crashed.append(True)
+                        page.browser.connected = False
+                        raise RuntimeError("Target closed")
+                    return await original(page, slide)
+
+                renderer._render_slide = render_slide
+                return await renderer.render_frames(_slides(3))
+            finally:
+                await pool.shutdown()
+
+        frames = asyncio.run(run())
+        assert [f"見出し{i}" in frame.decode("utf-8") for i, frame in enumerate(frames)] == [True] * 3
+
+    def test_loop_renderer_runs_on_event_loop_from_thread(self):
+        received = {}
+
+        async def run():
+            pool = await FakeAsyncBrowserPool(size=2).start()
+            try:
+                renderer = LoopSlideRenderer(
+                    AsyncSlideRenderer(pool=pool, workers=2, use_cache=False), asyncio.get_running_loop()
+                )
+                # VideoPipelineと同様に別スレッドから同期的に呼ぶ
+                return await asyncio.to_thread(
+                    renderer.render_frames, _slides(3), lambda i, data: received.setdefault(i, data)
+                )
+            finally:
+                await pool.shutdown()
+
+        frames = asyncio.run(run())
+        assert [received[i] for i in range(3)] == frames
@@ -0,0 +1,90 @@
+"""Storage resumable upload（TUS）ユニットテスト（HTTPの代わりにフェイクSessionを使用）"""
+
+import io
+
+import pytest
+
+from app.core import storage
+
+
+class FakeResponse:
+    def __init__(self, status=200, headers=None):
+        self.status_code = status
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class FakeTusSession:
+    """受信済みバイト列を保持し、指定回数だけPATCHを失敗させるTUSサーバー"""
+
+    def __init__(self, fail_patches=(), fail_posts=0):
+        self.received = bytearray()
+        self.fail_patches = set(fail_patches)
+        self.fail_posts = fail_posts
+        self.posts = 0
+        self.patches = 0
+        self.created = None
+
+    def post(self, url, headers, timeout):
+        self.posts += 1
+        if self.posts <= self.fail_posts:
+            raise ConnectionError("connection reset")
+        self.created = headers
+        return FakeResponse(201, {"Location": "/storage/v1/upload/resumable/abc"})
+
+    def patch(self, url, headers, data, timeout):
+        self.patches += 1
+        assert int(headers["Upload-Offset"]) == len(self.received)
+        if self.patches in self.fail_patches:
+            # 途中まで受信して接続が切れたケース
+            self.received.extend(data[: len(data) // 2])
+            raise ConnectionError("connection reset")
+        self.received.extend(data)
+        return FakeResponse(204, {"Upload-Offset": str(len(self.received))})
+
+    def head(self, url, headers, timeout):
+        return FakeResponse(200, {"Upload-Offset": str(len(self.received))})
+
+
+class TestTusUpload:
+    """_tus_upload のチャンク送信と再開のテスト"""
+
+    def setup_method(self):
+        self.data = bytes(range(256)) * 1000  # 256KB
+
+    def upload(self, session, monkeypatch):
+        monkeypatch.setattr(storage, "RESUMABLE_CHUNK_SIZE", 64 * 1024)
+        monkeypatch.setattr(storage.time, "sleep", lambda s: None)
+        storage._tus_upload(
+            "slide-files", "user/video.mp4", io.BytesIO(self.data), len(self.data), "video/mp4", session=session
+        )
+
+    def test_uploads_in_chunks(self, monkeypatch):
+        session = FakeTusSession()
+        self.upload(session, monkeypatch)
+        assert bytes(session.received) == self.data
+        assert session.patches == 4
+        assert session.created["Upload-Length"] == str(len(self.data))
+        assert session.created["x-upsert"] == "true"
+
+    def test_resumes_from_committed_offset(self, monkeypatch):
+        session = FakeTusSession(fail_patches={2})
+        self.upload(session, monkeypatch)
+        # 失敗したチャンクの残りだけを再送し、先頭からやり直さない
+        assert bytes(session.received) == self.data
+        assert session.patches == 5
+
+    def test_retries_upload_creation(self, monkeypatch):
+        session = FakeTusSession(fail_posts=2)
+        self.upload(session, monkeypatch)
+        assert session.posts == 3
+        assert bytes(session.received) == self.data
+
+    def test_gives_up_after_retries(self, monkeypatch):
+        monkeypatch.setattr(storage, "UPLOAD_RETRIES", 1)
+        session = FakeTusSession(fail_patches={2, 3})
+        with pytest.raises(ConnectionError):
+            self.upload(session, monkeypatch)
@@ -0,0 +1,123 @@
+"""Tavily検索の並列実行ユニットテスト（HTTPの代わりにフェイクSessionを使用）"""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+from app.core.search_cache import SqliteTTLCache
+from app.core.utils import tavily_collect_context
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+class FakeTavilySession:
+    """クエリごとに結果を返し、同時実行数を記録するTavily API"""
+
+    def __init__(self, results, fail=(), delay=0.05):
+        self.results = results
+        self.fail = set(fail)
+        self.delay = delay
+        self.timeouts = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def post(self, url, json, timeout):
+        with self._lock:
+            self.timeouts.append(timeout)
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(self.delay)
+            if json["query"] in self.fail:
+                raise TimeoutError("read timed out")
+            return FakeResponse({"results": self.results.get(json["query"], [])})
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _result(url):
+    return {"url": url, "title": url, "content": "line1\nline2"}
+
+
+class TestTavilyCollectContext:
+    """tavily_collect_context の並列実行・部分失敗"""
+
+    def test_queries_run_concurrently_with_bounded_workers(self):
+        queries = [f"q{i}" for i in range(8)]
+        session = FakeTavilySession({q: [_result(f"https://{q}")] for q in queries})
+
+        out = tavily_collect_context(queries, session=session, max_workers=4, timeout=5)
+
+        assert list(out) == queries
+        assert session.peak == 4
+        assert session.timeouts == [5] * 8
+
+    def test_failed_queries_are_skipped(self):
+        session = FakeTavilySession(
+            {"a": [_result("https://a")], "c": [_result("https://c")]}, fail=("b",)
+        )
+        out = tavily_collect_context(["a", "b", "c"], session=session)
+
+        assert list(out) == ["a", "c"]
+        assert out["a"][0]["content"] == "line1 line2"
+
+    def test_all_queries_failing_raises(self):
+        session = FakeTavilySession({}, fail=("a", "b"))
+
+        with pytest.raises(RuntimeError, match="All 2 Tavily searches failed"):
+            tavily_collect_context(["a", "b"], session=session)
+
+    def test_no_results_is_not_a_failure(self):
+        session = FakeTavilySession({})
+        assert tavily_collect_context(["a"], session=session) == {}
+
+    def test_duplicate_urls_follow_query_order(self):
+        # 後のクエリが先に終わっても、重複URLは先のクエリに残る
+        session = FakeTavilySession({
+            "first": [_result("https://shared")],
+            "second": [_result("https://shared"), _result("https://other")],
+        })
+        out = tavily_collect_context(
+            [{"q": "first", "include_domains": ["example.com"]}, "second"], session=session
+        )
+
+        assert [it["url"] for it in out["first"]] == ["https://shared"]
+        assert [it["url"] for it in out["second"]] == ["https://other"]
+
+    def test_cached_queries_skip_api(self, tmp_path):
+        cache = SqliteTTLCache(tmp_path / "tavily.sqlite3")
+        session = FakeTavilySession({"a": [_result("https://a")], "b": [_result("https://b")]})
+        first = tavily_collect_context(["a", "b"], session=session, cache=cache)
+
+        second = tavily_collect_context(["a", "b"], session=session, cache=cache)
+        assert second == first
+        assert len(session.timeouts) == 2
+
+        # 検索条件が違えば別のキャッシュ
+        tavily_collect_context([{"q": "a", "time_range": "week"}], session=session, cache=cache)
+        assert len(session.timeouts) == 3
+
+    def test_cache_errors_do_not_drop_results(self, tmp_path):
+        class LockedCache(SqliteTTLCache):
+            def get(self, key):
+                raise sqlite3.OperationalError("database is locked")
+
+            def set(self, key, value, ttl_seconds):
+                raise sqlite3.OperationalError("database is locked")
+
+        session = FakeTavilySession({"a": [_result("https://a")]})
+        out = tavily_collect_context(["a"], session=session, cache=LockedCache(tmp_path / "tavily.sqlite3"))
+
+        assert [it["url"] for it in out["a"]] == ["https://a"]
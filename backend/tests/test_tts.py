@@ -0,0 +1,186 @@
+"""TTS ユニットテスト（AsyncOpenAIクライアントはフェイク）"""
+
+import asyncio
+
+import pytest
+from app.core import tts
+from app.core.content_cache import ContentCache
+from app.core.tts import TokenBucket, TtsRateLimiter, synthesize_narrations, synthesize_speech, tts_cache_key
+
+
+class FakeApiError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+        self.response = None
+
+
+class FakeStreamingResponse:
+    def __init__(self, data):
+        self.data = data
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def iter_bytes(self, chunk_size):
+        for start in range(0, len(self.data), 2):
+            yield self.data[start:start + 2]
+
+
+class FakeSpeech:
+    def __init__(self, failures=None):
+        self.calls = []
+        # テキストごとに、先頭から順に送出するステータスコード
+        self.failures = {text: list(codes) for text, codes in (failures or {}).items()}
+        self.with_streaming_response = self
+
+    def create(self, model, voice, input, speed, response_format):
+        self.calls.append((model, voice, input, speed))
+        codes = self.failures.get(input)
+        if codes:
+            raise FakeApiError(codes.pop(0))
+        return FakeStreamingResponse(f"MP3:{input}".encode())
+
+
+class FakeClient:
+    def __init__(self, failures=None):
+        self.audio = type("Audio", (), {"speech": FakeSpeech(failures)})()
+
+
+class RecordingUpload:
+    def __init__(self, fail_on=()):
+        self.uploaded = {}
+        self.fail_on = fail_on
+
+    def __call__(self, storage_path, data):
+        if storage_path in self.fail_on:
+            raise ConnectionError("reset by peer")
+        self.uploaded[storage_path] = data
+        return f"https://storage.example/{storage_path}"
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(tts, "TTS_RETRY_BASE_SEC", 0.0)
+
+
+def _unlimited():
+    return TtsRateLimiter(0, 0)
+
+
+class TestTtsCache:
+    """synthesize_speech のキャッシュ動作"""
+
+    def setup_method(self):
+        self.client = FakeClient()
+
+    def synthesize(self, text="こんにちは", cache=None, **settings):
+        params = {"model": "tts-1-hd", "voice": "shimmer", "speed": 1.0, **settings}
+        return asyncio.run(synthesize_speech(self.client, text, cache=cache, limiter=_unlimited(), **params))
+
+    def test_repeated_narration_skips_api(self, tmp_path):
+        cache = ContentCache(tmp_path / "cache")
+        assert self.synthesize(cache=cache) == ("MP3:こんにちは".encode(), False)
+        assert self.synthesize(cache=cache) == ("MP3:こんにちは".encode(), True)
+        assert len(self.client.audio.speech.calls) == 1
+
+    def test_settings_are_part_of_key(self, tmp_path):
+        cache = ContentCache(tmp_path / "cache")
+        self.synthesize(cache=cache)
+        self.synthesize(cache=cache, voice="alloy")
+        self.synthesize(cache=cache, speed=1.25)
+
+        assert len(self.client.audio.speech.calls) == 3
+        assert tts_cache_key("x", "tts-1", "alloy", 1) == tts_cache_key("x", "tts-1", "alloy", 1.0)
+
+    def test_cache_is_written_outside_semaphore(self, tmp_path):
+        semaphore = asyncio.Semaphore(1)
+        held = []
+
+        class RecordingCache(ContentCache):
+            def put(self, key, data):
+                held.append(semaphore.locked())
+                super().put(key, data)
+
+        cache = RecordingCache(tmp_path / "cache")
+        asyncio.run(synthesize_speech(
+            self.client, "こんにちは", "tts-1", "alloy", cache=cache, limiter=_unlimited(), semaphore=semaphore
+        ))
+        # キャッシュ書き込み中はTTSの同時実行枠を解放している
+        assert held == [False]
+
+    def test_without_cache_always_calls_api(self):
+        self.synthesize()
+        self.synthesize()
+        assert len(self.client.audio.speech.calls) == 2
+
+
+class TestRateLimit:
+    """トークンバケット"""
+
+    def test_burst_up_to_capacity_then_waits(self):
+        bucket = TokenBucket(per_minute=60)
+        assert [bucket.reserve(1) for _ in range(60)] == [0.0] * 60
+        # 補充は1秒に1トークン
+        assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+        assert bucket.reserve(1) == pytest.approx(2.0, abs=0.05)
+
+    def test_oversized_request_is_capped(self):
+        bucket = TokenBucket(per_minute=600)
+        assert bucket.reserve(10_000) == 0.0
+        assert bucket.reserve(600) == pytest.approx(60.0, abs=0.1)
+
+    def test_zero_means_unlimited(self):
+        bucket = TokenBucket(per_minute=0)
+        assert all(bucket.reserve(1000) == 0.0 for _ in range(100))
+
+
+class TestSynthesizeNarrations:
+    """並列生成・再試行・スライド単位の失敗"""
+
+    def run(self, client, texts, upload=None):
+        return asyncio.run(synthesize_narrations(
+            texts, "user/narration/s1", "tts-1", "alloy",
+            client=client, limiter=_unlimited(), concurrency=2, upload=upload or RecordingUpload(),
+        ))
+
+    def test_uploads_streamed_audio_and_returns_urls(self):
+        upload = RecordingUpload()
+        results = self.run(FakeClient(), ["a", "bc"], upload)
+
+        # フェイクの音声はMP3ではないため長さはNone
+        assert results == [
+            ("https://storage.example/user/narration/s1/narration_000.mp3", None),
+            ("https://storage.example/user/narration/s1/narration_001.mp3", None),
+        ]
+        assert upload.uploaded["user/narration/s1/narration_001.mp3"] == b"MP3:bc"
+
+    def test_retries_rate_limit_and_server_errors(self):
+        client = FakeClient(failures={"b": [429, 503]})
+        urls = self.run(client, ["a", "b"])
+
+        assert all(urls)
+        assert [call[2] for call in client.audio.speech.calls].count("b") == 3
+
+    def test_failed_slide_is_isolated(self):
+        client = FakeClient(failures={"b": [400]})
+        urls = self.run(client, ["a", "b", "c"])
+
+        # 400は再試行せず、そのスライドだけNoneになる
+        assert urls[1] is None
+        assert urls[0] and urls[2]
+        assert [call[2] for call in client.audio.speech.calls].count("b") == 1
+
+    def test_upload_failure_is_isolated(self):
+        upload = RecordingUpload(fail_on=("user/narration/s1/narration_000.mp3",))
+        urls = self.run(FakeClient(), ["a", "b"], upload)
+        assert urls[0] is None and urls[1]
+
+    def test_gives_up_after_max_retries(self, monkeypatch):
+        monkeypatch.setattr(tts, "TTS_MAX_RETRIES", 2)
+        client = FakeClient(failures={"a": [429] * 5})
+        assert self.run(client, ["a"]) == [None]
+        assert len(client.audio.speech.calls) == 3
@@ -0,0 +1,69 @@
+"""ベンダー別箇条書き生成のユニットテスト（LLMはフェイク）"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import utils
+from app.core.utils import NO_RESULTS_BULLETS, _create_llm_summarized_bullets_batch
+
+
+class FakeLLM:
+    """batchの呼び出しを記録し、指定したベンダーだけ例外を返すLLM"""
+
+    def __init__(self, fail_on=()):
+        self.batches = []
+        self.fail_on = fail_on
+
+    def batch(self, prompts, config=None, return_exceptions=False):
+        self.batches.append((len(prompts), config))
+        responses = []
+        for prompt in prompts:
+            user = prompt[1][1]
+            if any(name in user for name in self.fail_on):
+                responses.append(RuntimeError("rate limited"))
+            else:
+                vendor = user.split("以下の", 1)[1].split("に関する", 1)[0]
+                responses.append(SimpleNamespace(content=f"- 🚀 **{vendor}** (10月): 1\n- 💡 2\n- ⚡ 3"))
+        return responses
+
+    def invoke(self, prompt):
+        raise AssertionError("vendor bullets must be generated in one batch")
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    llm = FakeLLM(fail_on=("Meta AI",))
+    monkeypatch.setattr(utils, "llm", llm)
+    return llm
+
+
+def _results(title):
+    return [{"title": title, "url": f"https://example.com/{title}", "content": "..."}]
+
+
+class TestVendorBulletsBatch:
+    """_create_llm_summarized_bullets_batch の一括生成"""
+
+    def test_all_vendors_in_one_batch(self, fake_llm):
+        bullets = _create_llm_summarized_bullets_batch(
+            [("OpenAI", _results("gpt")), ("Anthropic", _results("claude"))], max_concurrency=6
+        )
+
+        assert fake_llm.batches == [(2, {"max_concurrency": 6})]
+        assert bullets[0][0] == "- 🚀 **OpenAI** (10月): 1"
+        assert bullets[1][0] == "- 🚀 **Anthropic** (10月): 1"
+
+    def test_failed_vendor_falls_back_to_titles(self, fake_llm):
+        bullets = _create_llm_summarized_bullets_batch(
+            [("Meta AI", _results("llama")), ("OpenAI", _results("gpt"))], num_bullets=2
+        )
+
+        assert bullets[0] == ["- **llama**", "- （情報が不足しています）"]
+        assert len(bullets[1]) == 2
+
+    def test_vendor_without_results_skips_llm(self, fake_llm):
+        bullets = _create_llm_summarized_bullets_batch([("Google AI", []), ("OpenAI", _results("gpt"))])
+
+        assert bullets[0] == NO_RESULTS_BULLETS
+        assert fake_llm.batches[0][0] == 1
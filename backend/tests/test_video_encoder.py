@@ -0,0 +1,199 @@
+"""VideoEncoder ユニットテスト（ffmpegコマンドの組み立てを検証）"""
+
+import shutil
+import threading
+import time
+
+from pathlib import Path
+
+import pytest
+from app.core import video_encoder
+from app.core.content_cache import ContentCache
+from app.core.video_encoder import VideoEncoder
+
+
+class RecordingEncoder(VideoEncoder):
+    """ffmpegを実行せずにコマンドを記録するエンコーダー"""
+
+    def __init__(self, fail_on=(), delay=0.0, **kwargs):
+        kwargs.setdefault("workers", 1)
+        kwargs.setdefault("use_cache", False)
+        super().__init__(**kwargs)
+        self.commands = []
+        self.fail_on = fail_on
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def _run(self, cmd, stdin_data=None):
+        with self._lock:
+            self.commands.append((cmd, stdin_data))
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay)
+        with self._lock:
+            self.running -= 1
+        if any(name in cmd[-1] for name in self.fail_on):
+            raise RuntimeError("ffmpeg failed (1): broken input")
+        if cmd[-1].endswith(".ts"):
+            Path(cmd[-1]).write_bytes(b"TS:" + (stdin_data or b""))
+
+
+@pytest.fixture(autouse=True)
+def fake_ffmpeg(monkeypatch):
+    monkeypatch.setattr(video_encoder, "get_ffmpeg_path", lambda: "ffmpeg")
+
+
+class TestVideoEncoder:
+    """セグメント生成・結合コマンド"""
+
+    def test_bytes_frame_is_piped_to_stdin(self, tmp_path):
+        encoder = RecordingEncoder()
+        encoder.encode_segment(b"PNG", "a.mp3", tmp_path / "seg.ts")
+
+        cmd, stdin_data = encoder.commands[0]
+        assert stdin_data == b"PNG"
+        assert cmd[cmd.index("-i") + 1] == "pipe:0"
+        assert "-shortest" in cmd
+        assert cmd[cmd.index("-tune") + 1] == "stillimage"
+
+    def test_path_frame_uses_loop_input(self, tmp_path):
+        encoder = RecordingEncoder()
+        encoder.encode_segment(tmp_path / "1.png", "a.mp3", tmp_path / "seg.ts")
+
+        cmd, stdin_data = encoder.commands[0]
+        assert stdin_data is None
+        assert cmd[cmd.index("-loop") + 1] == "1"
+
+    def test_failed_segment_is_skipped(self, tmp_path):
+        encoder = RecordingEncoder(fail_on=("segment_001",))
+        count = encoder.encode([b"a", b"b", b"c"], ["1.mp3", "2.mp3", "3.mp3"], tmp_path / "out.mp4", tmp_path)
+
+        assert count == 2
+        concat_cmd, _ = encoder.commands[-1]
+        assert concat_cmd[concat_cmd.index("-c") + 1] == "copy"
+        listing = (tmp_path / "segments.txt").read_text(encoding="utf-8")
+        assert "segment_000.ts" in listing and "segment_001.ts" not in listing
+
+    def test_all_segments_failed_raises(self, tmp_path):
+        encoder = RecordingEncoder(fail_on=("segment_",))
+        with pytest.raises(RuntimeError):
+            encoder.encode([b"a"], ["1.mp3"], tmp_path / "out.mp4", tmp_path)
+
+    def test_segments_encoded_in_parallel_and_kept_in_order(self, tmp_path):
+        encoder = RecordingEncoder(workers=3, delay=0.05)
+        frames = [f"slide{i}".encode() for i in range(6)]
+        encoder.encode(frames, [f"{i}.mp3" for i in range(6)], tmp_path / "out.mp4", tmp_path)
+
+        assert encoder.max_running == 3
+        listing = (tmp_path / "segments.txt").read_text(encoding="utf-8").splitlines()
+        assert [line.split("segment_")[1][:3] for line in listing] == [f"{i:03d}" for i in range(6)]
+
+    def test_concat_list_escapes_quotes(self, tmp_path):
+        encoder = RecordingEncoder()
+        encoder.concat([tmp_path / "it's.ts"], tmp_path / "out.mp4", tmp_path / "list.txt")
+
+        assert "it'\\''s.ts" in (tmp_path / "list.txt").read_text(encoding="utf-8")
+
+
+class TestLoudness:
+    """ラウドネス正規化"""
+
+    def test_loudnorm_is_applied_in_the_segment_encode(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(video_encoder, "AUDIO_LOUDNESS_TARGET", -16.0)
+        monkeypatch.setattr(video_encoder, "AUDIO_TRUE_PEAK", -1.5)
+        encoder = RecordingEncoder()
+        encoder.encode_segment(b"PNG", "a.mp3", tmp_path / "seg.ts", normalize=True)
+        encoder.encode_segment(b"PNG", "a.mp3", tmp_path / "seg.ts")
+
+        # 測定用のffmpegは起動せず、エンコードの1回だけ
+        assert len(encoder.commands) == 2
+        normalized, _ = encoder.commands[0]
+        assert normalized[normalized.index("-af") + 1] == "loudnorm=I=-16:TP=-1.5:LRA=11"
+        plain, _ = encoder.commands[1]
+        assert "-af" not in plain
+
+    def test_normalization_changes_segment_key(self, tmp_path):
+        audio = tmp_path / "a.mp3"
+        audio.write_bytes(b"mp3")
+        encoder = RecordingEncoder()
+
+        assert encoder.segment_key(b"PNG", audio, normalize=True) != encoder.segment_key(b"PNG", audio)
+
+
+class TestHls:
+    """HLSプレイリスト出力"""
+
+    def test_playlist_lists_segments_with_durations(self):
+        playlist = video_encoder.build_hls_playlist([("segment_000.ts", 3.2), ("segment_002.ts", 7.05)])
+        lines = playlist.splitlines()
+
+        assert lines[0] == "#EXTM3U"
+        assert "#EXT-X-TARGETDURATION:8" in lines
+        assert lines[-1] == "#EXT-X-ENDLIST"
+        assert lines[lines.index("#EXTINF:3.200,") + 1] == "segment_000.ts"
+        # 独立エンコードのセグメント間には不連続マーカーを入れる
+        assert lines.count("#EXT-X-DISCONTINUITY") == 1
+
+    def test_finish_hls_skips_concat(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(video_encoder, "probe_duration", lambda path: 2.5)
+        encoder = RecordingEncoder(fail_on=("segment_001",))
+        with video_encoder.SegmentStream(encoder, tmp_path, 3) as stream:
+            for i in range(3):
+                stream.add_frame(i, b"png")
+                stream.add_audio(i, f"{i}.mp3")
+            segments = stream.finish_hls(tmp_path / "index.m3u8")
+
+        assert [p.name for p in segments] == ["segment_000.ts", "segment_002.ts"]
+        assert all("concat" not in cmd for cmd, _ in encoder.commands)
+        assert "segment_002.ts" in (tmp_path / "index.m3u8").read_text(encoding="utf-8")
+
+
+class TestSegmentCache:
+    """変更のないスライドのセグメントは再エンコードしない"""
+
+    def _audio(self, tmp_path, name, data):
+        path = tmp_path / name
+        path.write_bytes(data)
+        return path
+
+    def _encoded_segments(self, encoder):
+        return [cmd[-1] for cmd, _ in encoder.commands if cmd[-1].endswith(".ts")]
+
+    def test_only_changed_segments_are_encoded(self, tmp_path):
+        cache = ContentCache(tmp_path / "cache")
+        audio = [self._audio(tmp_path, f"{i}.mp3", f"audio{i}".encode()) for i in range(3)]
+        frames = [b"slide0", b"slide1", b"slide2"]
+
+        RecordingEncoder(cache=cache, use_cache=True).encode(frames, audio, tmp_path / "a.mp4", tmp_path / "a")
+
+        # スライド1の画像とスライド2の音声だけ変更
+        audio[2] = self._audio(tmp_path, "2b.mp3", b"audio2-changed")
+        encoder = RecordingEncoder(cache=cache, use_cache=True)
+        encoder.encode([b"slide0", b"slide1-changed", b"slide2"], audio, tmp_path / "b.mp4", tmp_path / "b")
+
+        encoded = self._encoded_segments(encoder)
+        assert [Path(p).name for p in encoded] == ["segment_001.ts", "segment_002.ts"]
+        assert (tmp_path / "b" / "segment_000.ts").read_bytes() == b"TS:slide0"
+
+    def test_encoder_settings_are_part_of_key(self, tmp_path):
+        audio = self._audio(tmp_path, "a.mp3", b"audio")
+        assert VideoEncoder(fps=2).segment_key(b"png", audio) != VideoEncoder(fps=4).segment_key(b"png", audio)
+
+
+def test_available_cpus_is_positive():
+    assert video_encoder.available_cpus() >= 1
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_probe_duration_parses_ffmpeg_output(tmp_path, monkeypatch):
+    import subprocess
+
+    monkeypatch.setattr(video_encoder, "get_ffmpeg_path", lambda: shutil.which("ffmpeg"))
+    audio = tmp_path / "tone.wav"
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i", "sine=duration=1.5", str(audio)],
+        check=True,
+    )
+    assert video_encoder.probe_duration(audio) == pytest.approx(1.5, abs=0.05)
@@ -0,0 +1,341 @@
+"""VideoPipeline ユニットテスト（レンダラー・エンコーダー・Storageはフェイク）"""
+
+import threading
+import time
+
+import pytest
+from app.core.video_encoder import VideoEncoder
+from app.core.video_pipeline import PreviewPublisher, VideoPipeline
+
+
+class FakeRenderer:
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+        self.finished_at = None
+
+    def render_frames(self, slides, on_frame=None):
+        self.calls += 1
+        frames = []
+        for i in range(len(slides)):
+            time.sleep(self.delay)
+            frames.append(f"PNG{i}".encode())
+            if on_frame:
+                on_frame(i, frames[-1])
+        self.finished_at = time.perf_counter()
+        return frames
+
+
+class FakeEncoder(VideoEncoder):
+    """ffmpegを実行せずにセグメント生成を記録するエンコーダー"""
+
+    def __init__(self, fail=False):
+        super().__init__(workers=2, use_cache=False)
+        self.fail = fail
+        self.encoded = []
+        self.normalized = {}
+        self.concatenated = None
+
+    def encode_segment(self, image, audio_path, output_path, threads=0, normalize=False):
+        if self.fail:
+            raise RuntimeError("ffmpeg failed (1)")
+        self.encoded.append((time.perf_counter(), image, audio_path))
+        self.normalized[output_path.name] = normalize
+        output_path.write_bytes(b"TS")
+        return output_path
+
+    def concat(self, segments, output_path, list_path=None):
+        self.concatenated = list(segments)
+        output_path.write_bytes(b"MP4")
+        return output_path
+
+    def segment_duration(self, segment_path):
+        return 4.0
+
+
+class RecordingPreview(PreviewPublisher):
+    """Storage・DBの代わりにアップロードと進捗を記録するプレビュー"""
+
+    def __init__(self, *args, fail_upload=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fail_upload = fail_upload
+        self.playlists = []
+        self.progress = []
+        self.deleted = []
+        self.cleared = False
+
+    def upload_segment(self, segment):
+        if segment.name in self.fail_upload:
+            raise ConnectionError("reset by peer")
+
+    def upload_playlist(self, playlist_path):
+        self.playlists.append(playlist_path.read_text())
+        return f"https://storage.example/{self.prefix}/{playlist_path.name}"
+
+    def update_progress(self, slides_done):
+        self.progress.append((slides_done, self.total, self.preview_url))
+
+    def delete_objects(self, paths):
+        self.deleted.extend(paths)
+
+    def clear_preview(self):
+        self.cleared = True
+
+
+class RecordingPipeline(VideoPipeline):
+    """アップロード・DB更新を記録するだけのパイプライン"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.uploaded = []
+        self.db_updates = []
+
+    def upload(self, video_path, storage_path):
+        self.uploaded.append((video_path.read_bytes(), storage_path))
+        return f"https://storage.example/{storage_path}"
+
+    def create_preview(self, job_id, prefix, total, work_dir):
+        self.preview = RecordingPreview(self.encoder, job_id, prefix, total, work_dir, durations=self.durations)
+        return self.preview
+
+    def upload_hls(self, playlist_path, segments, prefix, skip=()):
+        self.uploaded.append((playlist_path.read_text(), [p.name for p in segments if p.name not in skip], prefix))
+        return f"https://storage.example/{prefix}/{playlist_path.name}"
+
+    def update_db(self, video_url, slide_id, job_id):
+        self.db_updates.append((video_url, slide_id, job_id, self.metrics()))
+
+
+class DownloadingPipeline(RecordingPipeline):
+    """HTTPの代わりにURL文字列を書き込むダウンロードを行うパイプライン"""
+
+    def __init__(self, fail_on=None, **kwargs):
+        super().__init__(**kwargs)
+        self.fail_on = fail_on
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def _create_session(self, pool_size):
+        self.pool_size = pool_size
+        return None
+
+    def _download(self, session, url, dest_path):
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.05)
+        with self._lock:
+            self.running -= 1
+        if url == self.fail_on:
+            raise ConnectionError("reset by peer")
+        dest_path.write_text(url)
+        self.downloaded_at = time.perf_counter()
+
+
+def _audio(tmp_path, n):
+    paths = []
+    for i in range(n):
+        path = tmp_path / f"narration_{i}.mp3"
+        path.write_bytes(b"mp3")
+        paths.append(str(path))
+    return paths
+
+
+class TestVideoPipeline:
+    """ステージ実行と計測"""
+
+    def test_runs_all_stages_and_records_timings(self, tmp_path):
+        pipeline = RecordingPipeline(renderer=FakeRenderer(), encoder=FakeEncoder(), normalize_audio=True)
+        url = pipeline.run([{}, {}], _audio(tmp_path, 2), tmp_path, "user/deck_video.mp4", slide_id="s1", job_id="j1")
+
+        assert url == "https://storage.example/user/deck_video.mp4"
+        assert pipeline.uploaded == [(b"MP4", "user/deck_video.mp4")]
+        assert set(pipeline.timings) == set(VideoPipeline.STAGES)
+        assert all(t["wall_sec"] >= 0 and t["cpu_sec"] >= 0 for t in pipeline.timings.values())
+
+        _, slide_id, job_id, metrics = pipeline.db_updates[0]
+        assert (slide_id, job_id) == ("s1", "j1")
+        assert metrics["segments"] == 2
+        assert set(metrics["stages"]) == {"fetch_audio", "rasterize", "encode", "upload"}
+        # 重ねて実行したステージの合計ではなく、run() 全体の実時間
+        stages = metrics["stages"]
+        assert metrics["total_wall_sec"] >= stages["encode"]["wall_sec"] + stages["upload"]["wall_sec"]
+
+    def test_prerendered_frames_skip_rasterize(self, tmp_path):
+        renderer = FakeRenderer()
+        pipeline = RecordingPipeline(renderer=renderer, encoder=FakeEncoder())
+        pipeline.run([{}], _audio(tmp_path, 1), tmp_path, "u/v.mp4", frames=[b"PNG"])
+
+        assert renderer.calls == 0
+        assert "rasterize" not in pipeline.timings
+
+    def test_frame_and_audio_counts_are_aligned(self, tmp_path):
+        encoder = FakeEncoder()
+        pipeline = RecordingPipeline(renderer=FakeRenderer(), encoder=encoder)
+        pipeline.run([{}, {}, {}], _audio(tmp_path, 2), tmp_path, "u/v.mp4")
+
+        assert len(encoder.encoded) == 2
+        assert [p.name for p in encoder.concatenated] == ["segment_000.ts", "segment_001.ts"]
+
+    def test_encoding_overlaps_rendering(self, tmp_path):
+        renderer = FakeRenderer(delay=0.05)
+        encoder = FakeEncoder()
+        pipeline = RecordingPipeline(renderer=renderer, encoder=encoder)
+        pipeline.run([{}] * 4, _audio(tmp_path, 4), tmp_path, "u/v.mp4")
+
+        # 最初のセグメントは全スライドのレンダリング完了前にエンコードが始まる
+        assert min(started for started, _, _ in encoder.encoded) < renderer.finished_at
+        assert [p.name for p in encoder.concatenated] == [f"segment_{i:03d}.ts" for i in range(4)]
+
+    def test_hls_output_uploads_playlist_and_segments(self, tmp_path):
+        encoder = FakeEncoder()
+        pipeline = RecordingPipeline(renderer=FakeRenderer(), encoder=encoder)
+        url = pipeline.run([{}, {}], _audio(tmp_path, 2), tmp_path, "user/deck_video.mp4", output_format="hls")
+
+        assert url == "https://storage.example/user/deck_video_hls/index.m3u8"
+        assert encoder.concatenated is None
+        playlist, segments, prefix = pipeline.uploaded[0]
+        assert segments == ["segment_000.ts", "segment_001.ts"]
+        assert prefix == "user/deck_video_hls"
+        assert "#EXTINF:4.000," in playlist
+
+    def test_audio_is_normalized_while_encoding(self, tmp_path):
+        encoder = FakeEncoder()
+        pipeline = RecordingPipeline(renderer=FakeRenderer(), encoder=encoder, normalize_audio=True)
+        pipeline.run([{}, {}], _audio(tmp_path, 2), tmp_path, "u/v.mp4")
+
+        assert encoder.normalized == {"segment_000.ts": True, "segment_001.ts": True}
+
+    def test_normalized_audio_is_encoded_before_all_downloads_finish(self, tmp_path):
+        encoder = FakeEncoder()
+        pipeline = DownloadingPipeline(
+            download_workers=1, renderer=FakeRenderer(), encoder=encoder, normalize_audio=True
+        )
+        pipeline.run([{}] * 4, [f"https://x/{i}.mp3" for i in range(4)], tmp_path, "u/v.mp4")
+
+        # 正規化はセグメントのエンコード内で行うため、最後のダウンロードを待たずにエンコードが始まる
+        assert min(started for started, _, _ in encoder.encoded) < pipeline.downloaded_at
+        assert all(encoder.normalized.values())
+
+    def test_normalization_can_be_disabled(self, tmp_path):
+        encoder = FakeEncoder()
+        pipeline = RecordingPipeline(renderer=FakeRenderer(), encoder=encoder, normalize_audio=False)
+        pipeline.run([{}], _audio(tmp_path, 1), tmp_path, "u/v.mp4")
+
+        assert encoder.normalized == {"segment_000.ts": False}
+
+    def test_slide_offsets_follow_output_order(self, tmp_path):
+        pipeline = RecordingPipeline(renderer=FakeRenderer(), encoder=FakeEncoder())
+        pipeline.run([{}] * 3, _audio(tmp_path, 3), tmp_path, "u/v.mp4", audio_durations=[2.0, 3.5, 1.0])
+
+        assert [o["start_sec"] for o in pipeline.metrics()["slide_offsets"]] == [0.0, 2.0, 5.5]
+
+    def test_known_audio_durations_skip_probing(self, tmp_path):
+        encoder = FakeEncoder()
+        pipeline = RecordingPipeline(renderer=FakeRenderer(), encoder=encoder)
+        pipeline.run(
+            [{}, {}], _audio(tmp_path, 2), tmp_path, "u/v.mp4", output_format="hls", audio_durations=[2.5, None]
+        )
+
+        playlist, _, _ = pipeline.uploaded[0]
+        # 既知の長さはそのまま使い、不明なものだけセグメントから取得する
+        assert "#EXTINF:2.500," in playlist and "#EXTINF:4.000," in playlist
+        assert pipeline.metrics()["audio_sec"] == 2.5
+
+    def test_preview_publishes_segments_while_running(self, tmp_path):
+        pipeline = RecordingPipeline(renderer=FakeRenderer(), encoder=FakeEncoder())
+        pipeline.run([{}] * 3, _audio(tmp_path, 3), tmp_path, "user/deck_video.mp4", job_id="j1")
+
+        preview = pipeline.preview
+        assert [done for done, _, _ in preview.progress] == [1, 2, 3]
+        assert preview.progress[-1] == (3, 3, "https://storage.example/user/deck_video_hls/preview.m3u8")
+        # 途中のプレイリストは追記中（ENDLISTなし）
+        assert all("#EXT-X-PLAYLIST-TYPE:EVENT" in p and "#EXT-X-ENDLIST" not in p for p in preview.playlists)
+        assert preview.playlists[-1].count("#EXTINF") == 3
+        # MP4の公開後はプレビュー用のファイルを削除する
+        assert preview.deleted == [
+            "user/deck_video_hls/segment_000.ts",
+            "user/deck_video_hls/segment_001.ts",
+            "user/deck_video_hls/segment_002.ts",
+            "user/deck_video_hls/preview.m3u8",
+        ]
+        # 削除したプレイリストのURLはジョブからも消す
+        assert preview.cleared and preview.preview_url is None
+
+    def test_preview_target_duration_is_fixed(self, tmp_path):
+        pipeline = RecordingPipeline(renderer=FakeRenderer(), encoder=FakeEncoder())
+        pipeline.run(
+            [{}] * 3, _audio(tmp_path, 3), tmp_path, "u/v.mp4", job_id="j1", audio_durations=[1.0, 3.5, 2.0]
+        )
+
+        # 最初のプレイリストから全スライドの最大値を使い、追記しても変えない
+        assert all("#EXT-X-TARGETDURATION:4\n" in p for p in pipeline.preview.playlists)
+
+    def test_preview_target_duration_falls_back_to_upper_bound(self, tmp_path):
+        pipeline = RecordingPipeline(renderer=FakeRenderer(), encoder=FakeEncoder())
+        pipeline.run([{}] * 2, _audio(tmp_path, 2), tmp_path, "u/v.mp4", job_id="j1")
+
+        assert all("#EXT-X-TARGETDURATION:60\n" in p for p in pipeline.preview.playlists)
+
+    def test_preview_upload_failure_does_not_fail_job(self, tmp_path):
+        pipeline = RecordingPipeline(renderer=FakeRenderer(), encoder=FakeEncoder())
+        pipeline.create_preview = lambda job_id, prefix, total, work_dir: RecordingPreview(
+            pipeline.encoder, job_id, prefix, total, work_dir, fail_upload=("segment_000.ts",)
+        )
+        url = pipeline.run([{}, {}], _audio(tmp_path, 2), tmp_path, "u/v.mp4", job_id="j1", output_format="hls")
+
+        # プレビューで公開できなかったセグメントだけ最終アップロードで送る
+        assert url.endswith("/index.m3u8")
+        _, uploaded_segments, _ = pipeline.uploaded[0]
+        assert uploaded_segments == ["segment_000.ts"]
+
+    def test_hls_keeps_preview_segments(self, tmp_path):
+        pipeline = RecordingPipeline(renderer=FakeRenderer(), encoder=FakeEncoder())
+        pipeline.run([{}, {}], _audio(tmp_path, 2), tmp_path, "u/v.mp4", job_id="j1", output_format="hls")
+
+        # HLSではプレビューで公開したセグメントを本番のプレイリストでも使うため削除しない
+        assert pipeline.preview.deleted == []
+        assert not pipeline.preview.cleared
+        assert pipeline.uploaded[0][1] == []
+
+    def test_no_preview_without_job_id(self, tmp_path):
+        pipeline = RecordingPipeline(renderer=FakeRenderer(), encoder=FakeEncoder())
+        pipeline.run([{}], _audio(tmp_path, 1), tmp_path, "u/v.mp4")
+        assert not hasattr(pipeline, "preview")
+
+    def test_unknown_output_format_raises(self, tmp_path):
+        pipeline = RecordingPipeline(renderer=FakeRenderer(), encoder=FakeEncoder())
+        with pytest.raises(ValueError):
+            pipeline.run([{}], _audio(tmp_path, 1), tmp_path, "u/v.mp4", output_format="webm")
+
+    def test_failed_stage_is_still_timed(self, tmp_path):
+        pipeline = RecordingPipeline(renderer=FakeRenderer(), encoder=FakeEncoder(fail=True))
+        with pytest.raises(RuntimeError):
+            pipeline.run([{}], _audio(tmp_path, 1), tmp_path, "u/v.mp4")
+
+        assert "encode" in pipeline.metrics()["stages"]
+        assert pipeline.uploaded == []
+
+
+class TestFetchAudio:
+    """音声の並列ダウンロード"""
+
+    def test_downloads_concurrently_and_keeps_order(self, tmp_path):
+        pipeline = DownloadingPipeline(download_workers=4, renderer=FakeRenderer(), encoder=FakeEncoder())
+        local = tmp_path / "local.mp3"
+        sources = [f"https://storage.example/{i}.mp3" for i in range(6)] + [str(local)]
+
+        paths = pipeline.fetch_audio(sources, tmp_path / "audio")
+
+        assert pipeline.max_running == 4
+        assert pipeline.pool_size == 4
+        assert paths[-1] == str(local)
+        for i, path in enumerate(paths[:-1]):
+            assert path.endswith(f"narration_{i:03d}.mp3")
+            assert open(path).read() == sources[i]
+
+    def test_failure_raises_with_index(self, tmp_path):
+        pipeline = DownloadingPipeline(fail_on="https://x/1.mp3", renderer=FakeRenderer(), encoder=FakeEncoder())
+        with pytest.raises(Exception, match="audio file 1"):
+            pipeline.fetch_audio(["https://x/0.mp3", "https://x/1.mp3"], tmp_path)
@@ -69,6 +69,9 @@ export interface VideoJobStatus {
   status: 'pending' | 'processing' | 'completed' | 'failed';
   video_url?: string;
   error_message?: string;
+  slides_done?: number;
+  slides_total?: number;
+  preview_url?: string;
 }
 
 // ============================================================================